@@ -1,14 +1,20 @@
 # app_streamlit.py — MA on/off + 네임맵 + 즐겨찾기(저장) + 순매수/순매도 순위 + 조건 필터(20거래일) + 로고 표시
+# 콜드 스타트: pandas/altair는 필요한 탭에서만 import, 첫 화면은 processed/lookup.pkl로 바로 그림
+import time
+_T0 = time.perf_counter()
+
 import json
 import base64
 import re
+import threading
+from datetime import date
 from pathlib import Path
+from urllib.parse import quote_plus
 
-import streamlit.components.v1 as components
-import pandas as pd
 import streamlit as st
-import altair as alt
-from urllib.parse import quote_plus
+
+from lookup import load_lookup, date_bounds, LOOKUP_PATH
+from markets import MARKETS, DEFAULT_MARKET, available_markets, proc_dir
 
 # ───────────────────────────
 # 기본 설정
@@ -42,9 +48,58 @@ BASE_DIR = Path(__file__).parent
 LOGO_DIR = BASE_DIR / "assets" / "logos"
 
 PROC_DIR = BASE_DIR / "processed"
-DATA_PATH = PROC_DIR / "all_data_clean.csv"
 NAME_MAP_PATH = PROC_DIR / "name_map.csv"
+GROUPS_PATH = PROC_DIR / "groups.csv"
 FAV_PATH = PROC_DIR / "favorites.json"
+FAV_DB_PATH = PROC_DIR / "favorites.db"
+
+
+# ───────────────────────────
+# 🌐 시장(markets.py 파티션) — ?market= 또는 상단 선택, 가공 데이터가 있는 시장만
+#   시장별 데이터/조회 테이블/동조 종목은 processed/<시장>/ (미국은 processed/ 그대로)
+# ───────────────────────────
+MARKET_RESET_KEYS = ("stock_select_chart", "stock_select_corr", "cmp_stocks", "cmp_range",
+                     "range_value", "range_slider", "rank_range", "rank_range_slider", "filter_pick",
+                     "f_export_range",
+                     "group_select_chart")
+
+
+def current_market() -> str:
+    avail = available_markets() or [DEFAULT_MARKET]
+    m = st.session_state.get("market") or st.query_params.get("market")
+    if m not in avail:
+        m = avail[0]
+    st.session_state["market"] = m
+    return m
+
+
+def _on_market_change():
+    # 종목ID/거래일 범위가 시장마다 다르므로 종목 선택·기간 상태는 비움
+    for k in MARKET_RESET_KEYS:
+        st.session_state.pop(k, None)
+    for k in ("stock", "cmp"):
+        st.query_params.pop(k, None)
+    st.query_params["market"] = st.session_state["market"]
+
+
+MARKET = current_market()
+MARKET_DIR = proc_dir(MARKET)
+DATA_PATH = MARKET_DIR / "all_data_clean.csv"
+CORR_TOP_PATH = MARKET_DIR / "corr_top.csv"
+SPIKES_PATH = MARKET_DIR / "spikes.csv"
+GROUP_DAILY_PATH = MARKET_DIR / "group_daily.csv"
+
+
+# ───────────────────────────
+# ⏱️ 성능 측정 (스크립트 시작 기준 ms)
+#   - 서버 로그: 세션 첫 실행 시 1회 출력
+#   - 화면: ?perf=1 일 때 하단 캡션
+# ───────────────────────────
+PERF = {}
+
+
+def perf_mark(name: str):
+    PERF[name] = (time.perf_counter() - _T0) * 1000
 
 
 def get_mtime(p: Path) -> float:
@@ -64,6 +119,8 @@ def find_logo_path(stock_name: str):
 
 
 def render_title_line(logo_path: str, sel_disp: str, size: int = 86, align: str = "center"):
+    import streamlit.components.v1 as components
+
     m = re.match(r'^(.*?)\s*\((.+)\)\s*$', sel_disp)
     has_korean = bool(m)
 
@@ -120,90 +177,593 @@ def render_title_line(logo_path: str, sel_disp: str, size: int = 86, align: str
 
 
 # ───────────────────────────
-# 즐겨찾기 저장/로드
+# 즐겨찾기 저장/로드 (사용자별, processed/favorites.db — favorites_store.py)
+#   - 사용자 = URL의 ?uid= (없으면 새로 발급해 URL에 붙임 → 북마크하면 유지)
+#   - favorites.json 은 새 사용자에게 채워주는 기본 즐겨찾기
 # ───────────────────────────
-def load_favorites() -> set:
-    try:
-        if FAV_PATH.exists():
-            with open(FAV_PATH, "r", encoding="utf-8") as f:
-                return set(json.load(f))
-    except Exception:
-        pass
-    return set()
+@st.cache_resource(show_spinner=False)
+def get_fav_store():
+    from favorites_store import FavoritesStore
+    return FavoritesStore(FAV_DB_PATH, seed_path=FAV_PATH)
 
 
-def save_favorites(favs: set):
-    FAV_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(FAV_PATH, "w", encoding="utf-8") as f:
-        json.dump(sorted(list(favs)), f, ensure_ascii=False, indent=2)
+def current_user() -> str:
+    uid = st.query_params.get("uid") or st.session_state.get("fav_uid")
+    if not uid or not re.fullmatch(r"[0-9A-Za-z_-]{1,64}", uid):
+        import uuid
+        uid = uuid.uuid4().hex[:12]
+    st.session_state["fav_uid"] = uid
+    if st.query_params.get("uid") != uid:
+        st.query_params["uid"] = uid
+    return uid
+
+
+def user_qs() -> str:
+    """앱 내부 링크에 붙일 사용자/시장 파라미터(새 탭에서도 같은 즐겨찾기·같은 시장)"""
+    qs = f"&uid={quote_plus(st.session_state.get('fav_uid', ''))}"
+    return qs if MARKET == DEFAULT_MARKET else qs + f"&market={MARKET}"
 
 
 def toggle_favorite(code: str):
-    favs = st.session_state.get("favs", set())
-    if code in favs:
-        favs.remove(code)
-    else:
-        favs.add(code)
-    st.session_state["favs"] = favs
-    save_favorites(favs)
+    get_fav_store().toggle(current_user(), code)
+    st.session_state["favs"] = get_fav_store().get(current_user())
 
 
 # ───────────────────────────
-# 📂 데이터 불러오기 (자동 갱신)
+# 📂 데이터 불러오기 (자동 갱신 — mtime 인자가 캐시 키, 밑줄 인자는 해시에서 빠지므로 쓰지 않음)
 # ───────────────────────────
-@st.cache_data(ttl=600)
-def load_data(_data_mtime: float, _map_mtime: float):
-    if not DATA_PATH.exists():
-        raise FileNotFoundError(f"데이터 파일이 없습니다: {DATA_PATH}")
+@st.cache_resource(show_spinner=False)
+def get_lookup(market: str, lookup_mtime: float, map_mtime: float):
+    return load_lookup(proc_dir(market) / LOOKUP_PATH.name)
 
-    df = pd.read_csv(DATA_PATH, parse_dates=["날짜"], encoding="utf-8-sig")
 
-    need_base = {"날짜", "종목명", "매수", "매도", "순매수"}
-    miss_base = need_base - set(df.columns)
-    if miss_base:
-        raise ValueError(f"필수 컬럼 누락: {miss_base}")
+@st.cache_resource(show_spinner=False)
+def get_live(market: str):
+    """
+    데이터 스냅샷 + 백그라운드 감시(live_data.DataWatcher) — 서버 프로세스당 시장별 1개
+    새 거래일은 tail만 읽어 기존 구조에 이어 붙이고, 그 외 변경은 전체 재적재 → 다 만든 뒤 참조만 교체
+    """
+    path = proc_dir(market) / DATA_PATH.name
+    if not path.exists():
+        raise FileNotFoundError(f"데이터 파일이 없습니다: {path}")
+    from live_data import DataWatcher
+    return DataWatcher(path).start()
 
-    for n in (5, 10, 20):
-        col = f"MA{n}"
-        if col not in df.columns:
-            df[col] = (
-                df.groupby("종목명")["순매수"]
-                  .rolling(window=n, min_periods=n)
-                  .mean()
-                  .reset_index(level=0, drop=True)
-            )
 
-    # 네임맵
-    try:
-        if NAME_MAP_PATH.exists():
-            name_map_df = pd.read_csv(NAME_MAP_PATH)
-            if {"영문명", "한글명"} <= set(name_map_df.columns):
-                name_map = dict(zip(name_map_df["영문명"], name_map_df["한글명"]))
-                df["표시명"] = df["종목명"].map(name_map)
-                df["표시명"] = df.apply(
-                    lambda r: f"{r['표시명']} ({r['종목명']})" if pd.notna(r["표시명"]) else r["종목명"],
-                    axis=1,
+@st.cache_resource(show_spinner=False)
+def get_warmer(market: str):
+    """새 스냅샷마다 캐시 예열(warmup.Warmer) — 시장별 1개, 작업 목록은 매 실행 set_jobs(warm_jobs)"""
+    from warmup import Warmer
+    return Warmer()
+
+
+@st.cache_resource(show_spinner=False)
+def get_view_counter():
+    """종목 조회수(processed/views.db) — 예열 대상 순서에 반영"""
+    from warmup import ViewCounter
+    return ViewCounter()
+
+
+@st.cache_resource(show_spinner=False)
+def get_cache_stats():
+    from warmup import CacheStats
+    return CacheStats()
+
+
+_SNAP = None
+
+
+def data_snap():
+    """
+    이번 실행에서 쓸 스냅샷 — 처음 고른 버전을 실행 끝까지 유지(도중에 교체돼도 탭 안에서 버전이 섞이지 않음)
+    .df: 종목ID(int32) 키 프레임(종목명/표시명 컬럼 없음 → 표시할 때만 decode_ids)
+    .fs / .index / .ranks / .history: FeatureStore / SeriesIndex / RankIndex / HistoryFeatures
+    """
+    global _SNAP
+    if _SNAP is None:
+        t = time.perf_counter()
+        _SNAP = get_live(MARKET).current
+        PERF.setdefault("load_data", (time.perf_counter() - t) * 1000)
+    return _SNAP
+
+
+def decode_ids(frame, names=("표시명",)):
+    """종목ID 컬럼 → 표시용 이름 컬럼(표시명/종목명) 추가 (집계 후 결과 행에만 적용)"""
+    ids = frame["종목ID"].to_numpy()
+    for col in names:
+        arr = lookup["disp"] if col == "표시명" else lookup["names"]
+        frame[col] = [arr[i] for i in ids]
+    return frame
+
+
+def get_df():
+    """전체 데이터프레임(필요한 탭에서만 호출 → pandas import/CSV 파싱 지연)"""
+    return data_snap().df
+
+
+# ───────────────────────────
+# 📐 차트 스펙 캐시
+#   - *_spec(...): (차트 종류, 종목/기간, 토글, 시장·데이터 버전)별 Vega-Lite dict 캐시
+#     → 같은 화면 재실행은 Altair 객체 생성/데이터 직렬화 없이 캐시된 스펙만 그림
+#   - 데이터는 쓰는 컬럼만, 반올림해서 넣음(스펙 JSON 크기 ↓)
+#   - 데이터 새 버전마다 인기/즐겨찾기/많이 본 종목의 차트·KPI를 백그라운드에서 같은 키로 미리 계산(warmup.py)
+#     예열 스레드는 이번 실행의 data_snap()을 쓰면 안 되므로 스냅샷을 _snap(해시 제외)으로 넘김
+#   - ?perf=1: cache_<이름>(캐시 포함 전체), <이름>_build / <이름>_serialize(캐시 미스일 때만), 캐시 적중률·예열 상태
+# ───────────────────────────
+_MISS = threading.local()
+
+
+def cache_miss():
+    """캐시 함수 본문에서 호출(스펙 함수는 to_spec이 대신) → 이번 호출은 미스(본문은 미스일 때만 실행됨)"""
+    _MISS.flag = True
+
+
+def to_spec(name: str, chart, t_build: float):
+    """Altair 차트 → Vega-Lite dict (t_build = 빌드 시작 시각, 빌드/직렬화 시간 기록)"""
+    import altair as alt
+
+    cache_miss()
+    t = time.perf_counter()
+    PERF[f"{name}_build"] = (t - t_build) * 1000
+    with alt.data_transformers.disable_max_rows():
+        spec = chart.to_dict()
+    PERF[f"{name}_serialize"] = (time.perf_counter() - t) * 1000
+    return spec
+
+
+def timed_cache(name: str, fn, *args):
+    """캐시 함수 호출 + 소요 시간(캐시 적중이면 거의 0) + 적중/미스 집계"""
+    _MISS.flag = False
+    t = time.perf_counter()
+    out = fn(*args)
+    PERF[f"cache_{name}"] = (time.perf_counter() - t) * 1000
+    get_cache_stats().record(name, not _MISS.flag)
+    return out
+
+
+MAX_COMPARE = 10
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def compare_spec(ids: tuple, start, end, view: str, metric: str, ma_cols: tuple, market: str, data_version: str):
+    """
+    비교 차트 Vega-Lite 스펙 — (종목 세트, 기간, 보기/지표, 시장·데이터 버전)별 캐시
+    데이터는 SeriesIndex로 한 번에 가져와 필요한 컬럼만, 반올림해서 스펙에 넣음
+    """
+    import altair as alt
+
+    t0 = time.perf_counter()
+    cols = ["종목ID", "날짜", "순매수"] + [c for c in ("MA5", "MA10", "MA20") if c == metric or c in ma_cols]
+    data = data_snap().index.take(list(ids), start, end, columns=cols).copy()
+    data = decode_ids(data)
+    data["날짜"] = data["날짜"].dt.strftime("%Y-%m-%d")
+    for c in cols[2:]:
+        data[c] = data[c].round(0)
+    order = [lookup["disp"][i] for i in ids]
+    x_enc = alt.X("날짜:T", title="거래일")
+
+    if view == "겹쳐 보기":
+        if metric == "누적 순매수":
+            data["누적 순매수"] = data.groupby("종목ID")["순매수"].cumsum()
+        base = alt.Chart(data[["날짜", "표시명", metric]])
+        chart = (
+            base.mark_line(point=metric == "순매수", strokeWidth=2)
+            .encode(
+                x=x_enc,
+                y=alt.Y(f"{metric}:Q", title=metric),
+                color=alt.Color("표시명:N", sort=order, legend=alt.Legend(orient="top", columns=2), title=None),
+                tooltip=[
+                    alt.Tooltip("날짜:T", title="날짜"),
+                    alt.Tooltip("표시명:N", title="종목"),
+                    alt.Tooltip(f"{metric}:Q", title=metric, format=",.0f"),
+                ],
+            )
+            .properties(height=520)
+        )
+    else:
+        bar = alt.Chart().mark_bar().encode(
+            x=x_enc,
+            y=alt.Y("순매수:Q", title="순매수, MA"),
+            color=alt.condition("datum.순매수 >= 0", alt.value(COLOR_BUY), alt.value(COLOR_SELL)),
+            tooltip=[alt.Tooltip("날짜:T", title="날짜"), alt.Tooltip("순매수:Q", title="순매수", format=",.0f")],
+        )
+        layers = [bar]
+        if ma_cols:
+            layers.append(
+                alt.Chart().transform_fold(list(ma_cols), as_=["지표", "값"]).mark_line(strokeWidth=1.5).encode(
+                    x=x_enc,
+                    y=alt.Y("값:Q"),
+                    color=alt.Color(
+                        "지표:N",
+                        scale=alt.Scale(domain=list(MA_COLOR_MAP), range=list(MA_COLOR_MAP.values())),
+                        legend=alt.Legend(orient="top"), title=None,
+                    ),
                 )
-            else:
-                df["표시명"] = df["종목명"]
-        else:
-            df["표시명"] = df["종목명"]
-    except Exception:
-        df["표시명"] = df["종목명"]
+            )
+        chart = (
+            alt.layer(*layers, data=data)
+            .properties(height=150)
+            .facet(row=alt.Row("표시명:N", sort=order, title=None, header=alt.Header(labelAngle=0, labelAlign="left")))
+            .resolve_scale(y="independent")
+        )
+
+    return to_spec("compare", chart, t0)
+
+
+def net_ma_chart(ma_cols, label: str, y_title: str = "순매수, MA", value_title: str = "순매수"):
+    """
+    순매수 막대(+/− 색) + MA 선 레이어(데이터는 호출 쪽에서 붙임) — x = 날짜 문자열(등장일만)
+    MA 선은 melt 대신 transform_fold(같은 데이터셋), label = 툴팁 종목/그룹 이름
+    """
+    import altair as alt
+
+    x_enc = alt.X("날짜:N", title="거래일", sort=None)
+    date_tip = alt.Tooltip("날짜:T", title="날짜")
+    bar = (
+        alt.Chart()
+        .mark_bar()
+        .transform_calculate(표시명=json.dumps(label, ensure_ascii=False))
+        .encode(
+            x=x_enc,
+            y=alt.Y("순매수:Q", title=y_title),
+            color=alt.condition("datum.순매수 >= 0", alt.value(COLOR_BUY), alt.value(COLOR_SELL)),
+            tooltip=[
+                date_tip,
+                alt.Tooltip("표시명:N", title="종목"),
+                alt.Tooltip("순매수:Q", title=value_title, format=",.0f"),
+            ],
+        )
+    )
+    layers = [bar]
+    if ma_cols:
+        # ✅ MA 색상 강제(도메인/레인지)
+        layers.append(
+            alt.Chart()
+            .transform_fold(list(ma_cols), as_=["지표", "값"])
+            .mark_line(strokeWidth=2)
+            .encode(
+                x=x_enc,
+                y=alt.Y("값:Q"),
+                color=alt.Color(
+                    "지표:N",
+                    scale=alt.Scale(domain=list(MA_COLOR_MAP.keys()), range=list(MA_COLOR_MAP.values())),
+                    sort=["MA5", "MA10", "MA20"],
+                    legend=alt.Legend(orient="top-right"),
+                    title=None,
+                ),
+                tooltip=[date_tip, alt.Tooltip("지표:N"), alt.Tooltip("값:Q", title="값", format=",.0f")],
+            )
+        )
+    return alt.layer(*layers).resolve_scale(y="shared").properties(height=520)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def chart_spec(stock_id: int, start, end, ma_cols: tuple, rank_on: bool, market: str, data_version: str,
+               _snap=None):
+    """
+    종목 차트(순매수 막대 + MA 선 + 순위 궤적) 스펙 — (종목, 기간, MA/순위 토글, 시장·데이터 버전)별 캐시
+    순위는 같은 표의 컬럼 → 데이터셋 하나만 직렬화
+    """
+    import altair as alt
+    import pandas as pd
+
+    t0 = time.perf_counter()
+    snap = _snap or data_snap()
+    data = snap.index.take([stock_id], start, end, columns=["날짜", "순매수", *ma_cols]).copy()
+    for c in ["순매수", *ma_cols]:
+        data[c] = data[c].round(0)
+    if rank_on:
+        # TOP50 순위 궤적: 막대 차트와 같은 x(등장일), 권외 날은 끊김
+        days, rk = snap.ranks.series(stock_id, start, end)
+        data["순위"] = pd.Series(rk, index=days).reindex(data["날짜"]).to_numpy()
+    data["날짜"] = data["날짜"].dt.strftime("%Y-%m-%d")
+
+    chart = net_ma_chart(ma_cols, lookup["disp"][stock_id])
+    if rank_on:
+        rank_chart = (
+            alt.Chart()
+            .mark_line(point=True, color="#7f7f7f", strokeWidth=1.5)
+            .encode(
+                x=alt.X("날짜:N", title="거래일", sort=None),
+                y=alt.Y("순위:Q", title="TOP50 순위", scale=alt.Scale(domain=[50, 1])),
+                tooltip=[alt.Tooltip("날짜:T", title="날짜"), alt.Tooltip("순위:Q", title="순위")],
+            )
+            .properties(height=160)
+        )
+        chart = alt.vconcat(chart, rank_chart, data=data).resolve_scale(x="shared")
+    else:
+        chart.data = data
+
+    return to_spec("chart", chart, t0)
+
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def chart_kpis(stock_id: int, start, end, market: str, data_version: str, _snap=None):
+    """종목 기간 합계(등장일수, 매수/매도/순매수) + 마지막 등장일 순위·변화 — (종목, 기간, 시장·데이터 버전)별 캐시"""
+    cache_miss()
+    snap = _snap or data_snap()
+    data = snap.index.take([stock_id], start, end, columns=["날짜", "매수", "매도", "순매수", "순위", "순위변화"])
+    kpi = {"일수": len(data), "매수": float(data["매수"].sum()), "매도": float(data["매도"].sum()),
+           "순매수": float(data["순매수"].sum()), "최근": None}
+    if len(data):
+        last = data.iloc[-1]
+        if last["순위"] == last["순위"]:                 # NaN = 권외
+            delta = last["순위변화"]
+            kpi["최근"] = (last["날짜"].date(), int(last["순위"]), None if delta != delta else int(delta))
+    return kpi
+
+
+@st.cache_resource(show_spinner=False)
+def get_groups(market: str, daily_mtime: float, groups_mtime: float, _name_to_id: dict):
+    """테마/기초자산 그룹 합계(enrich 산출물 group_daily.csv) → GroupRollup, 없으면 None"""
+    from groups import GroupRollup
+    return GroupRollup.load(proc_dir(market) / GROUP_DAILY_PATH.name, GROUPS_PATH, _name_to_id)
+
+
+def group_rollup():
+    return get_groups(MARKET, get_mtime(GROUP_DAILY_PATH), get_mtime(GROUPS_PATH), lookup["name_to_id"])
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def group_chart_spec(group: str, start, end, ma_cols: tuple, adjusted: bool, market: str, groups_version: float):
+    """그룹 차트 스펙 — (그룹, 기간, MA 토글, 배율 환산 여부, 시장·그룹 파일 버전)별 캐시"""
+    t0 = time.perf_counter()
+    pre = "환산" if adjusted else ""
+    cols = [f"{pre}순매수"] + [f"{pre}{c}" for c in ma_cols]
+    data = group_rollup().series(group, start, end, columns=["날짜", *cols]).copy()
+    data.columns = ["날짜", "순매수", *ma_cols]
+    data["날짜"] = data["날짜"].dt.strftime("%Y-%m-%d")
+
+    chart = net_ma_chart(ma_cols, group,
+                         y_title="배율 환산 순매수, MA" if adjusted else "순매수, MA",
+                         value_title="환산 순매수" if adjusted else "순매수")
+    chart.data = data
+    return to_spec("group_chart", chart, t0)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def top_spec(start, end, market: str, data_version: str, _snap=None):
+    """인기 TOP50(등장일수) 막대 스펙 — (기간, 시장·데이터 버전)별 캐시, 기간에 데이터가 없으면 None"""
+    import altair as alt
+
+    t0 = time.perf_counter()
+    df = (_snap or data_snap()).df
+    d = df["날짜"].dt.date
+    df_period = df.loc[(d >= start) & (d <= end), ["종목ID", "날짜"]]
+    if df_period.empty:
+        cache_miss()
+        return None
+    n_days = df_period["날짜"].nunique()
+    hits = (
+        df_period
+        .groupby("종목ID")["날짜"].nunique()
+        .reset_index(name="등장일수")
+        .sort_values("등장일수", ascending=False)
+        .head(50)
+    )
+    hits = decode_ids(hits)
+    hits["커버리지(%)"] = (hits["등장일수"] / n_days * 100).round(1)
+
+    chart_top = (
+        alt.Chart(hits[["표시명", "등장일수", "커버리지(%)"]])
+        .mark_bar(color=COLOR_TOP50_BAR)
+        .encode(
+            x=alt.X("등장일수:Q", title="등장 일수"),
+            y=alt.Y(
+                "표시명:N", sort="-x",
+                axis=alt.Axis(labelOverlap=False, labelLimit=2000, labelFontSize=11)
+            ),
+            tooltip=["표시명:N", "등장일수:Q", "커버리지(%):Q"],
+        )
+        .properties(height=1200)
+    )
+    return to_spec("top", chart_top, t0)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def rank_spec(start, end, mode: str, market: str, data_version: str, _snap=None):
+    """순매수/순매도 상위 50 막대 스펙 — (기간, 보기, 시장·데이터 버전)별 캐시"""
+    import altair as alt
+
+    t0 = time.perf_counter()
+    snap = _snap or data_snap()
+    df = snap.df
+    d = df["날짜"].dt.date
+    period_df = df.loc[(d >= start) & (d <= end), ["종목ID", "매수", "매도", "순매수"]]
+
+    agg = (
+        period_df
+        .groupby("종목ID", as_index=False)[["매수", "매도", "순매수"]]
+        .sum()
+        .rename(columns={"매수":"매수합계","매도":"매도합계"})
+    )
+
+    if mode == "순매도 상위":
+        agg["순매도합계"] = -agg["순매수"]
+        plot_df = decode_ids(agg[agg["순매도합계"] > 0].sort_values("순매도합계", ascending=False).head(50))
+        value_col, value_title = "순매도합계", "순매도"
+        x_title = "순매도 합계 (USD)"
+    else:
+        plot_df = decode_ids(agg[agg["순매수"] > 0].sort_values("순매수", ascending=False).head(50))
+        value_col, value_title = "순매수", "순매수"
+        x_title = "순매수 합계 (USD)"
+
+    # 종료일 당일 TOP50 순위(인덱스 O(1) 조회, 권외는 빈 값)
+    ri = snap.ranks
+    plot_df["종료일순위"] = [ri.rank(int(i), end) for i in plot_df["종목ID"]]
+    plot_df = plot_df[["표시명", value_col, "매수합계", "매도합계", "종료일순위"]].round(
+        {value_col: 0, "매수합계": 0, "매도합계": 0})
+
+    chart_rank = (
+        alt.Chart(plot_df)
+        .mark_bar(color=COLOR_RANK_BAR)
+        .encode(
+            x=alt.X(f"{value_col}:Q", title=x_title, scale=alt.Scale(domainMin=0, nice=True)),
+            y=alt.Y("표시명:N", sort="-x", title=None,
+                    axis=alt.Axis(labelLimit=2500, labelFontSize=11)),
+            tooltip=[
+                "표시명:N",
+                alt.Tooltip(f"{value_col}:Q", title=value_title, format=",.0f"),
+                alt.Tooltip("매수합계:Q", title="매수", format=",.0f"),
+                alt.Tooltip("매도합계:Q", title="매도", format=",.0f"),
+                alt.Tooltip("종료일순위:Q", title=f"{end} 순위"),
+            ],
+        )
+        .properties(height=1200)
+    )
+    return to_spec("rank", chart_rank, t0)
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def group_rank_spec(start, end, mode: str, adjusted: bool, market: str, groups_version: float):
+    """그룹 순매수/순매도 막대 스펙 — 기간 합계는 GroupRollup 누적합 차(O(그룹 수)), groupby 없음"""
+    import altair as alt
+
+    t0 = time.perf_counter()
+    tot = group_rollup().totals(start, end)
+    net = "환산순매수" if adjusted else "순매수"
+    sign = -1 if mode == "순매도 상위" else 1
+    tot["값"] = sign * tot[net]
+    plot_df = tot[tot["값"] > 0].sort_values("값", ascending=False)
+    word = "순매도" if sign < 0 else "순매수"
+    title = f"{'배율 환산 ' if adjusted else ''}{word} 합계 (USD)"
+
+    chart = (
+        alt.Chart(plot_df[["그룹", "값", "매수", "매도", "순매수", "환산순매수", "등장일수"]])
+        .mark_bar(color=COLOR_RANK_BAR)
+        .encode(
+            x=alt.X("값:Q", title=title, scale=alt.Scale(domainMin=0, nice=True)),
+            y=alt.Y("그룹:N", sort="-x", title=None, axis=alt.Axis(labelFontSize=12)),
+            tooltip=[
+                "그룹:N",
+                alt.Tooltip("값:Q", title=word, format=",.0f"),
+                alt.Tooltip("매수:Q", title="매수", format=",.0f"),
+                alt.Tooltip("매도:Q", title="매도", format=",.0f"),
+                alt.Tooltip("순매수:Q", title="순매수", format=",.0f"),
+                alt.Tooltip("환산순매수:Q", title="배율 환산 순매수", format=",.0f"),
+                alt.Tooltip("등장일수:Q", title="등장일수"),
+            ],
+        )
+        .properties(height=max(240, 28 * len(plot_df)))
+    )
+    return to_spec("group_rank", chart, t0)
+
+
+# ───────────────────────────
+# 📥 내보내기 (export.py: CSV / Parquet / XLSX)
+#   - 파일은 다운로드 버튼을 누를 때 별도 스레드에서 생성(재실행마다 만들지 않음) → 이번 실행의 값만 캡처
+#   - 원본 이력은 SeriesIndex 종목 구간을 청크로 흘려 씀(전 종목 × 여러 해여도 전체 복사본 없음)
+# ───────────────────────────
+def export_buttons(key: str, make_chunks, n_rows: int, file_stem: str, label: str = "형식"):
+    """형식 선택 + 다운로드 버튼 (make_chunks() → DataFrame 청크 이터레이터)"""
+    from export import EXPORT_FORMATS, XLSX_MAX_ROWS, available_formats, export_bytes
+
+    c_fmt, c_btn = st.columns([2, 1])
+    with c_fmt:
+        fmt = st.radio(label, available_formats(), horizontal=True, key=f"{key}_fmt")
+    ext, mime = EXPORT_FORMATS[fmt]
+    too_big = fmt == "XLSX" and n_rows > XLSX_MAX_ROWS
+    stem = re.sub(r"[^\w.-]+", "_", file_stem).strip("_")
+    with c_btn:
+        st.download_button(
+            f"📥 {n_rows:,}행 받기", data=lambda: export_bytes(fmt, make_chunks()),
+            file_name=f"{stem}.{ext}", mime=mime, key=f"{key}_dl", on_click="ignore",
+            disabled=not n_rows or too_big,
+        )
+    if too_big:
+        st.caption(f"XLSX는 최대 {XLSX_MAX_ROWS:,}행 — CSV/Parquet으로 받으세요")
+
+
+def table_export(key: str, table, file_stem: str):
+    """이미 만든 결과 표 내보내기"""
+    from export import frame_chunks
+
+    export_buttons(key, lambda: frame_chunks(table), len(table), file_stem)
+
+
+def history_export(key: str, snap, ids, start, end, file_stem: str):
+    """종목들 × [start, end] 원본 일별 이력(지표·순위 포함) 내보내기"""
+    from export import history_chunks
+
+    names, disp = lookup["names"], lookup["disp"]
+    export_buttons(key, lambda: history_chunks(snap.index, ids, start, end, names, disp),
+                   snap.index.count(ids, start, end), file_stem)
+
+
+def rank_table(snap, start, end, mode: str):
+    """순위 탭 결과 전체(점수 > 0 종목, 내림차순 — 차트는 상위 50) — FeatureStore 누적합 차분 O(종목)"""
+    import numpy as np
+    import pandas as pd
+
+    fs = snap.fs
+    buy, sell, net = (fs.range_sum(c, start, end) for c in ("매수", "매도", "순매수"))
+    sell_mode = mode == "순매도 상위"
+    score = -net if sell_mode else net
+    idx = np.flatnonzero(score > 0)
+    idx = idx[np.argsort(-score[idx], kind="stable")]
+    out = decode_ids(pd.DataFrame({"순위": np.arange(1, len(idx) + 1), "종목ID": fs.stock_ids[idx]}), ("종목명", "표시명"))
+    out["순매도합계" if sell_mode else "순매수"] = score[idx].round(0)
+    out["매수합계"] = buy[idx].round(0)
+    out["매도합계"] = sell[idx].round(0)
+    out["종료일순위"] = [snap.ranks.rank(int(i), end) for i in out["종목ID"]]
+    return out
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_corr_top(market: str, corr_mtime: float, data_mtime: float):
+    """
+    종목별 상위 동조/역동조(enrich 단계 산출물). 파일이 없으면 현재 데이터로 한 번 계산.
+    → {(종목ID, 창, 방향): [(상대종목ID, 상관계수), ...]}
+    """
+    import pandas as pd
+
+    path = proc_dir(market) / CORR_TOP_PATH.name
+    if path.exists() and corr_mtime >= data_mtime:
+        top = pd.read_csv(path, encoding="utf-8-sig")
+    else:
+        from correlation import update_state
+        state, _ = update_state(get_df())
+        top = pd.concat([rc.top_table() for rc in state.values()], ignore_index=True)
+
+    top = top.sort_values(["종목ID", "창", "방향", "순위"])
+    out = {}
+    for (sid, w, d), g in top.groupby(["종목ID", "창", "방향"], sort=False):
+        out[(int(sid), int(w), d)] = list(zip(g["상대종목ID"].tolist(), g["상관계수"].tolist()))
+    return out
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def load_spikes(market: str, spikes_mtime: float, data_mtime: float):
+    """이상 급증 이벤트(enrich 단계 산출물, 최신 날짜·|점수| 순). 파일이 없거나 오래됐으면 현재 데이터로 한 번 계산."""
+    import spikes
+
+    path = proc_dir(market) / SPIKES_PATH.name
+    if path.exists() and spikes_mtime >= data_mtime:
+        return spikes.load_spikes(path)
+    return spikes.detect(get_df())
 
-    return df.sort_values(["종목명", "날짜"])
 
+@st.cache_data(show_spinner=False, max_entries=32)
+def run_backtest(spec_json: str, horizon: int, market: str, data_version: str):
+    """조건 세트(JSON) × horizon × 시장·데이터 버전별 백테스트 결과 캐시"""
+    from filter_engine import backtest
+    return backtest(data_snap().history, json.loads(spec_json), horizon)
 
-df = load_data(get_mtime(DATA_PATH), get_mtime(NAME_MAP_PATH))
 
-if "favs" not in st.session_state:
-    st.session_state["favs"] = load_favorites()
+lookup = get_lookup(MARKET, get_mtime(MARKET_DIR / LOOKUP_PATH.name), get_mtime(NAME_MAP_PATH))
+perf_mark("lookup")
+
+if "favs" not in st.session_state or st.session_state.get("fav_uid") != st.query_params.get("uid"):
+    st.session_state["favs"] = get_fav_store().get(current_user())
 
 qp = st.query_params
 
-min_date = df["날짜"].min().date()
-max_date = df["날짜"].max().date()
-default_start = max(min_date, pd.to_datetime("2025-01-01").date())
+min_date, max_date = date_bounds(lookup)
+if min_date is None:
+    # lookup.pkl에 거래일이 없으면(최초 실행 등) 데이터에서 직접
+    _days = get_df()["날짜"]
+    min_date, max_date = _days.min().date(), _days.max().date()
+default_start = max(min_date, date(2025, 1, 1))
 default_end   = max_date
 
 
@@ -224,13 +784,11 @@ def _set_rank_slider(value_tuple):
     st.session_state["rank_range_slider"] = value_tuple
 
 
-def compute_last_n_trading_days(stock: str, n: int):
-    if not stock:
+def compute_last_n_trading_days(stock_id: int, n: int):
+    if stock_id is None:
         return
-    dts = (
-        df.loc[df["종목명"] == stock, "날짜"]
-          .dt.date.drop_duplicates().sort_values().tolist()
-    )
+    get_df()
+    dts = data_snap().index.take([stock_id])["날짜"].dt.date.tolist()
     if not dts:
         _set_date_slider((default_start, default_end))
         return
@@ -239,33 +797,132 @@ def compute_last_n_trading_days(stock: str, n: int):
     _set_date_slider((start, end))
 
 
+def compute_last_n_group_days(group: str, n: int):
+    dts = group_rollup().series(group, columns=["날짜"])["날짜"].dt.date.tolist()
+    if not dts:
+        _set_date_slider((default_start, default_end))
+        return
+    _set_date_slider((dts[-n] if len(dts) >= n else dts[0], dts[-1]))
+
+
+def chart_unit_radio():
+    """종목별 차트 ↔ 그룹(테마/기초자산) 차트 전환 — 그룹 파일이 있는 시장만"""
+    if group_rollup() is not None:
+        st.radio("단위", ["종목", "그룹"], horizontal=True, key="chart_unit", label_visibility="collapsed")
+
+
 # ───────────────────────────
-# TAB 5개
+# 탭 (선택된 탭만 실행 — st.tabs는 모든 탭을 매번 계산하므로 세그먼트 컨트롤 사용)
 # ───────────────────────────
-tab_names = ["📈 종목별 차트", "🏆 인기 종목 TOP50", "📊 순매수·순매도 순위", "🧪 조건 필터", "📘 소개/가이드"]
-t_chart, t_top, t_rank, t_filter, t_guide = st.tabs(tab_names)
+TABS = {
+    "chart":  "📈 종목별 차트",
+    "compare": "🆚 종목 비교",
+    "top":    "🏆 인기 종목 TOP50",
+    "rank":   "📊 순매수·순매도 순위",
+    "filter": "🧪 조건 필터",
+    "corr":   "🔗 동조 종목",
+    "spike":  "🚨 이상 급증",
+    "guide":  "📘 소개/가이드",
+}
+
+if "nav_tab" not in st.session_state:
+    st.session_state["nav_tab"] = qp.get("tab") if qp.get("tab") in TABS else "chart"
+
+
+def _on_tab_change():
+    # 같은 탭을 다시 눌러 선택 해제(None)되면 직전 탭 유지
+    if st.session_state.get("nav_tab") is None:
+        st.session_state["nav_tab"] = st.session_state.get("nav_tab_last", "chart")
+    st.session_state["nav_tab_last"] = st.session_state["nav_tab"]
+    st.query_params["tab"] = st.session_state["nav_tab"]
+
+
+_markets = available_markets()
+if len(_markets) > 1:
+    _c_tab, _c_mkt = st.columns([6, 1])
+    with _c_mkt:
+        st.selectbox("시장", _markets, format_func=lambda m: MARKETS[m][0], key="market",
+                     on_change=_on_market_change, label_visibility="collapsed")
+else:
+    _c_tab = st.container()
+
+with _c_tab:
+    tab = st.segmented_control(
+        "탭", list(TABS), format_func=TABS.get, key="nav_tab",
+        on_change=_on_tab_change, label_visibility="collapsed",
+    ) or "chart"
 
 # ───────────────────────────
 # 1) 📈 종목별 차트
 # ───────────────────────────
-with t_chart:
-    st.markdown("### 📊 종목별 순매수 추이")
+if tab == "chart" and st.session_state.get("chart_unit") == "그룹" and group_rollup() is not None:
+    st.markdown("### 🧺 그룹별 순매수 추이 (기초자산 + 레버리지·인버스 ETF)")
+    chart_unit_radio()
+    perf_mark("first_paint")
+
+    gr = group_rollup()
+    group = st.selectbox("그룹", gr.groups, key="group_select_chart")
+    members = gr.group_members(group)
+    with st.expander(f"구성 종목 {len(members)}개 · 배율"):
+        st.dataframe(
+            {"종목": [lookup["disp"][i] for i, _ in members], "배율": [f for _, f in members]},
+            hide_index=True, use_container_width=True,
+        )
+
+    if "range_value" not in st.session_state:
+        _set_date_slider((default_start, default_end))
 
-    stocks_disp = sorted(df["표시명"].dropna().unique().tolist())
-    code_to_disp = (
-        df[["종목명", "표시명"]]
-        .drop_duplicates(subset=["종목명"])
-        .set_index("종목명")["표시명"]
-        .to_dict()
+    Toggle = getattr(st, "toggle", st.checkbox)
+    col1, col2, col3, col4, spacer, col5, col6, col7 = st.columns([1, 1, 1, 1, 3, 1, 1, 1])
+    with col1:  st.button("1주 (5일)",     key="btn_5",   on_click=compute_last_n_group_days, args=(group, 5))
+    with col2:  st.button("1개월 (20일)",  key="btn_20",  on_click=compute_last_n_group_days, args=(group, 20))
+    with col3:  st.button("3개월 (60일)",  key="btn_60",  on_click=compute_last_n_group_days, args=(group, 60))
+    with col4:  st.button("6개월 (120일)", key="btn_120", on_click=compute_last_n_group_days, args=(group, 120))
+
+    with col5:  adjusted = Toggle("배율 환산", value=True, key="tg_adj_group")
+    with col6:  ma5_on  = Toggle("MA5",  value=False, key="tg_ma5_chart")
+    with col7:  ma10_on = Toggle("MA10", value=True,  key="tg_ma10_chart")
+    with spacer: ma20_on = Toggle("MA20", value=True,  key="tg_ma20_chart")
+
+    date_range = st.slider(
+        "기간 선택", min_value=min_date, max_value=max_date,
+        value=st.session_state["range_value"], key="range_slider", format="YYYY-MM-DD",
     )
-    disp_to_code = {v: k for k, v in code_to_disp.items()}
+
+    tot = gr.totals(date_range[0], date_range[1]).set_index("그룹")
+    if group not in tot.index:
+        st.warning("선택한 그룹/기간의 데이터가 없습니다.")
+    else:
+        row = tot.loc[group]
+        k1, k2, k3, k4 = st.columns(4)
+        k1.metric("총 매수(USD)", fmt_usd(row["매수"]))
+        k2.metric("총 매도(USD)", fmt_usd(row["매도"]))
+        k3.metric("총 순매수(USD)", fmt_usd(row["순매수"]))
+        k4.metric("배율 환산 순매수(USD)", fmt_usd(row["환산순매수"]))
+
+        ma_cols = tuple(c for c, on in (("MA5", ma5_on), ("MA10", ma10_on), ("MA20", ma20_on)) if on)
+        spec = timed_cache("group_chart", group_chart_spec, group, date_range[0], date_range[1], ma_cols,
+                          bool(adjusted), MARKET, get_mtime(GROUP_DAILY_PATH))
+        st.vega_lite_chart(spec, use_container_width=True)
+        st.caption(f"{int(row['등장일수'])}일 등장 · 배율 환산 = Σ 배율 × 순매수 (2배 ETF 1달러 = 기초자산 2달러, "
+                   f"인버스 매수는 기초자산 매도 방향) · 구성/배율: {GROUPS_PATH.name}")
+
+elif tab == "chart":
+    st.markdown("### 📊 종목별 순매수 추이")
+    chart_unit_radio()
+
+    stocks_disp = lookup["stocks_disp"]
+    id_to_name = lookup["names"]
+    id_to_disp = lookup["disp"]
+    name_to_id = lookup["name_to_id"]
+    disp_to_id = lookup["disp_to_id"]
 
     PLACEHOLDER = "🔎 종목을 선택하세요"
     stocks_disp_with_placeholder = [PLACEHOLDER] + stocks_disp
 
     stock_param = qp.get("stock")
-    if stock_param and stock_param in code_to_disp:
-        preselect_disp = code_to_disp[stock_param]
+    if stock_param and stock_param in name_to_id:
+        preselect_disp = id_to_disp[name_to_id[stock_param]]
         default_idx = stocks_disp_with_placeholder.index(preselect_disp) if preselect_disp in stocks_disp_with_placeholder else 0
     else:
         default_idx = 0
@@ -292,25 +949,36 @@ with t_chart:
     with right:
         st.markdown("**⭐ 즐겨찾기**")
         favs: set = st.session_state.get("favs", set())
-        fav_disp_list = sorted([code_to_disp[c] for c in favs if c in code_to_disp])
+        fav_disp_list = sorted({id_to_disp[name_to_id[c]] for c in favs if c in name_to_id})
         fav_disp_list = ["(선택)"] + fav_disp_list if fav_disp_list else ["(즐겨찾기 없음)"]
 
         pick = st.selectbox("즐겨찾기 바로가기", fav_disp_list, key="fav_jump_chart")
         if pick and pick not in ("(선택)", "(즐겨찾기 없음)"):
             sel_disp = pick
 
-        cur_code = disp_to_code.get(sel_disp, sel_disp) if sel_disp != PLACEHOLDER else None
-        is_fav = (cur_code in favs) if cur_code else False
+        cur_id = disp_to_id.get(sel_disp) if sel_disp != PLACEHOLDER else None
+        cur_code = id_to_name[cur_id] if cur_id is not None else None
+        # 즐겨찾기에 별칭(합병/분할 전 이름)으로 저장돼 있어도 같은 종목으로 취급
+        fav_name = next((c for c in favs if cur_id is not None and name_to_id.get(c) == cur_id), None)
+        is_fav = fav_name is not None
         star_label = "⭐ 즐겨찾기 취소" if is_fav else "☆ 즐겨찾기 추가"
         btn_disabled = (cur_code is None)
 
         if st.button(star_label, key="fav_toggle_btn_chart", disabled=btn_disabled):
-            toggle_favorite(cur_code)
+            toggle_favorite(fav_name or cur_code)
+
+    perf_mark("first_paint")
 
     if sel_disp == PLACEHOLDER or not sel_disp:
         st.info("종목을 선택하여 해당 종목의 순매수,순매도 흐름을 확인하세요!")
     else:
-        sel_stock = disp_to_code.get(sel_disp, sel_disp)
+        get_df()
+        sel_id = disp_to_id.get(sel_disp)
+        sel_stock = id_to_name[sel_id] if sel_id is not None else sel_disp
+        if sel_id is not None and st.session_state.get("viewed_stock") != (MARKET, sel_id):
+            # 종목을 바꿀 때만 1회(토글/기간 조작 재실행은 제외)
+            st.session_state["viewed_stock"] = (MARKET, sel_id)
+            get_view_counter().hit(MARKET, sel_stock)
 
         if "range_value" not in st.session_state:
             _set_date_slider((default_start, default_end))
@@ -318,12 +986,12 @@ with t_chart:
         Toggle = getattr(st, "toggle", st.checkbox)
 
         col1, col2, col3, col4, spacer, col5, col6, col7 = st.columns([1, 1, 1, 1, 3, 1, 1, 1])
-        with col1:  st.button("1주 (5일)",     key="btn_5",   on_click=compute_last_n_trading_days, args=(sel_stock, 5))
-        with col2:  st.button("1개월 (20일)",  key="btn_20",  on_click=compute_last_n_trading_days, args=(sel_stock, 20))
-        with col3:  st.button("3개월 (60일)",  key="btn_60",  on_click=compute_last_n_trading_days, args=(sel_stock, 60))
-        with col4:  st.button("6개월 (120일)", key="btn_120", on_click=compute_last_n_trading_days, args=(sel_stock, 120))
+        with col1:  st.button("1주 (5일)",     key="btn_5",   on_click=compute_last_n_trading_days, args=(sel_id, 5))
+        with col2:  st.button("1개월 (20일)",  key="btn_20",  on_click=compute_last_n_trading_days, args=(sel_id, 20))
+        with col3:  st.button("3개월 (60일)",  key="btn_60",  on_click=compute_last_n_trading_days, args=(sel_id, 60))
+        with col4:  st.button("6개월 (120일)", key="btn_120", on_click=compute_last_n_trading_days, args=(sel_id, 120))
 
-        with col5:  st.write("**지표**")
+        with col5:  rank_on = Toggle("순위", value=True, key="tg_rank_chart")
         with col6:  ma5_on  = Toggle("MA5",  value=False, key="tg_ma5_chart")
         with col7:  ma10_on = Toggle("MA10", value=True,  key="tg_ma10_chart")
         with spacer: ma20_on = Toggle("MA20", value=True,  key="tg_ma20_chart")
@@ -333,14 +1001,8 @@ with t_chart:
             value=st.session_state["range_value"], key="range_slider", format="YYYY-MM-DD",
         )
 
-        dcount = int(
-            df.loc[
-                (df["종목명"] == sel_stock)
-                & (df["날짜"].dt.date >= date_range[0])
-                & (df["날짜"].dt.date <= date_range[1]),
-                "날짜"
-            ].dt.date.nunique()
-        )
+        kpi = timed_cache("kpi", chart_kpis, sel_id, date_range[0], date_range[1], MARKET, data_snap().version)
+        dcount = kpi["일수"]
         st.markdown(
             f"<div style='text-align:center; color:#666; margin:-6px 0 8px;'>"
             f"<strong>기간 합계</strong> ({date_range[0]} ~ {date_range[1]}, {dcount}일)"
@@ -348,14 +1010,7 @@ with t_chart:
             unsafe_allow_html=True
         )
 
-        mask = (
-            (df["종목명"] == sel_stock)
-            & (df["날짜"].dt.date >= date_range[0])
-            & (df["날짜"].dt.date <= date_range[1])
-        )
-        data = df.loc[mask].copy().sort_values("날짜")
-
-        if data.empty:
+        if not dcount:
             st.warning("선택한 종목/기간의 데이터가 없습니다.")
         else:
             mid_l, mid_c, mid_r = st.columns([1, 2, 1])
@@ -363,9 +1018,7 @@ with t_chart:
                 logo_path = find_logo_path(sel_stock)
                 render_title_line(logo_path, sel_disp, size=86, align="center")
 
-            total_buy  = float(data["매수"].sum())
-            total_sell = float(data["매도"].sum())
-            total_net  = float(data["순매수"].sum())
+            total_buy, total_sell, total_net = kpi["매수"], kpi["매도"], kpi["순매수"]
             ratio = (total_buy / total_sell) if total_sell != 0 else None
 
             st.markdown("""
@@ -398,113 +1051,110 @@ with t_chart:
             </div>
             """, unsafe_allow_html=True)
 
-            data["날짜_str"] = data["날짜"].dt.strftime("%Y-%m-%d")
-            x_enc = alt.X("날짜_str:N", title="거래일", sort=None)
-
-            bar = (
-                alt.Chart(data)
-                .mark_bar()
-                .encode(
-                    x=x_enc,
-                    y=alt.Y("순매수:Q", title="순매수, MA"),
-                    color=alt.condition(
-                        "datum.순매수 >= 0",
-                        alt.value(COLOR_BUY),
-                        alt.value(COLOR_SELL),
-                    ),
-                    tooltip=[
-                        alt.Tooltip("날짜:T", title="날짜"),
-                        alt.Tooltip("표시명:N", title="종목"),
-                        alt.Tooltip("순매수:Q", title="순매수", format=",.0f"),
-                    ],
-                )
-            )
-
             ma_cols = []
             if ma5_on:  ma_cols.append("MA5")
             if ma10_on: ma_cols.append("MA10")
             if ma20_on: ma_cols.append("MA20")
 
-            layers = [bar]
-            if ma_cols:
-                lines_df = data.melt(
-                    id_vars=["날짜", "날짜_str"],
-                    value_vars=ma_cols,
-                    var_name="지표",
-                    value_name="값",
-                )
+            if rank_on and kpi["최근"]:
+                last_day, last_rank, delta = kpi["최근"]
+                arrow = "" if not delta else (f" ▲{delta}" if delta > 0 else f" ▼{-delta}")
+                st.caption(f"최근 등장({last_day}) 순위: **{last_rank}위**{arrow} (직전 등장일 대비)")
+
+            spec = timed_cache("chart", chart_spec, sel_id, date_range[0], date_range[1], tuple(ma_cols),
+                              bool(rank_on), MARKET, data_snap().version)
+            st.vega_lite_chart(spec, use_container_width=True)
+
+            with st.expander("📥 원본 이력 내보내기"):
+                history_export("x_chart", data_snap(), [sel_id], date_range[0], date_range[1],
+                               f"{sel_stock}_{date_range[0]}_{date_range[1]}")
 
-                # ✅ MA 색상 강제(도메인/레인지)
-                line = (
-                    alt.Chart(lines_df)
-                    .mark_line(strokeWidth=2)
-                    .encode(
-                        x=x_enc,
-                        y=alt.Y("값:Q"),
-                        color=alt.Color(
-                            "지표:N",
-                            scale=alt.Scale(
-                                domain=list(MA_COLOR_MAP.keys()),
-                                range=list(MA_COLOR_MAP.values()),
-                            ),
-                            sort=["MA5", "MA10", "MA20"],
-                            legend=alt.Legend(orient="top-right"),
-                            title=None,
-                        ),
-                        tooltip=[
-                            alt.Tooltip("날짜:T", title="날짜"),
-                            alt.Tooltip("지표:N"),
-                            alt.Tooltip("값:Q", title="값", format=",.0f"),
-                        ],
-                    )
-                )
-                layers.append(line)
 
-            chart = alt.layer(*layers).resolve_scale(y="shared").properties(height=520)
-            st.altair_chart(chart, use_container_width=True)
+# ───────────────────────────
+# 1-2) 🆚 종목 비교 (최대 10개 겹쳐 보기/작은 차트)
+# ───────────────────────────
+elif tab == "compare":
+    st.markdown("### 🆚 종목 비교")
+
+    id_to_disp = lookup["disp"]
+    disp_to_id = lookup["disp_to_id"]
+    present = set(lookup["stock_ids"])
+
+    # ?cmp=종목ID,종목ID,... 로 공유/북마크
+    pre = []
+    for tok in (qp.get("cmp") or "").split(","):
+        if tok.strip().isdigit() and int(tok) in present:
+            pre.append(id_to_disp[int(tok)])
+    picks = st.multiselect(
+        f"비교할 종목 (최대 {MAX_COMPARE}개)", lookup["stocks_disp"], default=pre[:MAX_COMPARE],
+        max_selections=MAX_COMPARE, key="cmp_stocks",
+    )
+    perf_mark("first_paint")
+
+    c1, c2, c3 = st.columns([1.4, 1.2, 2])
+    with c1:
+        view = st.radio("보기", ["겹쳐 보기", "작은 차트"], horizontal=True, key="cmp_view")
+    with c2:
+        metric = st.selectbox("겹쳐 볼 지표", ["순매수", "누적 순매수", "MA5", "MA10", "MA20"], index=3,
+                              key="cmp_metric", disabled=view != "겹쳐 보기")
+    with c3:
+        ma_cols = st.multiselect("작은 차트 MA", list(MA_COLOR_MAP), default=["MA10", "MA20"],
+                                 key="cmp_ma", disabled=view != "작은 차트")
+
+    cmp_range = st.slider(
+        "기간 선택", min_value=min_date, max_value=max_date,
+        value=(default_start, max_date), key="cmp_range", format="YYYY-MM-DD",
+    )
+
+    ids = tuple(disp_to_id[d] for d in picks)
+    if qp.get("cmp", "") != ",".join(map(str, ids)):
+        st.query_params["cmp"] = ",".join(map(str, ids))
+
+    if not ids:
+        st.info("비교할 종목을 2개 이상 선택하세요. (예: TSLA와 레버리지/인버스 ETF)")
+    else:
+        snap = data_snap()
+        spec = timed_cache("compare", compare_spec, ids, cmp_range[0], cmp_range[1], view, metric,
+                          tuple(ma_cols) if view == "작은 차트" else (), MARKET, snap.version)
+        st.vega_lite_chart(spec, use_container_width=True)
+
+        # 기간 합계 + 최근 순위 (같은 인덱스로 일괄 조회)
+        sub = snap.index.take(list(ids), cmp_range[0], cmp_range[1],
+                              columns=["종목ID", "날짜", "매수", "매도", "순매수"])
+        summ = sub.groupby("종목ID", sort=False)[["매수", "매도", "순매수"]].sum().reindex(list(ids)).fillna(0)
+        summ["등장일수"] = sub.groupby("종목ID", sort=False).size().reindex(list(ids)).fillna(0).astype(int)
+        ri = snap.ranks
+        summ["최근순위"] = [ri.rank(i, ri.days[-1]) for i in ids]
+        summ = decode_ids(summ.reset_index())
+        st.dataframe(
+            summ[["표시명", "등장일수", "매수", "매도", "순매수", "최근순위"]],
+            use_container_width=True, hide_index=True,
+            column_config={c: st.column_config.NumberColumn(format="%,d") for c in ("매수", "매도", "순매수")},
+        )
 
 
 # ───────────────────────────
 # 2) 🏆 인기 종목 TOP50
 # ───────────────────────────
-with t_top:
+elif tab == "top":
     st.markdown("### 🏆 인기 종목 TOP50 (등장일수 기준)")
+    perf_mark("first_paint")
 
-    df_period = df[(df["날짜"].dt.date >= default_start) & (df["날짜"].dt.date <= default_end)]
-    if df_period.empty:
+    spec = timed_cache("top", top_spec, default_start, default_end, MARKET, data_snap().version)
+    if spec is None:
         st.warning("선택 기간 데이터가 없습니다.")
     else:
-        n_days = df_period["날짜"].dt.date.nunique()
-        hits = (
-            df_period.dropna(subset=["표시명"])
-            .groupby(["표시명", "종목명"])["날짜"].nunique()
-            .reset_index(name="등장일수")
-            .sort_values("등장일수", ascending=False)
-            .head(50)
-        )
-        hits["커버리지(%)"] = (hits["등장일수"] / n_days * 100).round(1)
-
-        chart_top = (
-            alt.Chart(hits)
-            .mark_bar(color=COLOR_TOP50_BAR)
-            .encode(
-                x=alt.X("등장일수:Q", title="등장 일수"),
-                y=alt.Y(
-                    "표시명:N", sort="-x",
-                    axis=alt.Axis(labelOverlap=False, labelLimit=2000, labelFontSize=11)
-                ),
-                tooltip=["표시명:N", "등장일수:Q", "커버리지(%):Q"],
-            )
-            .properties(height=1200)
-        )
-        st.altair_chart(chart_top, use_container_width=True)
+        st.vega_lite_chart(spec, use_container_width=True)
 
 
 # ───────────────────────────
 # 3) 📊 순매수/순매도 순위
 # ───────────────────────────
-with t_rank:
+elif tab == "rank":
     st.markdown("### 📊 순매수·순매도 상위 종목")
+    perf_mark("first_paint")
+
+    df = get_df()
 
     col0, col1, col2, col3, col4, col5, _ = st.columns([1, 1, 1, 1, 1, 1, 4.5])
     with col0: period_1  = st.button("1일",  key="btn_r_1")
@@ -544,135 +1194,315 @@ with t_rank:
         )
         st.session_state["rank_range"] = rank_range
 
-        mode = st.radio("보기", ["순매수 상위", "순매도 상위"], horizontal=True, key="rank_mode")
-
-        start, end = rank_range
-        period_df = df[(df["날짜"].dt.date >= start) & (df["날짜"].dt.date <= end)]
-
-        agg = (
-            period_df
-            .groupby(["표시명", "종목명"], as_index=False)[["매수", "매도", "순매수"]]
-            .sum()
-            .rename(columns={"매수":"매수합계","매도":"매도합계"})
-        )
-
-        if mode == "순매도 상위":
-            agg["순매도합계"] = -agg["순매수"]
-            plot_df = agg[agg["순매도합계"] > 0].sort_values("순매도합계", ascending=False).head(50)
-            x_field = "순매도합계:Q"
-            x_title = "순매도 합계 (USD)"
-            tooltip_fields = [
-                "표시명:N",
-                alt.Tooltip("순매도합계:Q", title="순매도", format=",.0f"),
-                alt.Tooltip("매수합계:Q",   title="매수",   format=",.0f"),
-                alt.Tooltip("매도합계:Q",   title="매도",   format=",.0f"),
-            ]
+        groups = group_rollup()
+        c_mode, c_unit, c_adj = st.columns([2, 2, 2])
+        with c_mode:
+            mode = st.radio("보기", ["순매수 상위", "순매도 상위"], horizontal=True, key="rank_mode")
+        with c_unit:
+            unit = st.radio("단위", ["종목", "그룹"], horizontal=True, key="rank_unit") if groups else "종목"
+        if unit == "그룹":
+            with c_adj:
+                adjusted = st.checkbox("배율 환산(레버리지·인버스)", value=True, key="rank_group_adj")
+            spec = timed_cache("group_rank", group_rank_spec, rank_range[0], rank_range[1], mode, adjusted,
+                              MARKET, get_mtime(GROUP_DAILY_PATH))
+            st.vega_lite_chart(spec, use_container_width=True)
+            st.caption(f"그룹 구성·배율: {GROUPS_PATH.name} · 배율 환산 = Σ 배율 × 순매수 (인버스 매수는 기초자산 매도 방향)")
         else:
-            plot_df = agg[agg["순매수"] > 0].sort_values("순매수", ascending=False).head(50)
-            x_field = "순매수:Q"
-            x_title = "순매수 합계 (USD)"
-            tooltip_fields = [
-                "표시명:N",
-                alt.Tooltip("순매수:Q",   title="순매수", format=",.0f"),
-                alt.Tooltip("매수합계:Q", title="매수",   format=",.0f"),
-                alt.Tooltip("매도합계:Q", title="매도",   format=",.0f"),
-            ]
-
-        chart_rank = (
-            alt.Chart(plot_df)
-            .mark_bar(color=COLOR_RANK_BAR)
-            .encode(
-                x=alt.X(x_field, title=x_title, scale=alt.Scale(domainMin=0, nice=True)),
-                y=alt.Y("표시명:N", sort="-x", title=None,
-                        axis=alt.Axis(labelLimit=2500, labelFontSize=11)),
-                tooltip=tooltip_fields,
-            )
-            .properties(height=1200)
-        )
-        st.altair_chart(chart_rank, use_container_width=True)
+            spec = timed_cache("rank", rank_spec, rank_range[0], rank_range[1], mode, MARKET, data_snap().version)
+            st.vega_lite_chart(spec, use_container_width=True)
+
+            with st.expander("📥 내보내기"):
+                snap = data_snap()
+                table = rank_table(snap, rank_range[0], rank_range[1], mode)
+                word = "순매도" if mode == "순매도 상위" else "순매수"
+                st.markdown(f"**{word} 순위 전체** (차트는 상위 50)")
+                table_export("x_rank", table, f"{word}_순위_{MARKET}_{rank_range[0]}_{rank_range[1]}")
+                st.markdown("**기간 원본 이력** (전 종목 일별)")
+                history_export("x_rank_hist", snap, snap.index.stock_ids.tolist(), rank_range[0], rank_range[1],
+                               f"이력_{MARKET}_{rank_range[0]}_{rank_range[1]}")
 
 
 # ───────────────────────────
 # 4) 🧪 조건 필터
 # ───────────────────────────
-with t_filter:
-    st.markdown("### 🧪 조건 필터 (교집합 AND, 최근 20거래일)")
+elif tab == "filter":
+    st.markdown("### 🧪 조건 필터 (지표 · 기간 N · 임계값 · AND/OR)")
+    perf_mark("first_paint")
+
+    import pandas as pd
+    from filter_engine import (
+        WINDOW_FEATURES, OPS, DEFAULT_FILTER,
+        compile_filter, describe, feature_label, iter_conditions, load_filters, save_filters,
+    )
 
-    Toggle = getattr(st, "toggle", st.checkbox)
-    c1, c2, c3, c4 = st.columns(4)
+    fs = data_snap().fs
+    saved = load_filters()
+
+    p_l, p_r = st.columns([4, 1])
+    with p_l:
+        preset = st.selectbox("저장된 필터", ["(기본)"] + sorted(saved), key="f_preset")
+    base_spec = saved.get(preset, DEFAULT_FILTER)
+    with p_r:
+        st.write("")
+        if preset != "(기본)" and st.button("🗑 삭제", key="f_delete"):
+            saved.pop(preset, None)
+            save_filters(saved)
+            st.rerun()
+
+    c1, c2, _ = st.columns([1, 1, 2])
     with c1:
-        use_ratio = Toggle("최근 20일 매수/매도 ≤ 0.9", value=True,
-                           help="최근 20 거래일간 BUY/SELL 합계 비율", key="f_use_ratio")
+        logic = st.radio("조건 결합", ["AND", "OR"], horizontal=True, key=f"f_logic_{preset}",
+                         index=1 if base_spec.get("logic", "and").lower() == "or" else 0)
     with c2:
-        use_ma5  = Toggle("MA5 ≤ 0",  value=True, key="f_use_ma5")
-    with c3:
-        use_ma10 = Toggle("MA10 ≤ 0", value=False, key="f_use_ma10")
-    with c4:
-        use_ma20 = Toggle("MA20 ≤ 0", value=False, key="f_use_ma20")
+        lookback = st.number_input("대상: 최근 N거래일 등장 종목", min_value=1, max_value=fs.n_days,
+                                   value=min(int(base_spec.get("lookback", 20)), fs.n_days), step=1,
+                                   key=f"f_lookback_{preset}")
+
+    rows = [
+        {"사용": c.get("enabled", True), "지표": c["feature"], "N": c.get("window"),
+         "연산": c.get("op", "<="), "값": c["value"]}
+        for c in iter_conditions(base_spec)
+    ]
+    edited = st.data_editor(
+        pd.DataFrame(rows, columns=["사용", "지표", "N", "연산", "값"]),
+        key=f"f_editor_{preset}",
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "사용": st.column_config.CheckboxColumn(default=True),
+            "지표": st.column_config.SelectboxColumn(options=fs.feature_names(), required=True,
+                                                   help="매수합/매도합/순매수합/비율/등장일수는 N 필요"),
+            "N":    st.column_config.NumberColumn(min_value=1, max_value=fs.n_days, step=1,
+                                                 help="최근 N거래일 (윈도우 피처에만 사용)"),
+            "연산": st.column_config.SelectboxColumn(options=list(OPS), default="<=", required=True),
+            "값":   st.column_config.NumberColumn(default=0.0, required=True),
+        },
+    )
 
-    trade_days = sorted(df["날짜"].dt.date.unique())
-    if not trade_days:
-        st.warning("데이터가 없습니다.")
-    else:
-        last_day = trade_days[-1]
-        start_idx = max(0, len(trade_days) - 20)
-        first_day = trade_days[start_idx]
+    conds = []
+    for r in edited.to_dict("records"):
+        if not r.get("지표") or pd.isna(r.get("값")):
+            continue
+        c = {"feature": r["지표"], "op": r.get("연산") or "<=", "value": float(r["값"])}
+        if r["지표"] in WINDOW_FEATURES:
+            c["window"] = int(r["N"]) if pd.notna(r.get("N")) else int(lookback)
+        if not r.get("사용", True):
+            c["enabled"] = False
+        conds.append(c)
+    spec = {"logic": logic.lower(), "lookback": int(lookback), "conditions": conds}
+    active = [c for c in conds if c.get("enabled", True)]
+
+    t = time.perf_counter()
+    mask = compile_filter(spec)(fs) & fs.universe(lookback)
+    PERF["filter_eval"] = (time.perf_counter() - t) * 1000
+
+    n = int(lookback)
+    show = {f"매수합{n}": ("매수합", n), f"매도합{n}": ("매도합", n), f"비율{n}": ("비율", n)}
+    for c in active:
+        show.setdefault(feature_label(c), (c["feature"], c.get("window")))
+    for c in ("MA5", "MA10", "MA20"):
+        show.setdefault(c, (c, None))
+
+    filtered = pd.DataFrame({"종목ID": fs.stock_ids[mask]})
+    for col, (f, w) in show.items():
+        filtered[col] = fs.get(f, w)[mask]
+    filtered = filtered.sort_values(by=[f"비율{n}", f"매수합{n}"], ascending=[True, False])
+    filtered = decode_ids(filtered, ("표시명", "종목명"))
+
+    for c in filtered.columns:
+        if c not in ("종목ID", "표시명", "종목명") and not c.startswith(("비율", "Z")):
+            filtered[c] = filtered[c].round(0)
+
+    first_day = fs.days[-n].date()
+    last_day = fs.days[-1].date()
+    st.caption(f"기간: {first_day} ~ {last_day} (총 {n} 거래일) · 조건: {describe({**spec, 'conditions': active}) or '-'}")
+    st.write(f"**적용 조건 수:** {len(active)}개 | **결과 종목:** {len(filtered)}개")
+
+    show_cols = ["표시명", "종목명"] + list(show)
+    st.dataframe(filtered[show_cols], use_container_width=True, hide_index=True)
+
+    with st.expander("📥 내보내기"):
+        st.markdown("**필터 결과**")
+        table_export("x_filter", filtered[["종목ID"] + show_cols], f"필터_{MARKET}_{last_day}")
+        st.markdown("**결과 종목 원본 이력**")
+        x_range = st.slider("기간", min_value=min_date, max_value=max_date, value=(first_day, last_day),
+                            key="f_export_range", format="YYYY-MM-DD")
+        history_export("x_filter_hist", data_snap(), filtered["종목ID"].tolist(), x_range[0], x_range[1],
+                       f"필터_이력_{MARKET}_{x_range[0]}_{x_range[1]}")
+
+    s_l, s_r = st.columns([4, 1])
+    with s_l:
+        save_name = st.text_input("현재 조건 저장 이름", value="" if preset == "(기본)" else preset, key="f_save_name")
+    with s_r:
+        st.write("")
+        if st.button("💾 저장", key="f_save", disabled=not save_name.strip()):
+            saved[save_name.strip()] = spec
+            save_filters(saved)
+            st.success(f"저장됨: {save_name.strip()}")
+
+    names = ["(선택)"] + filtered["표시명"].tolist()
+    pick = st.selectbox("결과에서 선택 → 차트 보기", names, index=0, key="filter_pick")
+    if pick and pick != "(선택)":
+        code = filtered.loc[filtered["표시명"] == pick, "종목명"].iloc[0]
+        st.markdown(f"[📈 차트로 이동]({f'?tab=chart&stock={quote_plus(str(code))}{user_qs()}'})")
+
+    # ── 🕰 과거 백테스트: 같은 조건을 모든 과거 날짜에
+    st.markdown("#### 🕰 과거 백테스트 (모든 거래일에 같은 조건 적용)")
+    Toggle = getattr(st, "toggle", st.checkbox)
+    b1, b2, _ = st.columns([1, 1, 2])
+    with b1:
+        bt_on = Toggle("백테스트 보기", value=False, key="f_bt_on",
+                       help="조건이 새로 충족된 날(이벤트)마다 이후 N거래일 순매수 흐름을 집계")
+    with b2:
+        horizon = st.number_input("이후 N거래일", min_value=1, max_value=60, value=5, step=1, key="f_bt_h")
+
+    if bt_on:
+        t = time.perf_counter()
+        events, by_stock = run_backtest(
+            json.dumps(spec, ensure_ascii=False, sort_keys=True), int(horizon), MARKET, data_snap().version
+        )
+        PERF["backtest"] = (time.perf_counter() - t) * 1000
+
+        fwd_col = f"이후{int(horizon)}일_순매수"
+        judged = events["적중"].dropna()
+        k1, k2, k3 = st.columns(3)
+        k1.metric("이벤트 수", f"{len(events):,}", help="조건이 새로 켜진 (날짜, 종목) 수")
+        k2.metric("적중률", f"{judged.mean() * 100:.1f}%" if len(judged) else "-",
+                  help=f"이후 {int(horizon)}거래일 순매수 합 > 0 비율 (기간이 덜 지난 이벤트 제외)")
+        k3.metric(f"평균 {fwd_col}", fmt_usd(events[fwd_col].mean()) if len(judged) else "-")
+
+        ev_show = decode_ids(events.head(500).copy())
+        ev_show["날짜"] = ev_show["날짜"].dt.date
+        st.dataframe(ev_show[["날짜", "표시명", "당일_순매수", fwd_col, f"이후{int(horizon)}일_등장일수", "적중"]],
+                     use_container_width=True, hide_index=True)
+        st.caption(f"이벤트 최근 {min(len(events), 500)}건 표시")
+
+        st.markdown("**종목별 적중률**")
+        bs_show = decode_ids(by_stock.copy())
+        bs_show["최근이벤트"] = bs_show["최근이벤트"].dt.date
+        bs_show["적중률"] = (bs_show["적중률"] * 100).round(1)
+        st.dataframe(bs_show[["표시명", "이벤트수", "적중률", "최근이벤트", f"평균_{fwd_col}"]],
+                     use_container_width=True, hide_index=True)
 
-        period_df = df[(df["날짜"].dt.date >= first_day) & (df["날짜"].dt.date <= last_day)].copy()
 
-        agg = (
-            period_df.groupby(["종목명", "표시명"], as_index=False)[["매수", "매도"]].sum()
-            .rename(columns={"매수": "최근20일_매수합", "매도": "최근20일_매도합"})
-        )
-        agg["비율(BUY/SELL)"] = agg.apply(
-            lambda r: (r["최근20일_매수합"] / r["최근20일_매도합"]) if r["최근20일_매도합"] not in (0, None) else float("inf"),
-            axis=1
-        )
+# ───────────────────────────
+# 5) 🔗 동조 종목 (순매수 롤링 상관)
+# ───────────────────────────
+elif tab == "corr":
+    st.markdown("### 🔗 순매수가 함께 움직이는 종목")
+    perf_mark("first_paint")
 
-        last_ma = (
-            period_df
-            .sort_values("날짜")
-            .groupby(["종목명", "표시명"], as_index=False)[["MA5", "MA10", "MA20"]]
-            .last()
-        )
+    import pandas as pd
+    from correlation import CORR_WINDOWS
 
-        res = pd.merge(agg, last_ma, on=["종목명", "표시명"], how="left")
+    id_to_disp = lookup["disp"]
+    id_to_name = lookup["names"]
+    PLACEHOLDER = "🔎 종목을 선택하세요"
+    options = [PLACEHOLDER] + lookup["stocks_disp"]
 
-        cond = pd.Series([True] * len(res))
-        if use_ratio:
-            cond &= (res["비율(BUY/SELL)"] <= 0.9)
-        if use_ma5:
-            cond &= (res["MA5"] <= 0)
-        if use_ma10:
-            cond &= (res["MA10"] <= 0)
-        if use_ma20:
-            cond &= (res["MA20"] <= 0)
+    stock_param = qp.get("stock")
+    pre = id_to_disp[lookup["name_to_id"][stock_param]] if stock_param in lookup["name_to_id"] else None
+    c_l, c_r = st.columns([3, 1])
+    with c_l:
+        sel = st.selectbox("종목", options, index=options.index(pre) if pre in options else 0, key="stock_select_corr")
+    with c_r:
+        win = st.radio("상관 기간(거래일)", list(CORR_WINDOWS), index=min(1, len(CORR_WINDOWS) - 1),
+                       horizontal=True, key="corr_window")
+
+    if sel == PLACEHOLDER:
+        st.info("종목을 선택하면 최근 N거래일 일별 순매수 상관이 높은(또는 반대로 움직이는) 종목을 보여줍니다.")
+    else:
+        sid = lookup["disp_to_id"][sel]
+        top = load_corr_top(MARKET, get_mtime(CORR_TOP_PATH), get_mtime(DATA_PATH))
+
+        def _table(direction):
+            rows = top.get((sid, int(win), direction), [])
+            return pd.DataFrame({
+                "표시명": [id_to_disp[i] for i, _ in rows],
+                "상관계수": [r for _, r in rows],
+                "차트": [f"?tab=chart&stock={quote_plus(id_to_name[i])}{user_qs()}" for i, _ in rows],
+            })
+
+        pos, neg = _table("동조"), _table("역동조")
+        if pos.empty and neg.empty:
+            st.warning(f"최근 {win}거래일 중 등장일이 절반 미만이라 상관을 계산하지 않았습니다.")
+        else:
+            link = st.column_config.LinkColumn("차트", display_text="📈 보기")
+            corr_col = st.column_config.ProgressColumn("상관계수", min_value=-1.0, max_value=1.0, format="%.2f")
+            l, r = st.columns(2)
+            with l:
+                st.markdown("**📈 함께 움직임 (양의 상관)**")
+                st.dataframe(pos, hide_index=True, use_container_width=True,
+                             column_config={"차트": link, "상관계수": corr_col})
+            with r:
+                st.markdown("**📉 반대로 움직임 (음의 상관)**")
+                st.dataframe(neg, hide_index=True, use_container_width=True,
+                             column_config={"차트": link, "상관계수": corr_col})
+            st.caption(f"최근 {win}거래일 일별 순매수(미등장일 0) 피어슨 상관 · 등장일이 기간의 절반 이상인 종목만")
 
-        filtered = res.loc[cond].copy()
-        filtered = filtered.sort_values(by=["비율(BUY/SELL)", "최근20일_매수합"], ascending=[True, False])
 
-        for c in ["최근20일_매수합", "최근20일_매도합", "MA5", "MA10", "MA20"]:
-            if c in filtered.columns:
-                filtered[c] = filtered[c].round(0)
+# ───────────────────────────
+# 6) 🚨 이상 급증 (enrich 단계에서 미리 계산한 이벤트만 읽음)
+# ───────────────────────────
+elif tab == "spike":
+    st.markdown("### 🚨 순매수 이상 급증·급감")
+    perf_mark("first_paint")
 
-        st.caption(f"기간: {first_day} ~ {last_day} (총 {len(trade_days[start_idx:])} 거래일)")
-        st.write(f"**적용 조건 수:** {sum([use_ratio, use_ma5, use_ma10, use_ma20])}개 | **결과 종목:** {len(filtered)}개")
+    from spikes import WINDOW as SPIKE_WINDOW, Z_MIN
 
-        show_cols = ["표시명", "종목명", "최근20일_매수합", "최근20일_매도합", "비율(BUY/SELL)", "MA5", "MA10", "MA20"]
-        st.dataframe(filtered[show_cols], use_container_width=True, hide_index=True)
+    ev = load_spikes(MARKET, get_mtime(SPIKES_PATH), get_mtime(DATA_PATH))
+    days = lookup.get("trading_days") or []
 
-        names = ["(선택)"] + filtered["표시명"].tolist()
-        pick = st.selectbox("결과에서 선택 → 차트 보기", names, index=0, key="filter_pick")
-        if pick and pick != "(선택)":
-            code = filtered.loc[filtered["표시명"] == pick, "종목명"].iloc[0]
-            st.markdown(f"[📈 차트로 이동]({f'?tab=chart&stock={quote_plus(str(code))}'})")
+    c1, c2, c3, c4 = st.columns([2, 2, 3, 1.5])
+    with c1:
+        span = st.radio("기간", [1, 5, 20, 60, 0], index=2, horizontal=True, key="spike_span",
+                        format_func=lambda n: f"{n}일" if n else "전체")
+    with c2:
+        direction = st.radio("방향", ["전체", "급증", "급감"], horizontal=True, key="spike_dir")
+    with c3:
+        z_min = st.slider("최소 |점수|", min_value=float(Z_MIN), max_value=30.0, value=float(Z_MIN), step=0.5,
+                          key="spike_z")
+    with c4:
+        fav_only = st.checkbox("⭐ 즐겨찾기만", key="spike_fav")
+
+    sel = ev[ev["점수"].abs() >= z_min]
+    if span and len(days):
+        sel = sel[sel["날짜"].dt.date >= days[-min(span, len(days))]]
+    if direction != "전체":
+        sel = sel[sel["방향"] == direction]
+    if fav_only:
+        fav_ids = {lookup["name_to_id"][c] for c in st.session_state.get("favs", set()) if c in lookup["name_to_id"]}
+        sel = sel[sel["종목ID"].isin(fav_ids)]
+
+    if sel.empty:
+        st.info("조건에 맞는 이상 급증·급감 이벤트가 없습니다.")
+    else:
+        show = decode_ids(sel.copy())
+        show["날짜"] = show["날짜"].dt.date
+        show["차트"] = [f"?tab=chart&stock={quote_plus(lookup['names'][i])}{user_qs()}" for i in show["종목ID"]]
+        st.caption(f"이벤트 {len(show):,}건 · 종목 {show['종목ID'].nunique():,}개")
+        st.dataframe(
+            show[["날짜", "표시명", "방향", "순매수", "중앙값", "배수", "점수", "차트"]],
+            hide_index=True, use_container_width=True,
+            column_config={
+                "순매수": st.column_config.NumberColumn(format="%,d"),
+                "중앙값": st.column_config.NumberColumn(f"직전 {SPIKE_WINDOW}일 중앙값", format="%,d"),
+                "배수": st.column_config.NumberColumn("배수(÷|중앙값|)", format="%.1f"),
+                "점수": st.column_config.NumberColumn(format="%.1f"),
+                "차트": st.column_config.LinkColumn("차트", display_text="📈 보기"),
+            },
+        )
+    st.caption(f"점수 = (그날 순매수 − 직전 {SPIKE_WINDOW}등장일 중앙값) ÷ (1.4826 × MAD) · "
+               f"직전 등장일이 10일 이상 쌓인 종목만 · 중앙값 대비 100만 달러 이상 차이")
 
 
 # ───────────────────────────
-# 5) 📘 소개/가이드
+# 7) 📘 소개/가이드
 # ───────────────────────────
-with t_guide:
+else:
     st.markdown("### 📘 소개 / 가이드")
+    perf_mark("first_paint")
 
     st.markdown(f"""
     <style>
@@ -736,3 +1566,48 @@ with t_guide:
           </div>
         </div>
         """, unsafe_allow_html=True)
+
+
+# ───────────────────────────
+# 🔥 캐시 예열 — 이번 실행에서 데이터를 읽었으면 감시자에 예열을 연결(새 버전마다 자동) + 현재 버전 1회
+#   키는 각 탭 기본 화면과 같게: 차트 = 기본 기간·MA10/MA20·순위, 인기 TOP50 = 기본 기간, 순위 = 최근 20거래일
+# ───────────────────────────
+def warm_jobs(snap):
+    """예열 작업 [(이름, 함수)] — 시장 공통 스펙 + 후보 종목(조회수 → 즐겨찾기 → 최근 TOP50 등장)의 KPI·차트"""
+    from warmup import candidates
+
+    days = snap.days
+    if not len(days):
+        return []
+    ver, end = snap.version, days[-1].date()
+    start = max(days[0].date(), date(2025, 1, 1))
+    r_start = days[-min(20, len(days))].date()
+    ids = candidates(snap, get_view_counter().top(MARKET), get_fav_store().popular(), lookup["name_to_id"])
+
+    jobs = [("top", lambda: top_spec(start, end, MARKET, ver, snap))]
+    for mode in ("순매수 상위", "순매도 상위"):
+        jobs.append((f"rank:{mode}", lambda mode=mode: rank_spec(r_start, end, mode, MARKET, ver, snap)))
+    for sid in ids:
+        jobs.append((f"kpi:{sid}", lambda sid=sid: chart_kpis(sid, start, end, MARKET, ver, snap)))
+        jobs.append((f"chart:{sid}", lambda sid=sid: chart_spec(sid, start, end, ("MA10", "MA20"), True,
+                                                                MARKET, ver, snap)))
+    return jobs
+
+
+if _SNAP is not None:
+    _live = get_live(MARKET)
+    _warmer = get_warmer(MARKET).set_jobs(warm_jobs)
+    _live.subscribe(_warmer.on_snapshot)
+    _warmer.on_snapshot(_live.current)
+
+
+# ───────────────────────────
+# ⏱️ 성능 리포트
+# ───────────────────────────
+perf_mark("total")
+if not st.session_state.get("perf_logged"):
+    st.session_state["perf_logged"] = True
+    print("⏱️ startup(ms) " + " ".join(f"{k}={v:.0f}" for k, v in PERF.items()) + f" tab={tab}")
+if qp.get("perf") == "1":
+    st.caption("⏱️ " + " · ".join(f"{k} {v:.0f}ms" for k, v in PERF.items()))
+    st.caption(f"🔥 캐시 적중: {get_cache_stats().text() or '-'} · 예열: {get_warmer(MARKET).text()}")
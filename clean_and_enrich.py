@@ -1,7 +1,21 @@
 # clean_and_enrich.py
+# 사용법: python clean_and_enrich.py [--market us,hk|all] [--mode buysell,buy|all]
+#         (지정 없으면 all_data.csv가 있는 파티션 전부 — 파티션 폴더는 markets.proc_dir)
+import sys
 import pandas as pd
 from pathlib import Path
 
+from entities import resolve, save_entities, ENTITIES_PATH
+from groups import build_outputs as build_groups, GROUPS_PATH, GROUP_DAILY_PATH
+from correlation import build_outputs as build_correlation, STATE_PATH as CORR_STATE_PATH, TOP_PATH as CORR_TOP_PATH
+from indicators import compute_indicators, EMA_SPANS, Z_WINDOWS, RATIO_WINDOWS
+from markets import MARKETS, MODES, DEFAULT_MARKET, DEFAULT_MODE, proc_dir, parse_list, partitions, pop_opt
+from ranks import fill_rank, add_rank_delta
+from spikes import build_outputs as build_spikes, SPIKES_PATH, Z_MIN, WINDOW as SPIKE_WINDOW
+from live_data import write_tail, TAIL_PATH, TAIL_FP_PATH
+from lookup import build_lookup, save_lookup, LOOKUP_PATH
+from stock_ids import assign_ids, load_stock_ids, save_stock_ids, STOCK_IDS_PATH
+
 BASE = Path(__file__).resolve().parent
 PROC = BASE / "processed"
 PROC.mkdir(parents=True, exist_ok=True)
@@ -14,13 +28,18 @@ OUT_LIST  = PROC / "stocks.txt"
 def to_num(s):
     return pd.to_numeric(str(s).replace(",", "").replace(" ", ""), errors="coerce")
 
-def main():
-    if not SRC.exists():
-        print(f"❌ 입력 파일이 없습니다: {SRC}")
+def enrich(market=DEFAULT_MARKET, mode=DEFAULT_MODE):
+    """한 파티션(processed/<시장>/...)의 all_data.csv → 정제/지표/조회 테이블/상관 산출물(같은 폴더)"""
+    out = proc_dir(market, mode)
+    src, out_clean, out_sum, out_list = (out / p.name for p in (SRC, OUT_CLEAN, OUT_SUM, OUT_LIST))
+    if (market, mode) != (DEFAULT_MARKET, DEFAULT_MODE):
+        print(f"\n🌐 파티션: {MARKETS[market][0]} / {MODES[mode][0]} ({out})")
+    if not src.exists():
+        print(f"❌ 입력 파일이 없습니다: {src}")
         raise SystemExit(1)
 
-    print("📥 읽는 중:", SRC.name)
-    df = pd.read_csv(SRC, dtype=str, encoding="utf-8-sig")
+    print("📥 읽는 중:", src.name)
+    df = pd.read_csv(src, dtype=str, encoding="utf-8-sig")
 
     need = ["종목명", "매수", "매도", "순매수", "날짜"]
     missing = [c for c in need if c not in df.columns]
@@ -28,48 +47,114 @@ def main():
         print("❌ 누락 컬럼:", missing)
         raise SystemExit(1)
 
-    df = df[need].copy()
+    df = df[need + (["순위"] if "순위" in df.columns else [])].copy()
 
     # 날짜/숫자 정리
     df["날짜"] = pd.to_datetime(df["날짜"], errors="coerce").dt.normalize()
     df = df.dropna(subset=["날짜"])
+    if df.empty:
+        # 조회 테이블 등 어떤 산출물도 쓰지 않음(빈 파티션 폴더가 앱 시장 목록/커밋에 끼지 않도록)
+        print(f"❌ 유효한 날짜 행이 없습니다 → 이 파티션은 건너뜀: {src}")
+        return
     df["종목명"] = df["종목명"].astype(str).str.strip()
 
     for c in ["매수", "매도", "순매수"]:
         df[c] = df[c].apply(to_num)
         df[c] = df[c].fillna(0)  # ✅ 안전장치(원하면 유지)
 
-    # 날짜-종목별 중복 합산
+    # 일별 TOP50 순위(원본 순위가 없는 예전 날짜는 매수+매도 합계 순으로)
+    df = fill_rank(df)
+
+    # 기업행위 꼬리표(MRGR/SPLR/CHAN/EXOF…) 변형 → 대표 종목명 (entities.py + entity_overrides.csv)
+    first_seen = df.groupby("종목명")["날짜"].min().to_dict()
+    canon = resolve(first_seen, first_seen)
+    save_entities(canon, out / ENTITIES_PATH.name)
+    raw_names = sorted(canon)
+    stocks = sorted(set(canon.values()))
+    print(f"🧬 종목 통합: {len(raw_names)} → {len(stocks)}종목 (별칭 {len(raw_names) - len(stocks)}개 → {ENTITIES_PATH.name})")
+
+    # 종목명 → 정수 종목ID (append-only 사전, 새 종목만 ID 추가; 별칭도 ID는 유지하되 데이터는 대표 ID로)
+    ids = assign_ids(raw_names + stocks, load_stock_ids(out / STOCK_IDS_PATH.name))
+    save_stock_ids(ids, out / STOCK_IDS_PATH.name)
+    print(f"📇 종목ID 사전 저장: {STOCK_IDS_PATH.name} (총 {len(ids)}개)")
+    df["종목ID"] = df["종목명"].map(canon).map(ids).astype("int32")
+
+    # 날짜-종목별 중복 합산 (이후 모든 키는 종목ID)
     df = (
-        df.groupby(["날짜", "종목명"], as_index=False)
-          .agg({"매수": "sum", "매도": "sum", "순매수": "sum"})
-          .sort_values(["종목명", "날짜"])
+        df.groupby(["날짜", "종목ID"], as_index=False)
+          .agg({"매수": "sum", "매도": "sum", "순매수": "sum", "순위": "min"})
+          .sort_values(["종목ID", "날짜"])
           .reset_index(drop=True)
     )
 
-    # 이동평균
-    df["MA5"]  = df.groupby("종목명")["순매수"].rolling(5,  min_periods=5).mean().reset_index(level=0, drop=True)
-    df["MA10"] = df.groupby("종목명")["순매수"].rolling(10, min_periods=10).mean().reset_index(level=0, drop=True)
-    df["MA20"] = df.groupby("종목명")["순매수"].rolling(20, min_periods=20).mean().reset_index(level=0, drop=True)
-
-    # 저장
-    df.to_csv(OUT_CLEAN, index=False, encoding="utf-8-sig")
-    print(f"✅ 저장 완료: {OUT_CLEAN.name} (rows={len(df):,})")
-
+    # 지표(MA/EMA/z-score/매수매도 비율/연속일수) — (등장일 × 종목) 행렬에서 한 번에
+    df = compute_indicators(df)
+    df = add_rank_delta(df)
+    cols = [c for c in df.columns if c not in ("순위", "순위변화")]
+    df = df[cols[:5] + ["순위", "순위변화"] + cols[5:]]
+    for n in EMA_SPANS:
+        df[f"EMA{n}"] = df[f"EMA{n}"].round(2)
+    for n in Z_WINDOWS:
+        df[f"Z{n}"] = df[f"Z{n}"].round(4)
+    for n in RATIO_WINDOWS:
+        df[f"비율{n}"] = df[f"비율{n}"].round(4)
+
+    out_list.write_text("\n".join(stocks), encoding="utf-8")
+    print(f"📝 종목 리스트 저장: {out_list.name} (총 {len(stocks)}종목)")
+
+    # 앱 첫 화면용 조회 테이블(종목ID/표시명/거래일) → 바이너리 (새 종목 이름이 데이터보다 먼저 보이도록 먼저 저장)
+    days = sorted(df["날짜"].dt.date.unique().tolist())
+    save_lookup(build_lookup(stocks, days, ids, aliases={a: c for a, c in canon.items() if a != c}),
+                out / LOOKUP_PATH.name)
+    print(f"🗂️ 조회 테이블 저장: {LOOKUP_PATH.name} (거래일 {len(days)}일)")
+
+    # 저장 — 실행 중인 앱이 감시하므로 tail 먼저, 본 파일은 임시 파일 → 교체(읽는 쪽이 반쯤 쓴 파일을 보지 않게)
+    write_tail(df, out / TAIL_PATH.name)
+    tmp = out_clean.with_suffix(".tmp")
+    df.to_csv(tmp, index=False, encoding="utf-8-sig")
+    tmp.replace(out_clean)
+    print(f"✅ 저장 완료: {out_clean.name} (rows={len(df):,}) + {TAIL_PATH.name}(+ 지문 {TAIL_FP_PATH.name})")
+
+    id_to_name = {v: k for k, v in ids.items()}
     sumdf = (
-        df.groupby("종목명")
+        df.groupby("종목ID")
           .agg(행수=("날짜","size"), 최초일=("날짜","min"), 최종일=("날짜","max"))
           .reset_index()
-          .sort_values(["행수","종목명"], ascending=[False, True])
     )
-    sumdf.to_csv(OUT_SUM, index=False, encoding="utf-8-sig")
-    print(f"🧾 요약 저장: {OUT_SUM.name}")
-
-    stocks = df["종목명"].dropna().drop_duplicates().sort_values().tolist()
-    OUT_LIST.write_text("\n".join(stocks), encoding="utf-8")
-    print(f"📝 종목 리스트 저장: {OUT_LIST.name} (총 {len(stocks)}종목)")
+    sumdf.insert(1, "종목명", sumdf["종목ID"].map(id_to_name))
+    n_alias = pd.Series(list(canon.values())).value_counts() - 1
+    sumdf.insert(2, "별칭수", sumdf["종목명"].map(n_alias).fillna(0).astype(int))
+    sumdf = sumdf.sort_values(["행수","종목명"], ascending=[False, True])
+    sumdf.to_csv(out_sum, index=False, encoding="utf-8-sig")
+    print(f"🧾 요약 저장: {out_sum.name}")
+
+    # 테마/기초자산 그룹(groups.csv, 레버리지·인버스 배율 포함) → 그룹 일별 매수/매도/순매수/환산순매수
+    gdaily, n_groups, gmissing = build_groups(df, {n: ids[canon.get(n, n)] for n in ids}, out / GROUP_DAILY_PATH.name)
+    print(f"🧺 그룹 합계 저장: {GROUP_DAILY_PATH.name} (그룹 {n_groups}개, rows={len(gdaily):,})"
+          + (f" | {GROUPS_PATH.name}에 있지만 이 시장에 없는 종목 {len(gmissing)}개" if gmissing else ""))
+
+    # 종목 간 순매수 롤링 상관(상태 증분 갱신) → 종목별 상위 동조/역동조
+    top, how = build_correlation(df, out / CORR_STATE_PATH.name, out / CORR_TOP_PATH.name)
+    print(f"🔗 동조 종목 저장: {CORR_TOP_PATH.name} (rows={len(top):,}) | "
+          + ", ".join(f"W{w}: {h}" for w, h in how.items()))
+
+    # 순매수 이상 급증/급감(직전 등장일 중앙값/MAD 기준 강건 점수) → 이벤트 표
+    ev = build_spikes(df, out / SPIKES_PATH.name)
+    print(f"🚨 이상 급증 저장: {SPIKES_PATH.name} (이벤트 {len(ev):,}건, 직전 {SPIKE_WINDOW}등장일 기준 |점수| ≥ {Z_MIN:g})")
 
     print("🎉 정제 + 지표 추가 완료!")
 
+def main():
+    args = sys.argv[1:]
+    market_arg, mode_arg = pop_opt(args, "--market"), pop_opt(args, "--mode")
+    if market_arg or mode_arg:
+        parts = partitions(parse_list(market_arg, MARKETS, DEFAULT_MARKET), parse_list(mode_arg, MODES, DEFAULT_MODE))
+    else:
+        # 지정 없으면 combine 결과(all_data.csv)가 있는 파티션 전부(기본 파티션은 항상 — 없으면 예전처럼 실패)
+        parts = [p for p in partitions(list(MARKETS), list(MODES))
+                 if p == partitions()[0] or (proc_dir(*p) / SRC.name).exists()]
+    for market, mode in parts:
+        enrich(market, mode)
+
 if __name__ == "__main__":
     main()
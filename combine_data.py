@@ -4,125 +4,388 @@
 # - 같은 날짜 파일이 다시 들어오면: 그 날짜 데이터는 덮어쓰기(기존 날짜 행 삭제 후 추가)
 # - 표가 아닌 파일(안내/에러로 저장된 xls)은 스킵
 # - 새로 병합할 유효 데이터가 없으면 실패하지 않고 종료(성공)
+# - 원본 표의 일별 TOP50 순위를 "순위" 컬럼으로 보존(예전 행은 ranks.fill_rank로 채움)
+# - (시장, 조회 기준) 파티션별로 따로 누적: data/<시장>/<기준>/ → processed/<시장>/[<기준>/]all_data.csv (markets.py)
+# - 누적 파일이 크면(CHUNKED_MIN_BYTES 이상, 또는 --chunked) 청크 병합: 새 날짜 앞부분은 바이트 복사,
+#   그 뒤는 날짜순 청크로 읽으며 새 날짜를 제자리에 끼워 임시 파일에 이어 쓰고 교체
+#   → 메모리는 청크 크기만큼(누적 크기와 무관)
+#
+# 사용법: python combine_data.py [--market us,hk|all] [--mode buysell,buy|all] [--chunked]
+#         (지정 없으면 원본 폴더가 있는 파티션 전부)
+# 자체 점검(합성 누적 N GB를 청크 병합 → 최대 RSS 한도 + 결과 검증): python combine_data.py --selftest [N]
 
-from pathlib import Path
+import sys
+import numpy as np
 import pandas as pd
 
-BASE = Path(__file__).resolve().parent
-DATA_DIR = BASE / "data"
-OUT_DIR = BASE / "processed"
-OUT_DIR.mkdir(parents=True, exist_ok=True)
-
-OUT_PATH = OUT_DIR / "all_data.csv"
-
-print("📊 데이터 병합(증분 누적) 시작...\n")
-
-if not DATA_DIR.exists():
-    print(f"❌ data 폴더가 없습니다: {DATA_DIR}")
-    raise SystemExit(1)
-
-# 1) 기존 누적 데이터 로드 (있으면)
-if OUT_PATH.exists():
-    old = pd.read_csv(
-        OUT_PATH,
-        parse_dates=["날짜"],
-        encoding="utf-8-sig",
-        dtype={"종목명": "string"},
-    )
-    print(f"📌 기존 누적 로드: {OUT_PATH.name} (rows={len(old):,})")
-else:
-    old = pd.DataFrame(columns=["종목명", "매수", "매도", "순매수", "날짜"])
-    print("📌 기존 누적 없음: 새로 생성합니다.")
-
-# 2) data 폴더에서 파일 읽기 → 날짜별 DF 만들기
-new_dfs = []
-new_dates = set()
-
-files = sorted([p for p in DATA_DIR.iterdir() if p.suffix.lower() in (".xls", ".xlsx")])
-if not files:
-    # ✅ 액션에서 다운로더가 저장 안 했을 수도 있으니, 실패 말고 성공 종료
-    print("ℹ️ data 폴더에 xls/xlsx 파일이 없습니다. (다운로드 실패/휴일 가능) → 종료(성공)")
-    raise SystemExit(0)
-
-for file in files:
-    date_str = file.stem.replace("re", "")  # reYYYYMMDD
+from markets import MARKETS, MODES, DEFAULT_MARKET, DEFAULT_MODE, raw_dir, proc_dir, parse_list, partitions, pop_opt
+from ranks import fill_rank
+
+
+COLS = ["종목명", "매수", "매도", "순매수", "날짜", "순위"]
+CHUNK_ROWS = 500_000                    # 청크 병합 1회 읽기 행 수
+RAW_BLOCK = 16 * 1024 ** 2              # 청크 병합 앞부분(새 날짜 이전) 바이트 복사 단위
+CHUNKED_MIN_BYTES = 256 * 1024 ** 2     # 누적 파일이 이보다 크면 자동으로 청크 병합
+
+
+def read_table(file, dt):
+    """원본 xls(HTML 표) 1개 → [종목명, 매수, 매도, 순매수, 날짜, 순위] (표가 아니면 None + 사유)"""
+    tables = pd.read_html(str(file), header=0, flavor="lxml")
+    if not tables:
+        return None, "표를 찾지 못함(안내/에러 페이지 가능)"
+    df = tables[0]
+
+    # ✅ 표 형식 아니면 스킵 (열 부족)
+    if df.shape[1] < 6:
+        return None, f"열 수 부족({df.shape[1]}). (안내/에러 페이지일 가능성)"
+
+    # 첫 열 = 순위(숫자가 아니면 표의 행 순서)
+    rank = pd.to_numeric(df.iloc[:, 0], errors="coerce")
+    df = df.iloc[:, [3, 4, 5]].copy()
+    df.columns = ["종목명", "매수", "매도"]
+    df["순위"] = rank.where(rank.notna(), pd.Series(range(1, len(df) + 1), index=df.index))
+
+    # 숫자 변환
+    for c in ["매수", "매도"]:
+        df[c] = (
+            df[c].astype(str)
+            .str.replace(",", "", regex=False)
+            .str.replace(" ", "", regex=False)
+        )
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+
+    # ✅ 종목명 비어있는 행 제거 (가끔 헤더/빈줄 섞임 방지)
+    df["종목명"] = df["종목명"].astype("string").str.strip()
+    df = df.dropna(subset=["종목명"])
+    df = df[df["종목명"] != ""]
+
+    df["순매수"] = df["매수"] - df["매도"]
+    df["날짜"] = dt.normalize()
+    df = df[["종목명", "매수", "매도", "순매수", "날짜", "순위"]]
+
+    # ✅ 모두 NaN이면(실제 데이터 없음) 스킵
+    if df[["매수", "매도", "순매수"]].isna().all().all():
+        return None, "수치 데이터가 전부 비어있음(안내/빈 데이터 가능)"
+    return df, None
+
+
+def _tidy(df):
+    """병합 공통 정리: 종목명 공백 제거, 날짜 정규화, 날짜/종목명 빈 행 제거"""
+    df["종목명"] = df["종목명"].astype("string").str.strip()
+    df["날짜"] = pd.to_datetime(df["날짜"], errors="coerce").dt.normalize()
+    return df.dropna(subset=["날짜", "종목명"])
+
+
+def merge_in_memory(out_path, new_data, new_dates):
+    """기존 누적 전체 + 새 데이터를 메모리에서 합쳐 저장 → 저장 행 수"""
+    if out_path.exists():
+        old = pd.read_csv(out_path, parse_dates=["날짜"], encoding="utf-8-sig", dtype={"종목명": "string"})
+        print(f"📌 기존 누적 로드: {out_path.name} (rows={len(old):,})")
+    else:
+        old = pd.DataFrame(columns=COLS)
+        print("📌 기존 누적 없음: 새로 생성합니다.")
+
+    # 같은 날짜는 “덮어쓰기” (기존에서 해당 날짜 제거 후 append)
+    if len(old) > 0:
+        old["날짜"] = pd.to_datetime(old["날짜"], errors="coerce").dt.normalize()
+        mask_keep = ~old["날짜"].isin(new_dates)
+        removed = len(old) - int(mask_keep.sum())
+        old = old.loc[mask_keep].copy()
+        if removed:
+            print(f"🧹 덮어쓰기: 기존 데이터에서 동일 날짜 행 {removed:,}개 제거")
+
+    merged = _tidy(pd.concat([old, new_data], ignore_index=True))
+    merged = fill_rank(merged)
+    merged = merged.sort_values(["날짜", "종목명"]).reset_index(drop=True)
+
+    merged.to_csv(out_path, index=False, encoding="utf-8-sig")
+    return len(merged)
+
+
+def _line_day(line: bytes):
+    """누적 CSV 한 줄의 날짜(끝에서 두 번째 필드 — 종목명에 쉼표가 있어도 안전)"""
+    return pd.Timestamp(line.rsplit(b",", 2)[1].decode())
+
+
+def merge_chunked(out_path, new_data, new_dates, chunk_rows=CHUNK_ROWS, raw_block=RAW_BLOCK):
+    """
+    날짜순으로 저장된 기존 누적 파일을 앞에서부터 흘려 보내며 병합 → 임시 파일에 이어 쓰고 교체 → 저장 행 수
+    1) 원본 복사: 블록 마지막 줄 날짜가 새 날짜(덮어쓰기 포함)보다 앞이면 파싱 없이 바이트 그대로 복사
+       (매일 뒤에 붙는 경우 거의 전부 여기서 끝남)
+    2) 청크 병합: 나머지는 chunk_rows행씩 읽어 덮어쓸 날짜 행은 버리고 새 날짜 행을 제자리에 끼움
+       청크의 마지막 날짜 행은 다음 청크로 넘김 → 내보내는 블록은 항상 날짜 단위로 완결
+       (블록 안 정렬/순위 채우기 = 전체에서 한 것과 같음)
+    메모리 = 블록/청크 1개 + 새 데이터 — 누적 크기와 무관
+    기존 파일이 날짜순이 아니면 ValueError(임시 파일은 지움 → 호출 측이 메모리 병합으로)
+    """
+    new_data = _tidy(new_data.reindex(columns=COLS)).sort_values(["날짜", "종목명"]).reset_index(drop=True)
+    new_days = new_data["날짜"].to_numpy()
+    drop_days = pd.DatetimeIndex(sorted(new_dates))
+    first_new = min(drop_days.min(), new_data["날짜"].min()) if len(new_data) else drop_days.min()
+    tmp = out_path.with_suffix(".tmp")
+    rows = removed = k = 0
+    carry, emitted = None, None     # 다음 청크로 넘길 마지막 날짜 행, 마지막으로 내보낸 날짜
+
     try:
-        dt = pd.to_datetime(date_str, format="%Y%m%d", errors="coerce")
-        if pd.isna(dt):
-            print(f"⚠️ 스킵: {file.name} → 날짜 파싱 실패({date_str})")
-            continue
-
-        # ✅ 표 읽기
-        tables = pd.read_html(str(file), header=0, flavor="lxml")
-        if not tables:
-            print(f"⚠️ 스킵: {file.name} → 표를 찾지 못함(안내/에러 페이지 가능)")
-            continue
-        df = tables[0]
-
-        # ✅ 표 형식 아니면 스킵 (열 부족)
-        if df.shape[1] < 6:
-            print(f"⚠️ 스킵: {file.name} → 열 수 부족({df.shape[1]}). (안내/에러 페이지일 가능성)")
-            continue
-
-        df = df.iloc[:, [3, 4, 5]].copy()
-        df.columns = ["종목명", "매수", "매도"]
-
-        # 숫자 변환
-        for c in ["매수", "매도"]:
-            df[c] = (
-                df[c].astype(str)
-                .str.replace(",", "", regex=False)
-                .str.replace(" ", "", regex=False)
-            )
-            df[c] = pd.to_numeric(df[c], errors="coerce")
-
-        # ✅ 종목명 비어있는 행 제거 (가끔 헤더/빈줄 섞임 방지)
-        df["종목명"] = df["종목명"].astype("string").str.strip()
-        df = df.dropna(subset=["종목명"])
-        df = df[df["종목명"] != ""]
-
-        df["순매수"] = df["매수"] - df["매도"]
-        df["날짜"] = dt.normalize()
-
-        # ✅ 모두 NaN이면(실제 데이터 없음) 스킵
-        if df[["매수", "매도", "순매수"]].isna().all().all():
-            print(f"⚠️ 스킵: {file.name} → 수치 데이터가 전부 비어있음(안내/빈 데이터 가능)")
-            continue
-
-        new_dfs.append(df)
-        new_dates.add(dt.normalize())
-
-        print(f"✅ 처리 완료: {file.name} ({len(df)}행)")
-
-    except Exception as e:
-        print(f"⚠️ 스킵: {file.name} → {e}")
-
-# ✅ 유효 새 데이터가 없으면 실패하지 말고 성공 종료
-if not new_dfs:
-    print("\nℹ️ 새로 병합할 유효 데이터가 없습니다. (주말/휴일/사이트 응답 문제 가능) → 종료(성공)")
-    raise SystemExit(0)
-
-new_data = pd.concat(new_dfs, ignore_index=True)
-
-# 3) 같은 날짜는 “덮어쓰기” (기존에서 해당 날짜 제거 후 append)
-if len(old) > 0:
-    old["날짜"] = pd.to_datetime(old["날짜"], errors="coerce").dt.normalize()
-    mask_keep = ~old["날짜"].isin(new_dates)
-    removed = len(old) - int(mask_keep.sum())
-    old = old.loc[mask_keep].copy()
+        with open(out_path, "rb") as src, open(tmp, "wb") as dst:
+            head = src.readline().decode("utf-8-sig").strip().split(",")
+            dst.write((",".join(COLS) + "\n").encode("utf-8-sig"))
+
+            # 1) 원본 복사(헤더가 지금 형식과 같을 때만 — 예전 형식이면 전부 청크 병합)
+            while head == COLS:
+                pos = src.tell()
+                block = src.read(raw_block)
+                cut = block.rfind(b"\n") + 1
+                if cut == 0:
+                    src.seek(pos)
+                    break
+                first = _line_day(block[:block.find(b"\n")])
+                last = _line_day(block[block.rfind(b"\n", 0, cut - 1) + 1:cut])
+                if last >= first_new:
+                    src.seek(pos)
+                    break
+                if last < first or (emitted is not None and first < emitted):
+                    raise ValueError(f"{out_path.name}이 날짜순이 아님")
+                dst.write(memoryview(block)[:cut])
+                src.seek(pos + cut)
+                rows += block.count(b"\n", 0, cut)
+                emitted = last
+
+            # 2) 청크 병합
+            def emit(block):
+                nonlocal rows
+                block = fill_rank(block.sort_values(["날짜", "종목명"], kind="stable"))
+                dst.write(block.to_csv(index=False, header=False).encode("utf-8"))
+                rows += len(block)
+
+            reader = pd.read_csv(src, chunksize=chunk_rows, header=None, names=head, parse_dates=["날짜"],
+                                 encoding="utf-8", dtype={"종목명": "string"})
+            for chunk in reader:
+                chunk = _tidy(chunk.reindex(columns=COLS))
+                keep = ~chunk["날짜"].isin(drop_days)
+                removed += int((~keep).sum())
+                chunk = chunk[keep]
+                if carry is not None:
+                    chunk = pd.concat([carry, chunk], ignore_index=True)
+                if chunk.empty:
+                    continue
+                d = chunk["날짜"]
+                if not d.is_monotonic_increasing or (emitted is not None and d.iloc[0] < emitted):
+                    raise ValueError(f"{out_path.name}이 날짜순이 아님")
+                last = d.iloc[-1]
+                carry = chunk[d == last]
+                done = chunk[d < last]
+                if done.empty:
+                    continue
+                emitted = done["날짜"].iloc[-1]
+                j = int(np.searchsorted(new_days, emitted.to_datetime64(), side="right"))
+                emit(pd.concat([done, new_data.iloc[k:j]], ignore_index=True))
+                k = j
+
+            rest = [b for b in (carry, new_data.iloc[k:]) if b is not None and len(b)]
+            if rest:
+                emit(pd.concat(rest, ignore_index=True))
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+    tmp.replace(out_path)
     if removed:
         print(f"🧹 덮어쓰기: 기존 데이터에서 동일 날짜 행 {removed:,}개 제거")
+    return rows
+
+
+def combine(market, mode, chunked=None):
+    """
+    한 파티션의 원본 → all_data.csv 증분 누적 → 이번에 반영한 날짜 수(새 데이터 없으면 0)
+    chunked: None이면 누적 파일 크기로 자동 결정
+    """
+    data_dir, out_dir = raw_dir(market, mode), proc_dir(market, mode)
+    out_path = out_dir / "all_data.csv"
+    print(f"\n📊 [{market}/{mode}] 데이터 병합(증분 누적) 시작... ({data_dir} → {out_path})\n")
+
+    if not data_dir.exists():
+        print(f"ℹ️ 원본 폴더가 없습니다: {data_dir} → 건너뜀")
+        return 0
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # 1) data 폴더에서 파일 읽기 → 날짜별 DF 만들기
+    new_dfs = []
+    new_dates = set()
+
+    files = sorted([p for p in data_dir.iterdir() if p.suffix.lower() in (".xls", ".xlsx")])
+    if not files:
+        # ✅ 액션에서 다운로더가 저장 안 했을 수도 있으니, 실패 말고 성공 종료
+        print("ℹ️ data 폴더에 xls/xlsx 파일이 없습니다. (다운로드 실패/휴일 가능) → 종료(성공)")
+        return 0
+
+    for file in files:
+        date_str = file.stem.replace("re", "")  # reYYYYMMDD
+        try:
+            dt = pd.to_datetime(date_str, format="%Y%m%d", errors="coerce")
+            if pd.isna(dt):
+                print(f"⚠️ 스킵: {file.name} → 날짜 파싱 실패({date_str})")
+                continue
+
+            df, why = read_table(file, dt)
+            if df is None:
+                print(f"⚠️ 스킵: {file.name} → {why}")
+                continue
+
+            new_dfs.append(df)
+            new_dates.add(dt.normalize())
+
+            print(f"✅ 처리 완료: {file.name} ({len(df)}행)")
+
+        except Exception as e:
+            print(f"⚠️ 스킵: {file.name} → {e}")
+
+    # ✅ 유효 새 데이터가 없으면 실패하지 말고 성공 종료
+    if not new_dfs:
+        print("\nℹ️ 새로 병합할 유효 데이터가 없습니다. (주말/휴일/사이트 응답 문제 가능) → 종료(성공)")
+        return 0
+
+    new_data = pd.concat(new_dfs, ignore_index=True)
+
+    # 2) 기존 누적과 병합(같은 날짜는 덮어쓰기) + 저장
+    if chunked is None:
+        chunked = out_path.exists() and out_path.stat().st_size >= CHUNKED_MIN_BYTES
+    rows = None
+    if chunked and out_path.exists():
+        print(f"📌 기존 누적: {out_path.name} ({out_path.stat().st_size / 1024 ** 2:,.0f} MB) → 청크 병합"
+              f"(청크당 {CHUNK_ROWS:,}행)")
+        try:
+            rows = merge_chunked(out_path, new_data, new_dates)
+        except ValueError as e:
+            print(f"⚠️ 청크 병합 불가({e}) → 메모리 병합")
+    if rows is None:
+        rows = merge_in_memory(out_path, new_data, new_dates)
+
+    print(f"\n🎉 누적 병합 완료! 총 {rows:,}행 → {out_path} 저장")
+    print(f"🆕 이번에 반영한 날짜 수: {len(new_dates)}개")
+    return len(new_dates)
+
+
+# ──────────────────────────────────────────────────────────────
+# 자체 점검: 합성 누적(날짜순, N GB) + 새 날짜(중간 덮어쓰기 1일 + 뒤에 추가 2일)
+# 병합은 별도 프로세스(spawn)에서 실행해 그 프로세스의 최대 RSS만 잼
+SYN_ROWS_PER_DAY = 20_000
+
+
+def _syn_day(day, rng, n=SYN_ROWS_PER_DAY):
+    buy = rng.integers(0, 10 ** 9, n)
+    sell = rng.integers(0, 10 ** 9, n)
+    order = np.argsort(-(buy + sell), kind="stable")
+    names = pd.array([f"SYN {i:06d} CORP" for i in range(n)], dtype="string")
+    df = pd.DataFrame({"종목명": names[order], "매수": buy[order], "매도": sell[order]})
+    df["순매수"] = df["매수"] - df["매도"]
+    df["날짜"] = day
+    df["순위"] = np.arange(1, n + 1)
+    return df.sort_values("종목명", kind="stable")
+
+
+def _write_history(path, gb, seed=0, n_templates=5):
+    """
+    날짜순 합성 누적 CSV를 목표 크기까지 이어 씀 → 거래일 목록
+    하루치 CSV 텍스트 몇 개를 만들어 두고 날짜만 바꿔 씀(생성 시간/메모리 최소화)
+    """
+    rng = np.random.default_rng(seed)
+    d0 = pd.Timestamp("2000-01-03")
+    tag = d0.strftime("%Y-%m-%d").encode()
+    templates = [_syn_day(d0, rng).to_csv(index=False, header=False).encode("utf-8") for _ in range(n_templates)]
+    days = []
+    with open(path, "wb") as f:
+        f.write((",".join(COLS) + "\n").encode("utf-8-sig"))
+        while f.tell() < gb * 1024 ** 3:
+            day = d0 + pd.Timedelta(days=len(days))
+            f.write(templates[len(days) % n_templates].replace(tag, day.strftime("%Y-%m-%d").encode()))
+            days.append(day)
+    return days
+
+
+def _merge_job(path, new_path, chunk_rows):
+    import resource
+    new_data = pd.read_pickle(new_path)
+    rows = merge_chunked(path, new_data, set(new_data["날짜"].unique()), chunk_rows)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024      # Linux: KB
+    pd.Series({"rows": rows, "peak_mb": peak}).to_pickle(str(new_path) + ".out")
+
+
+def selftest(gb=2.0, limit_mb=512, chunk_rows=CHUNK_ROWS):
+    import multiprocessing as mp
+    import tempfile
+    import time
+    from pathlib import Path
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path, new_path = Path(tmp) / "all_data.csv", Path(tmp) / "new.pkl"
+        t = time.perf_counter()
+        days = _write_history(path, gb)
+        size = path.stat().st_size
+        n_old = len(days) * SYN_ROWS_PER_DAY
+        print(f"🧪 합성 누적: {size / 1024 ** 3:.2f} GB, {n_old:,}행, 거래일 {len(days):,}일 "
+              f"({time.perf_counter() - t:.0f}s)")
+
+        rng = np.random.default_rng(1)
+        replaced = days[len(days) // 2]
+        added = [days[-1] + pd.Timedelta(days=i) for i in (1, 2)]
+        new_data = pd.concat([_syn_day(d, rng) for d in [replaced] + added], ignore_index=True)
+        new_data.to_pickle(new_path)
+
+        t = time.perf_counter()
+        proc = mp.get_context("spawn").Process(target=_merge_job, args=(path, new_path, chunk_rows))
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0:
+            raise SystemExit(f"❌ 병합 프로세스 실패(exit {proc.exitcode})")
+        out = pd.read_pickle(str(new_path) + ".out")
+        sec = time.perf_counter() - t
+
+        # 결과 검증(청크로 다시 읽으며): 행 수, 날짜순, 덮어쓴 날/추가한 날 내용
+        expect = n_old + len(added) * SYN_ROWS_PER_DAY
+        want = new_data.set_index(["날짜", "종목명"])["매수"]
+        rows, prev, hits, ok_sorted = 0, None, 0, True
+        for chunk in pd.read_csv(path, chunksize=chunk_rows, parse_dates=["날짜"], encoding="utf-8-sig"):
+            rows += len(chunk)
+            d = chunk["날짜"]
+            ok_sorted &= bool(d.is_monotonic_increasing) and (prev is None or d.iloc[0] >= prev)
+            prev = d.iloc[-1]
+            sub = chunk[d.isin(want.index.get_level_values(0))]
+            if len(sub):
+                got = sub.set_index(["날짜", "종목명"])["매수"]
+                hits += int((got == want.reindex(got.index)).sum())
+
+    checks = {
+        f"행 수 {expect:,}": rows == expect == int(out["rows"]),
+        "날짜순": ok_sorted,
+        f"새 날짜 {len(new_data):,}행 반영": hits == len(new_data),
+        f"최대 RSS ≤ {limit_mb} MB": out["peak_mb"] <= limit_mb,
+    }
+    print(f"🔀 청크 병합: {sec:.0f}s ({size / 1024 ** 2 / sec:.0f} MB/s), 최대 RSS {out['peak_mb']:.0f} MB")
+    print("검증:", ", ".join(f"{k} {'OK' if v else 'FAIL'}" for k, v in checks.items()))
+    if not all(checks.values()):
+        raise SystemExit(1)
 
-# 4) 합치고 저장
-merged = pd.concat([old, new_data], ignore_index=True)
 
-merged["종목명"] = merged["종목명"].astype("string").str.strip()
-merged["날짜"] = pd.to_datetime(merged["날짜"], errors="coerce").dt.normalize()
+def main():
+    args = sys.argv[1:]
+    if "--selftest" in args:
+        i = args.index("--selftest")
+        selftest(float(args[i + 1]) if len(args) > i + 1 else 2.0)
+        return
+    chunked = True if "--chunked" in args else None
+    market_arg, mode_arg = pop_opt(args, "--market"), pop_opt(args, "--mode")
+    if market_arg or mode_arg:
+        parts = partitions(parse_list(market_arg, MARKETS, DEFAULT_MARKET), parse_list(mode_arg, MODES, DEFAULT_MODE))
+    else:
+        # 지정 없으면 원본 폴더가 있는 파티션 전부(기본 파티션은 항상)
+        parts = [p for p in partitions(list(MARKETS), list(MODES))
+                 if p == partitions()[0] or raw_dir(*p).exists()]
 
-merged = merged.dropna(subset=["날짜", "종목명"])
-merged = merged.sort_values(["날짜", "종목명"]).reset_index(drop=True)
+    # 새 데이터가 없어도 실패하지 않음(주말/휴일/다운로드 실패) — 액션이 다음 단계로 진행
+    total = sum(combine(m, md, chunked) for m, md in parts)
+    print(f"\n📦 파티션 {len(parts)}개 병합 종료 (반영 날짜 합계 {total}개)")
 
-merged.to_csv(OUT_PATH, index=False, encoding="utf-8-sig")
 
-print(f"\n🎉 누적 병합 완료! 총 {len(merged):,}행 → {OUT_PATH} 저장")
-print(f"🆕 이번에 반영한 날짜 수: {len(new_dates)}개")
+if __name__ == "__main__":
+    main()
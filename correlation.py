@@ -0,0 +1,319 @@
+# correlation.py
+# 종목 간 일별 순매수 롤링 상관행렬 (거래일 × 종목 밀집 배열, 미등장일 = 0)
+# - 윈도우별 상태: 최근 W일 행, 합계 벡터, 그람 행렬 G = XᵀX (종목 × 종목)
+# - 새 거래일: 나가는 행/들어오는 행의 rank-1 갱신. 하루에 값이 있는 종목은 TOP50뿐이라
+#   G의 (등장 종목 × 등장 종목) 블록만 갱신 → O(50²), 종목 수와 무관
+#   (부동소수 누적 오차 방지: W번 갱신마다 남은 행으로 G를 새로 계산)
+# - 한 종목의 상위 동조 조회는 상관행렬의 해당 행만 계산 O(종목)
+# - clean_and_enrich.py가 상태(processed/corr_state.npz, 로컬 캐시)를 증분 갱신하고
+#   종목별 상위 동조/역동조 종목을 processed/corr_top.csv로 저장 → 앱은 이 파일만 읽음
+#
+# 벤치마크: python correlation.py --bench
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+STATE_PATH = PROC / "corr_state.npz"
+TOP_PATH = PROC / "corr_top.csv"
+
+CORR_WINDOWS = (20, 60, 120)
+TOP_K = 10          # 종목당 동조(+) 상위 K, 역동조(−) 상위 K
+UNIT = 1e6          # 백만 달러 단위로 누적(제곱합 크기 축소)
+
+
+def dense_net(df, key="종목ID"):
+    """긴 포맷 → (X: 거래일 × 종목 순매수[백만$], ids, days, seen: 등장 여부 0/1)"""
+    import pandas as pd
+
+    day_codes, days = pd.factorize(df["날짜"], sort=True)
+    col_codes, ids = pd.factorize(df[key], sort=True)
+    x = np.zeros((len(days), len(ids)), dtype=np.float64)
+    np.add.at(x, (day_codes, col_codes), df["순매수"].to_numpy(np.float64) / UNIT)
+    seen = np.zeros_like(x)
+    seen[day_codes, col_codes] = 1.0
+    return x, np.asarray(ids), days, seen
+
+
+class RollingCorr:
+    """한 윈도우(W거래일)의 롤링 상관 상태"""
+
+    def __init__(self, window, ids=()):
+        self.window = int(window)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        n = len(self.ids)
+        self.days = []                              # 윈도우 안의 거래일(오래된 → 최신)
+        self.rows = np.zeros((0, n))
+        self.seen = np.zeros((0, n))
+        self.sum = np.zeros(n)
+        self.gram = np.zeros((n, n))
+        self.updates = 0
+        self._corr = None
+
+    # ── 구성
+    @classmethod
+    def from_matrix(cls, window, x, ids, days, seen):
+        rc = cls(window, ids)
+        rc.days = [np.datetime64(d, "D") for d in days[-rc.window:]]
+        rc.rows = x[-rc.window:].copy()
+        rc.seen = seen[-rc.window:].copy()
+        rc._rebuild()
+        return rc
+
+    def _rebuild(self):
+        self.sum = self.rows.sum(axis=0)
+        self.gram = self.rows.T @ self.rows
+        self.updates = 0
+        self._corr = None
+
+    def _align(self, ids):
+        """새 종목ID가 생기면 열을 늘림(기존 열 순서 유지) → ids에 맞춘 열 인덱스"""
+        new = np.setdiff1d(ids, self.ids)
+        if len(new):
+            n0, n1 = len(self.ids), len(self.ids) + len(new)
+            self.ids = np.r_[self.ids, new]
+            self.rows = np.pad(self.rows, ((0, 0), (0, len(new))))
+            self.seen = np.pad(self.seen, ((0, 0), (0, len(new))))
+            self.sum = np.r_[self.sum, np.zeros(len(new))]
+            g = np.zeros((n1, n1))
+            g[:n0, :n0] = self.gram
+            self.gram = g
+        pos = {v: i for i, v in enumerate(self.ids.tolist())}
+        return np.array([pos[v] for v in ids.tolist()], dtype=np.int64)
+
+    # ── 증분 갱신
+    def append(self, day, ids, values, seen=None):
+        """하루치(ids, 순매수[백만$]) 추가 → 윈도우를 넘는 가장 오래된 날은 제거"""
+        cols = self._align(np.asarray(ids, dtype=np.int64))
+        row = np.zeros(len(self.ids))
+        row[cols] = values
+        srow = np.zeros(len(self.ids))
+        srow[cols] = 1.0 if seen is None else seen
+
+        if len(self.days) >= self.window:
+            old = self.rows[0]
+            nz = np.flatnonzero(old)
+            self.sum[nz] -= old[nz]
+            self.gram[np.ix_(nz, nz)] -= np.outer(old[nz], old[nz])
+            self.rows, self.seen, self.days = self.rows[1:], self.seen[1:], self.days[1:]
+
+        nz = np.flatnonzero(row)
+        self.sum[nz] += row[nz]
+        self.gram[np.ix_(nz, nz)] += np.outer(row[nz], row[nz])
+        self.rows = np.vstack([self.rows, row])
+        self.seen = np.vstack([self.seen, srow])
+        self.days.append(np.datetime64(day, "D"))
+
+        self.updates += 1
+        if self.updates >= self.window:
+            self._rebuild()
+        self._corr = None
+
+    # ── 조회
+    def _moments(self):
+        n = max(len(self.rows), 1)
+        mean = self.sum / n
+        var = np.diag(self.gram) / n - mean * mean
+        sd = np.sqrt(np.clip(var, 0.0, None))
+        ok = (sd > 0) & (self.seen.sum(axis=0) >= self.window / 2)
+        return n, mean, sd, ok
+
+    def corr(self):
+        """종목 × 종목 피어슨 상관(분산 0 또는 등장일 < W/2 인 종목은 NaN)"""
+        if self._corr is None:
+            n, mean, sd, ok = self._moments()
+            cov = self.gram / n - np.outer(mean, mean)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                c = cov / np.outer(sd, sd)
+            c[~ok, :] = np.nan
+            c[:, ~ok] = np.nan
+            np.fill_diagonal(c, np.nan)
+            self._corr = np.clip(c, -1.0, 1.0)
+        return self._corr
+
+    def corr_row(self, i):
+        """i번째 종목과 전 종목의 상관(행 하나만 계산)"""
+        if self._corr is not None:
+            return self._corr[i]
+        n, mean, sd, ok = self._moments()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = (self.gram[i] / n - mean[i] * mean) / (sd[i] * sd)
+        if not ok[i]:
+            r[:] = np.nan
+        r[~ok] = np.nan
+        r[i] = np.nan
+        return np.clip(r, -1.0, 1.0)
+
+    def top(self, stock_id, k=TOP_K):
+        """(동조 상위 [(id, r)], 역동조 상위 [(id, r)])"""
+        hit = np.flatnonzero(self.ids == stock_id)
+        if not len(hit):
+            return [], []
+        r = self.corr_row(hit[0])
+        valid = np.flatnonzero(~np.isnan(r))
+        order = valid[np.argsort(r[valid])]
+        pos = [(int(self.ids[i]), float(r[i])) for i in order[::-1][:k] if r[i] > 0]
+        neg = [(int(self.ids[i]), float(r[i])) for i in order[:k] if r[i] < 0]
+        return pos, neg
+
+    def top_table(self, k=TOP_K):
+        """전 종목의 상위 동조/역동조 → 긴 포맷 DataFrame (배치 argpartition)"""
+        import pandas as pd
+
+        c = self.corr()
+        n = len(self.ids)
+        if n < 2:
+            return pd.DataFrame(columns=["종목ID", "창", "방향", "순위", "상대종목ID", "상관계수"])
+        k = min(k, n - 1)
+        parts = []
+        for sign, label in ((1.0, "동조"), (-1.0, "역동조")):
+            s = np.where(np.isnan(c), -np.inf, sign * c)
+            idx = np.argpartition(-s, k - 1, axis=1)[:, :k]
+            val = np.take_along_axis(s, idx, axis=1)
+            order = np.argsort(-val, axis=1)
+            idx = np.take_along_axis(idx, order, axis=1)
+            val = np.take_along_axis(val, order, axis=1)
+            rr, kk = np.nonzero(val > 0)
+            parts.append(pd.DataFrame({
+                "종목ID": self.ids[rr],
+                "창": self.window,
+                "방향": label,
+                "순위": kk + 1,
+                "상대종목ID": self.ids[idx[rr, kk]],
+                "상관계수": (sign * val[rr, kk]).round(4),
+            }))
+        return pd.concat(parts, ignore_index=True)
+
+    # ── 저장/로드(윈도우별 접두사로 한 npz에)
+    def to_arrays(self, prefix):
+        return {
+            f"{prefix}_ids": self.ids, f"{prefix}_days": np.array(self.days, dtype="datetime64[D]"),
+            f"{prefix}_rows": self.rows, f"{prefix}_seen": self.seen,
+            f"{prefix}_sum": self.sum, f"{prefix}_gram": self.gram,
+            f"{prefix}_updates": np.array(self.updates),
+        }
+
+    @classmethod
+    def from_arrays(cls, window, z, prefix):
+        rc = cls(window, z[f"{prefix}_ids"])
+        rc.days = list(z[f"{prefix}_days"])
+        rc.rows, rc.seen = z[f"{prefix}_rows"], z[f"{prefix}_seen"]
+        rc.sum, rc.gram = z[f"{prefix}_sum"], z[f"{prefix}_gram"]
+        rc.updates = int(z[f"{prefix}_updates"])
+        return rc
+
+
+def load_state(path: Path = STATE_PATH, windows=CORR_WINDOWS):
+    try:
+        with np.load(path) as z:
+            return {w: RollingCorr.from_arrays(w, z, f"w{w}") for w in windows}
+    except (FileNotFoundError, KeyError, ValueError, OSError):
+        return None
+
+
+def save_state(state: dict, path: Path = STATE_PATH):
+    arrays = {}
+    for w, rc in state.items():
+        arrays.update(rc.to_arrays(f"w{w}"))
+    tmp = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp, **arrays)
+    tmp.replace(path)
+
+
+def update_state(df, state=None, windows=CORR_WINDOWS):
+    """
+    기존 상태에 새 거래일만 증분 반영. 상태가 없거나, 윈도우 안의 과거 날짜 값이
+    바뀌었으면(덮어쓰기 재수집) 해당 윈도우만 전체 재계산.
+    → (state, {창: "증분 k일" | "재계산" | "변경 없음"})
+    """
+    x, ids, days, seen = dense_net(df)
+    day_arr = np.asarray(days.values, dtype="datetime64[D]")
+    state = dict(state or {})
+    how = {}
+
+    for w in windows:
+        rc = state.get(w)
+        ok = rc is not None and len(rc.days) > 0
+        if ok:
+            pos = np.searchsorted(day_arr, np.array(rc.days, dtype="datetime64[D]"))
+            ok = bool(np.all(pos < len(day_arr)) and np.array_equal(day_arr[np.minimum(pos, len(day_arr) - 1)], rc.days))
+        if ok:
+            # 윈도우 안 과거 값이 그대로인지 확인(종목 열 정렬 맞춰 비교)
+            cols = rc._align(ids)
+            cur = np.zeros((len(pos), len(rc.ids)))
+            cur[:, cols] = x[pos]
+            ok = np.allclose(cur, rc.rows, rtol=0, atol=1e-9)
+        if not ok:
+            state[w] = RollingCorr.from_matrix(w, x, ids, days, seen)
+            how[w] = "재계산"
+            continue
+        new_idx = np.arange(pos[-1] + 1, len(day_arr))
+        for i in new_idx:
+            present = seen[i] > 0
+            rc.append(day_arr[i], ids[present], x[i, present])
+        how[w] = f"증분 {len(new_idx)}일" if len(new_idx) else "변경 없음"
+    return state, how
+
+
+def build_outputs(df, state_path: Path = STATE_PATH, top_path: Path = TOP_PATH, k=TOP_K):
+    """enrich 단계용: 상태 증분 갱신 + 상위 동조 종목 표 저장"""
+    import pandas as pd
+
+    state, how = update_state(df, load_state(state_path))
+    try:
+        save_state(state, state_path)
+    except OSError:
+        pass
+    top = pd.concat([rc.top_table(k) for rc in state.values()], ignore_index=True)
+    top.to_csv(top_path, index=False, encoding="utf-8-sig")
+    return top, how
+
+
+# ──────────────────────────────────────────────────────────────
+def bench(src: Path = PROC / "all_data_clean.csv", window: int = 60):
+    import pandas as pd
+    from indicators import synthetic
+
+    base = pd.read_csv(src, parse_dates=["날짜"], encoding="utf-8-sig",
+                       usecols=["날짜", "종목ID", "매수", "매도", "순매수"])
+    for scale in (1, 10):
+        df = synthetic(base, scale) if scale > 1 else base
+        x, ids, days, seen = dense_net(df)
+
+        t = time.perf_counter()
+        full = RollingCorr.from_matrix(window, x, ids, days, seen)
+        full.corr()
+        t_full = time.perf_counter() - t
+
+        rc = RollingCorr.from_matrix(window, x[:-1], ids, days[:-1], seen[:-1])
+        present = seen[-1] > 0
+        t = time.perf_counter()
+        rc.append(days[-1], ids[present], x[-1, present])
+        t_inc = time.perf_counter() - t
+
+        t = time.perf_counter()
+        rc.top(int(ids[0]))
+        t_one = time.perf_counter() - t
+
+        err = np.nanmax(np.abs(rc.corr() - full.corr()))
+        t = time.perf_counter()
+        full.top_table()
+        t_top = time.perf_counter() - t
+        print(f"x{scale:<3} {len(ids):>5}종목 W={window} | 전체 재계산+행렬 {t_full * 1000:8.1f} ms | "
+              f"하루 증분 {t_inc * 1000:6.2f} ms | 1종목 조회 {t_one * 1000:6.2f} ms | "
+              f"전 종목 상위표 {t_top * 1000:7.1f} ms | 증분 오차 {err:.1e}")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        bench()
+    else:
+        import pandas as pd
+        df = pd.read_csv(PROC / "all_data_clean.csv", parse_dates=["날짜"], encoding="utf-8-sig")
+        top, how = build_outputs(df)
+        print(f"🔗 {TOP_PATH.name} 저장 (rows={len(top):,}) | " + ", ".join(f"W{w}: {h}" for w, h in how.items()))
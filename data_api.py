@@ -0,0 +1,365 @@
+# data_api.py
+# 읽기 전용 HTTP 데이터 API (표준 라이브러리 http.server) — 대시보드와 같은 가공 데이터를 JSON/Arrow로
+#   GET /api/version                         데이터 버전(ETag 값), 거래일 범위
+#   GET /api/stocks                          종목 목록 (종목ID, 종목명, 표시명)
+#   GET /api/series/<종목ID|종목명>          종목별 일별 시계열 + 지표  (?start=&end=)
+#   GET /api/ranking                         기간 순매수/순매도 상위 (?start=&end= 또는 ?days=20, ?mode=buy|sell, ?n=50)
+#   GET /api/filter                          조건 필터 결과 (?name=저장이름 또는 ?spec=JSON, ?lookback=20)
+#   공통: ?format=json(기본)|arrow
+#
+# - 데이터는 시작 시 한 번 메모리에 올림(SeriesIndex 종목별 행 구간 + FeatureStore 누적합) → 요청은 슬라이스/차분만
+# - ETag = 데이터 버전(processed 파일 mtime/크기 해시). If-None-Match 일치 → 304(본문 계산 없음)
+# - 같은 요청은 응답 바이트를 캐시(LRU), 데이터가 바뀌면 자동 재적재 후 캐시 비움
+#
+# 실행: python data_api.py [--host 127.0.0.1] [--port 8765]
+# 부하 테스트: python data_api.py --bench
+
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from filter_engine import FeatureStore, run_filter, describe, feature_label, iter_conditions, \
+    load_filters, DEFAULT_FILTER, WINDOW_FEATURES, FILTERS_PATH
+from lookup import load_lookup, LOOKUP_PATH
+from series_index import SeriesIndex
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+DATA_PATH = PROC / "all_data_clean.csv"
+VERSION_FILES = (DATA_PATH, LOOKUP_PATH, FILTERS_PATH)
+
+RELOAD_CHECK_SEC = 2.0     # 데이터 파일 변경 확인 주기
+CACHE_ENTRIES = 512        # 응답 캐시(LRU) 크기
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def data_version(paths=VERSION_FILES) -> str:
+    h = hashlib.sha1()
+    for p in paths:
+        try:
+            s = p.stat()
+            h.update(f"{p.name}:{s.st_mtime_ns}:{s.st_size};".encode())
+        except FileNotFoundError:
+            h.update(f"{p.name}:-;".encode())
+    return h.hexdigest()[:16]
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class DataStore:
+    """한 데이터 버전의 메모리 구조(요청 간 공유, 읽기 전용)"""
+
+    def __init__(self, version: str):
+        self.version = version
+        self.lookup = load_lookup()
+        df = pd.read_csv(DATA_PATH, parse_dates=["날짜"], encoding="utf-8-sig", dtype={"종목ID": "int32"})
+        self.df = df.sort_values(["종목ID", "날짜"]).reset_index(drop=True)
+        self.index = SeriesIndex(self.df)                            # 종목ID → 행 구간(날짜는 datetime으로 보관)
+        self.df["날짜"] = self.df["날짜"].dt.strftime("%Y-%m-%d")   # 응답용 문자열(ISO 날짜)
+        self.fs = FeatureStore(df)
+        self.filters = load_filters()
+
+    # ── 조회
+    def stock_id(self, key: str) -> int:
+        key = unquote(key)
+        if key.isdigit():
+            sid = int(key)
+        else:
+            sid = self.lookup["name_to_id"].get(key, self.lookup["disp_to_id"].get(key))
+        if sid is None or sid not in self.index:
+            raise ApiError(404, f"종목 없음: {key}")
+        return sid
+
+    def decode(self, ids):
+        names, disp = self.lookup["names"], self.lookup["disp"]
+        return [names[i] for i in ids], [disp[i] for i in ids]
+
+    def stocks(self, q):
+        ids = self.index.stock_ids.tolist()
+        names, disp = self.decode(ids)
+        return pd.DataFrame({"종목ID": ids, "종목명": names, "표시명": disp})
+
+    def series(self, q, key):
+        sid = self.stock_id(key)
+        return self.index.take([sid], q.get("start") or None, q.get("end") or None).drop(columns=["종목ID"])
+
+    def ranking(self, q):
+        days = self.fs.days
+        if q.get("days"):
+            n = max(1, min(int(q["days"]), len(days)))
+            start, end = days[-n], days[-1]
+        else:
+            start, end = q.get("start") or days[0], q.get("end") or days[-1]
+        mode = q.get("mode", "buy")
+        if mode not in ("buy", "sell"):
+            raise ApiError(400, "mode는 buy|sell")
+        top_n = int(q.get("n", 50))
+
+        buy = self.fs.range_sum("매수", start, end)
+        sell = self.fs.range_sum("매도", start, end)
+        net = self.fs.range_sum("순매수", start, end)
+        score = net if mode == "buy" else -net
+        idx = np.flatnonzero(score > 0)
+        idx = idx[np.argsort(-score[idx], kind="stable")][:top_n]
+        ids = self.fs.stock_ids[idx]
+        names, disp = self.decode(ids)
+        out = pd.DataFrame({
+            "순위": np.arange(1, len(idx) + 1), "종목ID": ids, "종목명": names, "표시명": disp,
+            "매수합계": buy[idx], "매도합계": sell[idx],
+        })
+        out["순매수" if mode == "buy" else "순매도합계"] = score[idx]
+        return out
+
+    def filter(self, q):
+        if q.get("spec"):
+            try:
+                spec = json.loads(q["spec"])
+            except json.JSONDecodeError as e:
+                raise ApiError(400, f"spec JSON 오류: {e}")
+        elif q.get("name"):
+            if q["name"] not in self.filters:
+                raise ApiError(404, f"저장된 필터 없음: {q['name']}")
+            spec = self.filters[q["name"]]
+        else:
+            spec = DEFAULT_FILTER
+        if not isinstance(spec, dict):
+            raise ApiError(400, "spec은 JSON 객체여야 합니다(예: {\"logic\": \"and\", \"conditions\": [...]})")
+        lookback = int(q["lookback"]) if q.get("lookback") else None
+        try:
+            ids = run_filter(self.fs, spec, lookback)
+        except (KeyError, ValueError, TypeError, AttributeError) as e:    # 조건 모양이 틀린 spec
+            raise ApiError(400, f"spec 오류: {e}")
+
+        mask = np.isin(self.fs.stock_ids, ids)
+        names, disp = self.decode(ids)
+        out = pd.DataFrame({"종목ID": ids, "종목명": names, "표시명": disp})
+        for c in iter_conditions(spec):
+            if c.get("enabled", True):
+                w = c.get("window") if c["feature"] in WINDOW_FEATURES else None
+                out[feature_label(c)] = self.fs.get(c["feature"], w)[mask]
+        out.attrs["meta"] = {"조건": describe(spec), "결과수": len(out)}
+        return out
+
+
+# ──────────────────────────────────────────────────────────────
+class DataApp:
+    """버전 관리(자동 재적재) + 응답 캐시 + 라우팅"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._checked = 0.0
+        self.store = DataStore(data_version())
+        self._cache = OrderedDict()
+        self.stats = {"요청": 0, "304": 0, "캐시": 0, "계산": 0, "재적재": 0, "재적재오류": 0}
+
+    def current(self) -> DataStore:
+        now = time.monotonic()
+        if now - self._checked >= RELOAD_CHECK_SEC:
+            with self._lock:
+                if now - self._checked >= RELOAD_CHECK_SEC:
+                    self._checked = now
+                    v = data_version()
+                    if v != self.store.version:
+                        try:
+                            store = DataStore(v)
+                        except Exception as e:      # 쓰는 중인 파일 등 → 옛 store로 계속, 다음 확인 때 재시도
+                            self.stats["재적재오류"] += 1
+                            print(f"⚠️ 데이터 재적재 실패(이전 버전 유지): {e}")
+                        else:
+                            self.store, self._cache = store, OrderedDict()   # 통째로 교체(요청 중인 스레드는 옛 store 사용)
+                            self.stats["재적재"] += 1
+        return self.store
+
+    def handle(self, path, query, if_none_match):
+        """→ (status, content_type, body, etag)"""
+        self.stats["요청"] += 1
+        store = self.current()
+
+        # 형식/경로 검사가 먼저 — 잘못된 요청은 ETag가 맞아도 400/404 (304는 본문 계산만 건너뜀)
+        q = {k: v[-1] for k, v in parse_qs(query).items()}
+        fmt = q.get("format", "json")
+        if fmt not in ("json", "arrow"):
+            raise ApiError(400, "format은 json|arrow")
+        parts = [p for p in path.split("/") if p]
+        if len(parts) < 2 or parts[0] != "api":
+            raise ApiError(404, "경로 없음")
+        route, args = parts[1], parts[2:]
+        handlers = {"stocks": store.stocks, "series": store.series, "ranking": store.ranking, "filter": store.filter}
+        if route != "version" and (route not in handlers or (route == "series") != bool(args)):
+            raise ApiError(404, "경로 없음")
+
+        etag = f'"{store.version}"'
+        if if_none_match and ({t.strip() for t in if_none_match.split(",")} & {etag, "*"}):
+            self.stats["304"] += 1
+            return 304, None, b"", etag
+
+        key = (store.version, path, query)
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            if hit is not None:
+                self._cache.move_to_end(key)
+        if hit is not None:
+            self.stats["캐시"] += 1
+            return (*hit, etag)
+
+        meta = {"version": store.version}
+        if route == "version":
+            days = store.fs.days
+            body = {**meta, "시작일": days[0].strftime("%Y-%m-%d"), "종료일": days[-1].strftime("%Y-%m-%d"),
+                    "거래일수": len(days), "종목수": len(store.index.stock_ids)}
+            res = 200, "application/json; charset=utf-8", json.dumps(body, ensure_ascii=False).encode()
+        else:
+            try:
+                frame = handlers[route](q, *args[:1])
+            except (TypeError, ValueError) as e:
+                raise ApiError(400, str(e))
+            meta.update(frame.attrs.get("meta", {}))
+            res = encode(frame, fmt, meta)
+        self.stats["계산"] += 1
+
+        with self._cache_lock:
+            self._cache[key] = res
+            if len(self._cache) > CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+        return (*res, etag)
+
+
+def encode(frame, fmt, meta):
+    if fmt == "arrow":
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ApiError(406, "pyarrow가 설치되어 있지 않습니다(format=json 사용)")
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({k: str(v) for k, v in meta.items()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as w:
+            w.write_table(table)
+        return 200, ARROW_TYPE, sink.getvalue().to_pybytes()
+    # NaN/inf → null (JSON 표준)
+    rows = frame.replace([np.inf, -np.inf], np.nan).to_json(orient="records", force_ascii=False, double_precision=6)
+    body = json.dumps(meta, ensure_ascii=False)[:-1] + f', "rows": {rows}}}'
+    return 200, "application/json; charset=utf-8", body.encode("utf-8")
+
+
+def make_handler(app: DataApp):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"    # keep-alive(폴링 클라이언트 연결 재사용)
+        disable_nagle_algorithm = True   # 헤더/본문 두 번 쓰기 + delayed ACK 로 40ms 지연 방지
+
+        def do_GET(self):
+            u = urlsplit(self.path)
+            try:
+                status, ctype, body, etag = app.handle(u.path, u.query, self.headers.get("If-None-Match"))
+            except ApiError as e:
+                status, ctype, etag = e.status, "application/json; charset=utf-8", None
+                body = json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+            except Exception as e:          # 예상 못 한 오류도 연결을 끊지 말고 500 JSON으로
+                print(f"⚠️ {self.path}: {type(e).__name__}: {e}")
+                status, ctype, etag = 500, "application/json; charset=utf-8", None
+                body = json.dumps({"error": f"서버 오류: {type(e).__name__}"}, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")   # 매번 재검증(304면 본문 없음)
+            if ctype:
+                self.send_header("Content-Type", ctype)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8765):
+    app = DataApp()
+    httpd = ThreadingHTTPServer((host, port), make_handler(app))
+    httpd.daemon_threads = True
+    return app, httpd
+
+
+# ──────────────────────────────────────────────────────────────
+def bench(clients=16, seconds=3.0):
+    """같은 프로세스에 서버를 띄우고 keep-alive 클라이언트 여러 개로 초당 요청 수 측정"""
+    import http.client
+    from concurrent.futures import ThreadPoolExecutor
+
+    app, httpd = serve(port=0)
+    port = httpd.server_address[1]
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    ids = app.store.index.stock_ids.tolist()
+    paths = [f"/api/series/{i}" for i in ids[:200]] + [
+        "/api/ranking?days=20", "/api/ranking?days=5&mode=sell", "/api/filter", "/api/stocks",
+    ]
+
+    def run(label, make_path, etag=None, fresh=False):
+        def worker(k):
+            con = http.client.HTTPConnection("127.0.0.1", port)
+            n, lat, i = 0, [], k
+            end = time.perf_counter() + seconds
+            while time.perf_counter() < end:
+                if fresh:
+                    with app._cache_lock:
+                        app._cache.clear()
+                headers = {"If-None-Match": etag} if etag else {}
+                t = time.perf_counter()
+                con.request("GET", make_path(i), headers=headers)
+                r = con.getresponse()
+                r.read()
+                lat.append(time.perf_counter() - t)
+                n += 1
+                i += clients
+            con.close()
+            return n, lat
+
+        with ThreadPoolExecutor(clients) as ex:
+            res = list(ex.map(worker, range(clients)))
+        n = sum(r[0] for r in res)
+        lat = sorted(x for r in res for x in r[1])
+        print(f"{label:<28} {n / seconds:9,.0f} req/s | p50 {lat[len(lat) // 2] * 1000:6.2f} ms, "
+              f"p99 {lat[int(len(lat) * 0.99)] * 1000:6.2f} ms")
+
+    etag = f'"{app.store.version}"'
+    print(f"클라이언트 {clients}개 × {seconds:.0f}s, 요청 경로 {len(paths)}종")
+    run("계산(캐시 없음)", lambda i: paths[i % len(paths)], fresh=True)
+    run("응답 캐시 적중 200", lambda i: paths[i % len(paths)])
+    run("If-None-Match → 304", lambda i: paths[i % len(paths)], etag=etag)
+    run("Arrow 시계열(캐시 적중)", lambda i: paths[i % 200] + "?format=arrow")
+    print("통계:", app.stats)
+    httpd.shutdown()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--bench" in args:
+        bench()
+    else:
+        host = args[args.index("--host") + 1] if "--host" in args else "127.0.0.1"
+        port = int(args[args.index("--port") + 1]) if "--port" in args else 8765
+        app, httpd = serve(host, port)
+        print(f"🌐 http://{host}:{port}/api/version  (데이터 버전 {app.store.version})")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
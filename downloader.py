@@ -1,9 +1,13 @@
 # downloader.py
 # Seibro "외국인/기관 종목별 거래내역 TOP50" 자동 다운로드
 # GitHub Actions(ubuntu/headless) 안정화 버전: 오버레이(processbar) 대기 + 안전 클릭 + headless 옵션
+# --latest 모드: 브라우저 1회 기동 → 오늘부터 거슬러 올라가며 첫 유효 거래일만 받기
+# (시장, 조회 기준, 날짜) 키 공간(markets.py): 작업 큐 + 워커별 브라우저로 동시 수집, 저장은 (시장, 기준) 파티션 폴더
+#
+# 벤치마크(로컬 모의 폼 seibro_mock.py, 워커 수별 처리량 + 받은 파일 검증): python downloader.py --bench
 
 from pathlib import Path
-import time, shutil, sys
+import os, time, shutil, sys, queue, threading
 from datetime import date, timedelta
 
 from selenium import webdriver
@@ -14,14 +18,17 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoAlertPresentException, TimeoutException, ElementClickInterceptedException
 from webdriver_manager.chrome import ChromeDriverManager
 
+from markets import (MARKETS, MODES, DEFAULT_MARKET, DEFAULT_MODE, market_xpath, mode_xpath,
+                     raw_dir, parse_list, partitions, pop_opt, check_verified, label_matches)
+
 # ──────────────────────────────────────────────────────────────
 SEIBRO_URL = "https://seibro.or.kr/websquare/control.jsp?w2xPath=/IPORTAL/user/ovsSec/BIP_CNTS10013V.xml&menuNo=921"
 
 XPATH_SETTLE   = '//*[@id="a1_radio1_input_0"]'
-XPATH_BUYSELL  = '//*[@id="area_radio_2_input_2"]'
+XPATH_BUYSELL  = mode_xpath(DEFAULT_MODE)          # 조회 기준 라디오(markets.MODES)
 XPATH_START    = '//*[@id="sd1_inputCalendar1_input"]'
 XPATH_END      = '//*[@id="sd1_inputCalendar2_input"]'
-XPATH_US       = '//*[@id="area_radio_input_1"]'
+XPATH_US       = market_xpath(DEFAULT_MARKET)      # 시장 라디오(markets.MARKETS)
 XPATH_QUERY    = '//*[@id="image2"]'
 XPATH_XLS      = '//*[@id="ExcelDownload_img"]'
 
@@ -32,6 +39,7 @@ CSS_OVERLAY = "div.w2modal"
 BASE = Path(__file__).resolve().parent
 DATA_DIR = BASE / "data"
 TMP_DIR  = BASE / "downloads_tmp"
+DRIVER_CACHE = BASE / ".driver_cache" / "chromedriver_path.txt"
 for d in (DATA_DIR, TMP_DIR):
     d.mkdir(parents=True, exist_ok=True)
 
@@ -44,17 +52,17 @@ def iter_days(start="20241009", end=None):
         yield s.strftime("%Y%m%d")
         s += timedelta(days=1)
 
-def clear_tmp():
-    for p in TMP_DIR.glob("*"):
+def clear_tmp(tmp=TMP_DIR):
+    for p in tmp.glob("*"):
         try:
             p.unlink()
         except Exception:
             pass
 
-def wait_download(timeout=35):
+def wait_download(timeout=35, tmp=TMP_DIR):
     t0 = time.time()
     while time.time() - t0 < timeout:
-        files = list(TMP_DIR.glob("*"))
+        files = list(tmp.glob("*"))
         if not files:
             time.sleep(0.3)
             continue
@@ -107,19 +115,31 @@ def safe_click(driver, by, selector, timeout=25):
         raise RuntimeError(f"safe_click 실패: {selector} -> {e}") from e
 
 # ──────────────────────────────────────────────────────────────
-def main():
-    # ✅ Actions에서는 env HEADLESS=1로 실행 중이었지?
-    headless_env = (str(sys.environ.get("HEADLESS", "1")) if hasattr(sys, "environ") else "1")
-    # 위 줄이 깨질 수 있어서 안전하게 다시:
+def get_driver_path():
+    """
+    chromedriver 경로를 로컬 캐시에서 재사용.
+    - 캐시된 경로가 살아있으면 ChromeDriverManager().install()(버전 조회/다운로드)을 건너뜀
+    - 없거나 깨졌으면 새로 설치 후 경로를 캐시에 기록
+    """
     try:
-        import os
-        headless = os.getenv("HEADLESS", "1") == "1"
-    except Exception:
-        headless = True
+        cached = Path(DRIVER_CACHE.read_text(encoding="utf-8").strip())
+        if cached.is_file():
+            print(f"🧰 드라이버 캐시 사용: {cached}")
+            return str(cached)
+    except FileNotFoundError:
+        pass
+
+    path = ChromeDriverManager().install()
+    DRIVER_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    DRIVER_CACHE.write_text(path, encoding="utf-8")
+    print(f"🧰 드라이버 설치 + 캐시 저장: {path}")
+    return path
 
+def build_driver(headless=True, download_dir=TMP_DIR, driver_path=None):
+    """driver_path: 미리 구한 chromedriver 경로(동시 워커는 collect()가 한 번만 구해 넘김)"""
     opts = webdriver.ChromeOptions()
     prefs = {
-        "download.default_directory": str(TMP_DIR.resolve()),
+        "download.default_directory": str(download_dir.resolve()),
         "download.prompt_for_download": False,
         "download.directory_upgrade": True,
         "safebrowsing.enabled": True,
@@ -136,72 +156,273 @@ def main():
     opts.add_argument("--disable-extensions")
     opts.add_argument("--disable-notifications")
 
-    print(f"💾 저장 폴더: {DATA_DIR}")
-    print(f"🗂️ 임시 폴더: {TMP_DIR}")
-    print(f"🧠 HEADLESS = {headless} (env HEADLESS=1)")
-
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=opts)
+    driver = webdriver.Chrome(service=Service(driver_path or get_driver_path()), options=opts)
     driver.set_page_load_timeout(60)
+    return driver
+
+def open_form(driver, market=DEFAULT_MARKET, mode=DEFAULT_MODE, url=SEIBRO_URL):
+    """SEIBRO 페이지 로드 + 라디오(결제/조회 기준/시장) 설정 — 세션당 1회"""
+    driver.get(url)
+    WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+    dismiss_alert(driver)
+    wait_overlay_gone(driver, timeout=30)
+    time.sleep(1)
+
+    # 기본 설정(오버레이/클릭 가로채기 대응)
+    safe_click(driver, By.XPATH, XPATH_SETTLE,  timeout=30)
+    select_partition(driver, market, mode)
+
+# 라디오 묶음(id 접두어)에서 선택된 것의 글자: <label for=id> → 바로 뒤 <label> → 부모 글자
+JS_CHECKED_LABEL = """
+const el = document.querySelector('input[id^="' + arguments[0] + '_input_"]:checked');
+if (!el) return null;
+const next = el.nextElementSibling;
+const lab = document.querySelector('label[for="' + el.id + '"]') || (next && next.tagName === 'LABEL' ? next : null);
+return (lab || el.parentElement).textContent.trim();
+"""
+
+def checked_label(driver, group):
+    return driver.execute_script(JS_CHECKED_LABEL, group)
+
+def select_partition(driver, market, mode):
+    """
+    열린 폼에서 조회 기준/시장 라디오만 다시 선택(페이지 재로드 없이 파티션 전환)
+    클릭 뒤 선택된 라디오 글자를 읽어 표시명과 다르면 RuntimeError — 다른 파티션 TOP50을 잘못 저장하지 않게
+    """
+    safe_click(driver, By.XPATH, mode_xpath(mode),     timeout=30)
+    safe_click(driver, By.XPATH, market_xpath(market), timeout=30)
+    for group, want in (("area_radio_2", MODES[mode][0]), ("area_radio", MARKETS[market][0])):
+        got = checked_label(driver, group)
+        if not label_matches(want, got):
+            raise RuntimeError(f"라디오 선택 불일치({group}): 기대 '{want}', 폼 '{got}' — markets.py 라디오 번호 확인")
 
+def is_valid_table(path):
+    """combine_data.py와 같은 기준: 표가 있고, 열 6개 이상, 매수/매도 수치가 존재"""
+    import pandas as pd
     try:
-        driver.get(SEIBRO_URL)
-        WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        dismiss_alert(driver)
-        wait_overlay_gone(driver, timeout=30)
-        time.sleep(1)
+        tables = pd.read_html(str(path), header=0, flavor="lxml")
+    except Exception:
+        return False
+    if not tables or tables[0].shape[1] < 6:
+        return False
+    nums = tables[0].iloc[:, [4, 5]].astype(str).apply(
+        lambda s: pd.to_numeric(s.str.replace(",", "", regex=False).str.replace(" ", "", regex=False), errors="coerce")
+    )
+    return bool(nums.notna().any().any())
 
-        # 기본 설정(오버레이/클릭 가로채기 대응)
-        safe_click(driver, By.XPATH, XPATH_SETTLE,  timeout=30)
-        safe_click(driver, By.XPATH, XPATH_BUYSELL, timeout=30)
-        safe_click(driver, By.XPATH, XPATH_US,      timeout=30)
+def download_day(driver, ymd, dst_dir=DATA_DIR, tmp=TMP_DIR, tag=""):
+    """열린 폼에서 하루치 조회 + 엑셀 다운로드 → dst_dir/reYYYYMMDD.xls 경로(실패 시 None)"""
+    clear_tmp(tmp)
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    dst = dst_dir / f"re{ymd}.xls"
 
-        start = "20241009"
-        end = None
-        if len(sys.argv) >= 2:
-            start = sys.argv[1]
-        if len(sys.argv) >= 3:
-            end = sys.argv[2]
+    print(f"\n📥 {tag}{ymd} 다운로드 중…")
 
-        print(f"📅 기간: {start} ~ {end or start}")
+    try:
+        wait_overlay_gone(driver, timeout=25)
+        s = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.XPATH, XPATH_START)))
+        e = driver.find_element(By.XPATH, XPATH_END)
+        s.clear(); s.send_keys(ymd)
+        e.clear(); e.send_keys(ymd)
 
-        for ymd in iter_days(start, end):
-            clear_tmp()
-            dst = DATA_DIR / f"re{ymd}.xls"
+        safe_click(driver, By.XPATH, XPATH_QUERY, timeout=30)
+        time.sleep(2.0)
+        dismiss_alert(driver)
+        wait_overlay_gone(driver, timeout=30)
+    except Exception as ex:
+        print(f"❌ {ymd} 조회 실패: {ex}")
+        return None
 
-            print(f"\n📥 {ymd} 다운로드 중…")
+    try:
+        safe_click(driver, By.XPATH, XPATH_XLS, timeout=30)
+        f = wait_download(35, tmp)
+        if f:
+            shutil.move(str(f), str(dst))
+            print(f"✅ 저장 완료: {tag}{dst.name}")
+            return dst
+        print(f"⚠️ {ymd} 다운로드 감지 실패")
+    except Exception as ex:
+        print(f"❌ {ymd} 엑셀 다운로드 실패: {ex}")
+    return None
 
-            try:
-                wait_overlay_gone(driver, timeout=25)
-                s = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.XPATH, XPATH_START)))
-                e = driver.find_element(By.XPATH, XPATH_END)
-                s.clear(); s.send_keys(ymd)
-                e.clear(); e.send_keys(ymd)
-
-                safe_click(driver, By.XPATH, XPATH_QUERY, timeout=30)
-                time.sleep(2.0)
-                dismiss_alert(driver)
-                wait_overlay_gone(driver, timeout=30)
-            except Exception as ex:
-                print(f"❌ {ymd} 조회 실패: {ex}")
-                continue
+def download_latest(driver, lookback=7, today=None, dst_dir=DATA_DIR, tmp=TMP_DIR, tag=""):
+    """
+    오늘부터 하루씩 거슬러 올라가며(최대 lookback일 전까지) 같은 세션에서 조회.
+    유효한 표가 받아진 첫 날짜에서 멈춤 → 해당 ymd(없으면 None)
+    """
+    today = today or date.today()
+    for i in range(lookback + 1):
+        ymd = (today - timedelta(days=i)).strftime("%Y%m%d")
+        dst = download_day(driver, ymd, dst_dir, tmp, tag)
+        if dst is None:
+            continue
+        if is_valid_table(dst):
+            print(f"🎯 {tag}최신 유효 거래일: {ymd}")
+            return ymd
+        print(f"⚠️ {ymd} 표 없음(휴일/미집계 가능) → 이전 날짜 시도")
+        dst.unlink(missing_ok=True)
+    return None
 
+# ──────────────────────────────────────────────────────────────
+# 동시 수집: 작업 = (시장, 기준, 날짜) 하루치 또는 (시장, 기준) 최신일 탐색
+# 워커마다 브라우저 1개 + 전용 임시 폴더(다운로드가 섞이지 않게), 폼은 한 번 열고 파티션이 바뀔 때만 라디오 재선택
+# 세이브로 응답 대기가 대부분이라 처리량은 워커 수에 거의 비례 — 사이트 부담을 생각해 기본 워커는 작게
+DEFAULT_WORKERS = 2
+
+def _worker(wid, jobs, results, headless, url, root, driver_path):
+    tmp = TMP_DIR / f"w{wid}"
+    tmp.mkdir(parents=True, exist_ok=True)
+    driver, form = None, None       # form = 현재 폼에 선택된 (시장, 기준)
+    try:
+        while True:
+            try:
+                kind, market, mode, arg = jobs.get_nowait()
+            except queue.Empty:
+                return
+            part = (market, mode)
+            dst_dir = raw_dir(market, mode) if root is None else root / market / mode
+            tag = "" if part == (DEFAULT_MARKET, DEFAULT_MODE) else f"[{market}/{mode}] "
             try:
-                safe_click(driver, By.XPATH, XPATH_XLS, timeout=30)
-                f = wait_download(35)
-                if f:
-                    shutil.move(str(f), str(dst))
-                    print(f"✅ 저장 완료: {dst.name}")
+                if driver is None:
+                    driver = build_driver(headless, tmp, driver_path)
+                if form is None:
+                    open_form(driver, market, mode, url)
+                elif form != part:
+                    select_partition(driver, market, mode)
+                form = part
+                if kind == "latest":
+                    out = download_latest(driver, arg, dst_dir=dst_dir, tmp=tmp, tag=tag)
                 else:
-                    print(f"⚠️ {ymd} 다운로드 감지 실패")
+                    out = download_day(driver, arg, dst_dir, tmp, tag)
             except Exception as ex:
-                print(f"❌ {ymd} 엑셀 다운로드 실패: {ex}")
+                print(f"❌ {tag}{arg} 작업 실패(워커 {wid}): {ex}")
+                out, form = None, None      # 다음 작업에서 폼을 새로 엶
+            results.append(((kind, market, mode, arg), out))
+    finally:
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
 
+def collect(jobs, workers=DEFAULT_WORKERS, headless=True, url=SEIBRO_URL, root=None, allow_unverified=False):
+    """
+    jobs: [("day", 시장, 기준, ymd) | ("latest", 시장, 기준, lookback)] — 파티션·날짜 순으로 넣으면 라디오 재선택이 적음
+    root: 저장 루트(기본 None = markets.raw_dir 파티션 폴더, 벤치마크는 임시 폴더)
+    allow_unverified: 라디오 번호 미확인 시장/기준도 허용(모의 폼 테스트용) — 기본은 ValueError
+    → [(작업, 결과 경로/ymd 또는 None)]
+    """
+    if not allow_unverified:
+        for part in sorted({(m, md) for _, m, md, _ in jobs}):
+            check_verified(*part)
+    q = queue.Queue()
+    for j in jobs:
+        q.put(j)
+    results = []
+    if not jobs:
+        return results
+    # 드라이버 경로는 스레드 시작 전에 한 번만 — 캐시가 비어 있으면(CI) 워커들이 동시에 같은 폴더로
+    # ChromeDriverManager().install()(다운로드/압축 해제)과 캐시 파일 쓰기를 하게 됨
+    driver_path = get_driver_path()
+    threads = [
+        threading.Thread(target=_worker, args=(i, q, results, headless, url, root, driver_path),
+                         name=f"seibro-w{i}", daemon=True)
+        for i in range(max(1, min(workers, len(jobs))))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+def bench(workers_list=(1, 2, 4), delay=0.5, days=("20250106", "20250110")):
+    """모의 폼에 (2시장 × 2기준 × 5일) 작업 → 워커 수별 처리량 + 받은 파일 = mock_table 검증"""
+    import tempfile
+    import pandas as pd
+    from seibro_mock import serve, mock_table
+
+    server, url = serve(0, delay)
+    jobs = [("day", m, md, ymd) for m, md in partitions(["us", "hk"], ["buysell", "buy"]) for ymd in iter_days(*days)]
+    print(f"🧪 모의 폼 {url} (응답 지연 {delay}s × 조회/엑셀) — 작업 {len(jobs)}개")
+    base = None
+    try:
+        for w in workers_list:
+            with tempfile.TemporaryDirectory() as tmp:
+                t = time.perf_counter()
+                res = collect(jobs, w, True, url, Path(tmp), allow_unverified=True)   # 모의 폼 = 추정 번호 그대로
+                sec = time.perf_counter() - t
+                bad = 0
+                for (_, m, md, ymd), out in res:
+                    want = mock_table(m, md, ymd)
+                    got = pd.read_html(str(out), header=0, flavor="lxml")[0] if out and want else None
+                    if want and (got is None or got.iloc[:, 3].tolist() != [r[3] for r in want]):
+                        bad += 1
+                base = base or sec
+                print(f"워커 {w}: {sec:6.1f}s  {len(jobs) / sec:5.2f} 작업/s  (x{base / sec:.1f})  "
+                      f"완료 {sum(o is not None for _, o in res)}/{len(jobs)}  불일치 {bad}")
     finally:
+        server.shutdown()
+
+# ──────────────────────────────────────────────────────────────
+def main():
+    # ✅ Actions에서는 env HEADLESS=1로 실행
+    headless = os.getenv("HEADLESS", "1") == "1"
+
+    # 사용법:
+    #   python downloader.py [START] [END]      기간 다운로드
+    #   python downloader.py --latest [N]       오늘부터 N일 전까지 거슬러 올라가 첫 유효일 1개만(파티션마다)
+    # 공통 옵션:
+    #   --market us,hk|all   --mode buysell,buy,sell|all   (기본 us / buysell)
+    #   --workers N          동시 브라우저 수(기본 2)
+    #   --url URL            폼 주소(로컬 모의 폼 테스트: python seibro_mock.py)
+    #   --allow-unverified   라디오 번호 미확인 시장/기준도 받기(모의 폼 테스트용, markets.VERIFIED_*)
+    #   --bench              모의 폼으로 워커 수별 처리량 측정
+    args = sys.argv[1:]
+    if "--bench" in args:
+        bench()
+        return
+    markets = parse_list(pop_opt(args, "--market"), MARKETS, DEFAULT_MARKET)
+    modes = parse_list(pop_opt(args, "--mode"), MODES, DEFAULT_MODE)
+    workers = int(pop_opt(args, "--workers", DEFAULT_WORKERS))
+    allow_unverified = "--allow-unverified" in args
+    if allow_unverified:
+        args.remove("--allow-unverified")
+    url = pop_opt(args, "--url", os.getenv("SEIBRO_URL", SEIBRO_URL))
+    parts = partitions(markets, modes)
+    if not allow_unverified:
         try:
-            driver.quit()
-        except Exception:
-            pass
-        print("\n🎉 자동 다운로드 종료!")
+            for part in parts:
+                check_verified(*part)
+        except ValueError as e:
+            raise SystemExit(f"❌ {e}")
+
+    latest = bool(args) and args[0] == "--latest"
+    lookback = int(args[1]) if latest and len(args) >= 2 else 7
+
+    print(f"💾 저장 폴더: {', '.join(str(raw_dir(m, md)) for m, md in parts)}")
+    print(f"🗂️ 임시 폴더: {TMP_DIR}")
+    print(f"🧠 HEADLESS = {headless} (env HEADLESS=1) | 워커 {workers}")
+
+    if latest:
+        print(f"🔎 최신 거래일 탐색: 오늘부터 최대 {lookback}일 전까지 × {len(parts)}개 파티션")
+        jobs = [("latest", m, md, lookback) for m, md in parts]
+    else:
+        start = args[0] if len(args) >= 1 else "20241009"
+        end = args[1] if len(args) >= 2 else None
+        print(f"📅 기간: {start} ~ {end or start}")
+        jobs = [("day", m, md, ymd) for m, md in parts for ymd in iter_days(start, end)]
+
+    t = time.perf_counter()
+    results = collect(jobs, workers, headless, url, allow_unverified=allow_unverified)
+    ok = sum(out is not None for _, out in results)
+    print(f"\n🎉 자동 다운로드 종료! {ok}/{len(jobs)} 성공 ({time.perf_counter() - t:.1f}s)")
+
+    if latest:
+        for (_, m, md, _), out in sorted(results, key=lambda r: r[0][1:3]):
+            if out is None:
+                print(f"❌ [{m}/{md}] 최근 {lookback}일 안에 다운로드 가능한 날짜가 없습니다.")
+        if ok == 0:
+            raise SystemExit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,187 @@
+# entities.py
+# 기업행위(합병/분할·병합/명칭변경/교환공모) 꼬리표가 붙은 종목명을 같은 종목으로 묶는 정규화 단계
+#   예) "NUSCALE POWER CORP CL A MRGR 009185329 KYG8377A1085"
+#       "LUCID GROUP INC USD0.0001 (POST SPLIT) SPLR 982848100 US5494981039" → "LUCID GROUP INC"
+# - 꼬리표: <기본명> <MRGR|SPLR|CHAN|EXOF|SOFF> <참조번호> <ISIN>
+# - 묶는 기준(합집합): ① 정규화한 기본명이 같음 ② ISIN이 같음 ③ 수동 지정(entity_overrides.csv)
+# - 대표명: 꼬리표 없는 이름 우선, 없으면 가장 먼저 등장한 이름(새 변형이 와도 대표가 안 바뀜)
+# - 표준 라이브러리만 사용(앱에서도 import 가능)
+#
+# 벤치마크(종목 수 감소 + groupby 속도): python entities.py --bench
+
+import csv
+import re
+import sys
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+OVERRIDES_PATH = PROC / "entity_overrides.csv"   # 수동 지정(종목명,대표명) — 대표명 비우면 묶지 않음
+ENTITIES_PATH = PROC / "entities.csv"            # 결과(별칭 → 대표명), clean_and_enrich가 갱신
+
+ACTIONS = ("MRGR", "SPLR", "CHAN", "EXOF", "SOFF")
+
+_VARIANT = re.compile(
+    r"^(?P<base>.*?)\s+(?P<action>" + "|".join(ACTIONS) + r")\s+(?P<ref>\d{6,})\s+(?P<isin>[A-Z]{2}[A-Z0-9]{9}\d)$"
+)
+# 기본명 뒤에 붙는 주식 종류/액면/역분할 표기 → 제거
+_NOISE = [
+    re.compile(r"\([^)]*\)?"),                               # (POST REV SPLIT), (REV SPT), (P/S, 닫는 괄호 잘린 것 포함
+    re.compile(r"\b(COM|ORD)\s+(USD|GBP|NPV)[\d.]*"),        # COM USD0.0001, COM NPV, ORD GBP0.0001
+    re.compile(r"\bUSD\d[\d.]*"),
+    re.compile(r"\b(COM|CL A COM)\s+NEW\b|\bCOM\s*$"),
+    re.compile(r"\bNEW\s+\d{4}\b|\bNEW\s*$"),
+]
+
+
+def parse_variant(name: str):
+    """꼬리표가 있으면 (기본명, 행위, 참조번호, ISIN), 없으면 None"""
+    m = _VARIANT.match(name)
+    if not m:
+        return None
+    return m.group("base").strip(), m.group("action"), m.group("ref"), m.group("isin")
+
+
+def normalize(name: str) -> str:
+    """비교용 키: 꼬리표/액면/역분할 표기 제거, 대문자, 구두점 정리, 'X X' 반복 제거"""
+    v = parse_variant(name)
+    s = (v[0] if v else name).upper()
+    for p in _NOISE:
+        s = p.sub(" ", s)
+    s = re.sub(r"[.,]", " ", s)
+    toks = s.split()
+    h = len(toks) // 2
+    if h and len(toks) % 2 == 0 and toks[:h] == toks[h:]:
+        toks = toks[:h]
+    return " ".join(toks)
+
+
+def load_overrides(path: Path = OVERRIDES_PATH) -> dict:
+    """entity_overrides.csv → {종목명: 대표명("" = 묶지 않고 단독)}"""
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return {r["종목명"].strip(): (r.get("대표명") or "").strip()
+                for r in csv.DictReader(f) if (r.get("종목명") or "").strip()}
+
+
+def resolve(names, first_seen=None, overrides=None) -> dict:
+    """
+    names: 종목명들, first_seen: {종목명: 최초 등장일}(대표 선택용, 없으면 이름순)
+    → {종목명: 대표명} (모든 이름 포함, 단독이면 자기 자신)
+    """
+    names = sorted(set(names))
+    if overrides is None:
+        overrides = load_overrides()
+    first_seen = first_seen or {}
+
+    parent = {n: n for n in names}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a, b):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+
+    solo = {n for n, c in overrides.items() if c == "" and n in parent}
+    by_key, by_isin = {}, {}
+    for n in names:
+        if n in solo:
+            continue
+        by_key.setdefault(normalize(n), []).append(n)
+        v = parse_variant(n)
+        if v:
+            by_isin.setdefault(v[3], []).append(n)
+    for group in list(by_key.values()) + list(by_isin.values()):
+        for other in group[1:]:
+            union(group[0], other)
+    for n, c in overrides.items():
+        if c and n in parent:
+            parent.setdefault(c, c)
+            union(c, n)
+
+    groups = {}
+    for n in list(parent):
+        groups.setdefault(find(n), []).append(n)
+
+    canon = {}
+    for members in groups.values():
+        forced = [overrides[m] for m in members if overrides.get(m)]
+        if forced:
+            rep = forced[0]
+        else:
+            rep = min(members, key=lambda m: (parse_variant(m) is not None, str(first_seen.get(m, "")), m))
+        for m in members:
+            canon[m] = rep
+    return {n: canon[n] for n in names}
+
+
+def save_entities(canon: dict, path: Path = ENTITIES_PATH):
+    """별칭(대표명 ≠ 종목명)만 저장"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["종목명", "대표명"])
+        for n, c in sorted(canon.items(), key=lambda kv: (kv[1], kv[0])):
+            if n != c:
+                w.writerow([n, c])
+    tmp.replace(path)
+
+
+def load_entities(path: Path = ENTITIES_PATH) -> dict:
+    """entities.csv → {별칭: 대표명}"""
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return {r["종목명"]: r["대표명"] for r in csv.DictReader(f)}
+
+
+# ──────────────────────────────────────────────────────────────
+def bench(src: Path = PROC / "all_data.csv", repeat: int = 50):
+    """정규화 전/후 종목 수와 (날짜, 종목) groupby 합산 시간 비교"""
+    import time
+    import pandas as pd
+
+    raw = pd.read_csv(src, dtype=str, encoding="utf-8-sig", usecols=["종목명", "날짜", "순매수"])
+    raw["종목명"] = raw["종목명"].str.strip()
+    raw["순매수"] = pd.to_numeric(raw["순매수"].str.replace(",", ""), errors="coerce").fillna(0)
+    first = raw.groupby("종목명")["날짜"].min().to_dict()
+    canon = resolve(first, first)
+
+    raw_ids = {n: i for i, n in enumerate(sorted(canon))}
+    raw["원ID"] = raw["종목명"].map(raw_ids).astype("int32")
+    raw["대표ID"] = raw["종목명"].map(canon).map(raw_ids).astype("int32")
+
+    def agg(key):
+        g = raw.groupby(["날짜", key], sort=False)["순매수"].sum()
+        return g.groupby(level=1).sum()      # 종목별 합(순위 탭과 같은 2단계 집계)
+
+    best = {"원ID": float("inf"), "대표ID": float("inf")}
+    for _ in range(repeat):                  # 번갈아 재서 캐시/터보 영향 상쇄
+        for key in best:
+            t = time.perf_counter()
+            agg(key)
+            best[key] = min(best[key], time.perf_counter() - t)
+
+    n_raw, n_canon = len(canon), len(set(canon.values()))
+    merged = sum(1 for n, c in canon.items() if n != c)
+    t_raw, t_canon = best["원ID"] * 1000, best["대표ID"] * 1000
+    print(f"종목 수: {n_raw} → {n_canon} (-{n_raw - n_canon}, {(n_raw - n_canon) / n_raw:.1%}) | 별칭 {merged}개")
+    print(f"(날짜, 종목) 행 수: {raw.groupby(['날짜', '원ID']).ngroups:,} → {raw.groupby(['날짜', '대표ID']).ngroups:,}")
+    print(f"(거래일 × 종목) 행렬 폭: {n_raw} → {n_canon}열 | 종목별 시계열 조각: 별칭 {merged}개가 대표 시계열로 합쳐짐")
+    print(f"groupby 합산: {t_raw:.2f} ms → {t_canon:.2f} ms (x{t_raw / t_canon:.2f})")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        bench()
+    else:
+        for alias, rep in sorted(load_entities().items(), key=lambda kv: kv[1]):
+            print(f"{rep}  ←  {alias}")
@@ -0,0 +1,232 @@
+# export.py
+# 결과 표(조건 필터/순위) · 종목별 원본 이력 내보내기 — CSV / Parquet / XLSX, 청크 단위로 흘려 쓰기
+# - history_chunks: SeriesIndex 종목 구간을 CHUNK_ROWS행 안팎씩(iter_rows) 잘라 청크마다 종목명/표시명만 붙임
+#   → 여러 해 × 전 종목이어도 "전체 부분 프레임 + 이름 컬럼 + CSV 문자열" 복사본을 한꺼번에 만들지 않음
+# - 쓰기(WRITERS): 청크를 차례로 파일에
+#   CSV: utf-8-sig(엑셀 한글) 헤더 1번 + 청크별 to_csv · Parquet: 청크 = row group(pyarrow ParquetWriter)
+#   XLSX: openpyxl write_only(행을 임시 파일로 흘림, 최대 XLSX_MAX_ROWS행)
+# - export_bytes: 출력은 SpooledTemporaryFile(SPOOL_BYTES 넘으면 디스크)에 쌓고 마지막에 한 번 읽음
+#   (앱 download_button은 클릭할 때 생성 — 재실행마다 파일을 만들지 않음)
+# - pyarrow/openpyxl(requirements.txt)이 없으면 앱에서는 그 형식만 빠짐(available_formats), --selftest는 실패
+#
+# 벤치마크(최대 메모리·시간: 한 번에 만들기 vs 청크): python export.py --bench
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+CHUNK_ROWS = 50_000
+SPOOL_BYTES = 16 << 20          # 출력이 이보다 크면 임시 파일로
+XLSX_MAX_ROWS = 1_048_575       # 엑셀 시트 최대 행(헤더 제외)
+
+# 형식 → (확장자, MIME)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "XLSX": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+_NEEDS = {"Parquet": "pyarrow", "XLSX": "openpyxl"}
+
+
+def available_formats() -> list:
+    """설치된 라이브러리로 쓸 수 있는 형식"""
+    import importlib.util
+    return [f for f in EXPORT_FORMATS if f not in _NEEDS or importlib.util.find_spec(_NEEDS[f]) is not None]
+
+
+# ── 청크 만들기
+def frame_chunks(frame, chunk_rows: int = CHUNK_ROWS):
+    """이미 만든 결과 표 → 청크(행 구간 뷰)"""
+    if not len(frame):
+        yield frame
+    for i in range(0, len(frame), chunk_rows):
+        yield frame.iloc[i:i + chunk_rows]
+
+
+def history_chunks(index, ids, start=None, end=None, names=None, disp=None, columns=None,
+                   chunk_rows: int = CHUNK_ROWS):
+    """
+    SeriesIndex의 종목들 × [start, end] 원본 이력 → (종목, 날짜) 순 청크
+    names/disp(종목ID → 이름 배열)가 있으면 종목ID 뒤에 종목명/표시명 컬럼, 행이 없으면 빈 청크 1개
+    """
+    df = index.df
+    cols = list(columns or df.columns)
+    names = None if names is None else np.asarray(names, dtype=object)
+    disp = None if disp is None else np.asarray(disp, dtype=object)
+
+    def decorate(part):
+        part = part[cols].copy()
+        sid = part["종목ID"].to_numpy()
+        at = cols.index("종목ID") + 1
+        if disp is not None:
+            part.insert(at, "표시명", disp[sid])
+        if names is not None:
+            part.insert(at, "종목명", names[sid])
+        return part
+
+    empty = True
+    for rows in index.iter_rows(ids, start, end, chunk_rows):
+        empty = False
+        yield decorate(df.iloc[rows])
+    if empty:
+        yield decorate(df.iloc[0:0])
+
+
+# ── 쓰기
+def write_csv(chunks, fp):
+    first = True
+    for c in chunks:
+        text = c.to_csv(index=False, header=first, date_format="%Y-%m-%d")
+        fp.write(text.encode("utf-8-sig" if first else "utf-8"))
+        first = False
+
+
+def write_parquet(chunks, fp):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for c in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(c, preserve_index=False)
+                writer = pq.ParquetWriter(fp, table.schema, compression="zstd")
+            else:
+                table = pa.Table.from_pandas(c, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_xlsx(chunks, fp, sheet: str = "data"):
+    import pandas as pd
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet)
+    n = 0
+    for i, c in enumerate(chunks):
+        if i == 0:
+            ws.append(list(c.columns))
+        n += len(c)
+        if n > XLSX_MAX_ROWS:
+            raise ValueError(f"XLSX는 최대 {XLSX_MAX_ROWS:,}행입니다 — CSV/Parquet으로 받으세요")
+        c = c.copy()
+        for col in c.columns:
+            if pd.api.types.is_datetime64_any_dtype(c[col]):
+                c[col] = c[col].dt.date
+        c = c.astype(object).where(c.notna(), None)     # NaN → 빈 칸
+        for row in c.itertuples(index=False, name=None):
+            ws.append(row)
+    wb.save(fp)
+
+
+WRITERS = {"CSV": write_csv, "Parquet": write_parquet, "XLSX": write_xlsx}
+
+
+def export_bytes(fmt: str, chunks) -> bytes:
+    """청크 → fmt 파일 내용(쓰는 동안 출력은 SpooledTemporaryFile에)"""
+    if fmt not in WRITERS:
+        raise ValueError(f"형식은 {'|'.join(WRITERS)}")
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as f:
+        WRITERS[fmt](chunks, f)
+        f.seek(0)
+        return f.read()
+
+
+# ──────────────────────────────────────────────────────────────
+def bench(src: Path = PROC / "all_data_clean.csv", scales=(1, 10, 30)):
+    """전 종목 × 전 기간 원본 이력: 한 번에(take + 이름 컬럼 + to_csv) vs 청크 — 시간 / 최대 메모리(tracemalloc, 출력 포함)"""
+    import io
+    import tracemalloc
+
+    import pandas as pd
+    from indicators import synthetic
+    from series_index import SeriesIndex
+
+    base = pd.read_csv(src, parse_dates=["날짜"], encoding="utf-8-sig", dtype={"종목ID": "int32"})
+    for scale in scales:
+        df = synthetic(base, scale).sort_values(["종목ID", "날짜"]).reset_index(drop=True)
+        index = SeriesIndex(df)
+        ids = index.stock_ids.tolist()
+        names = [f"STOCK {i:06d} INC" for i in range(int(df["종목ID"].max()) + 1)]
+
+        def whole():
+            part = index.take(ids).copy()
+            part.insert(2, "종목명", np.asarray(names, dtype=object)[part["종목ID"].to_numpy()])
+            buf = io.BytesIO()
+            buf.write(part.to_csv(index=False, date_format="%Y-%m-%d").encode("utf-8-sig"))
+            return buf.getbuffer().nbytes
+
+        def chunked(fmt):
+            return lambda: len(export_bytes(fmt, history_chunks(index, ids, names=names)))
+
+        print(f"x{scale:<3} rows={len(df):>9,}  (전 종목 {len(ids):,} × 전 기간)")
+        runs = [("한 번에 CSV", whole)] + [(f"청크 {f}", chunked(f)) for f in available_formats() if f != "XLSX"]
+        for name, fn in runs:
+            t = time.perf_counter()
+            size = fn()
+            dt = time.perf_counter() - t
+            tracemalloc.start()                 # 메모리는 따로 한 번 더(추적 중엔 느려서 시간 제외)
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {name:<12} {dt * 1000:8.0f} ms  최대 메모리 {peak / 2**20:7.1f} MB  파일 {size / 2**20:7.1f} MB")
+
+    if "XLSX" in available_formats():
+        sub = SeriesIndex(base.sort_values(["종목ID", "날짜"]).reset_index(drop=True))
+        ids = sub.stock_ids[:200].tolist()
+        t = time.perf_counter()
+        size = len(export_bytes("XLSX", history_chunks(sub, ids)))
+        print(f"XLSX {sub.count(ids):,}행  {(time.perf_counter() - t) * 1000:.0f} ms  파일 {size / 2**20:.1f} MB")
+
+
+def selftest() -> bool:
+    """세 형식을 다시 읽어 원본과 같은지(청크 경계 포함) — 라이브러리가 없어 못 쓰는 형식도 실패"""
+    import io
+
+    import pandas as pd
+    from series_index import SeriesIndex
+
+    df = pd.read_csv(PROC / "all_data_clean.csv", parse_dates=["날짜"], encoding="utf-8-sig", dtype={"종목ID": "int32"})
+    index = SeriesIndex(df.sort_values(["종목ID", "날짜"]).reset_index(drop=True))
+    ids = index.stock_ids[:50].tolist()
+    cols = ["날짜", "종목ID", "매수", "매도", "순매수", "순위"]
+    ref = index.take(ids, "2025-01-01", None, columns=cols).reset_index(drop=True)
+
+    def chunks():
+        return history_chunks(index, ids, "2025-01-01", None, columns=cols, chunk_rows=777)
+
+    read = {
+        "CSV": lambda b: pd.read_csv(io.BytesIO(b), parse_dates=["날짜"], encoding="utf-8-sig"),
+        "Parquet": lambda b: pd.read_parquet(io.BytesIO(b)),
+        "XLSX": lambda b: pd.read_excel(io.BytesIO(b), parse_dates=["날짜"]),
+    }
+    ok = True
+    have = available_formats()
+    for fmt in EXPORT_FORMATS:
+        if fmt not in have:
+            print(f"{fmt:<8} FAIL — {_NEEDS[fmt]} 미설치(requirements.txt로 설치)")
+            ok = False
+            continue
+        got = read[fmt](export_bytes(fmt, chunks()))
+        same = len(got) == len(ref) and all(
+            np.allclose(got[c].to_numpy(np.float64), ref[c].to_numpy(np.float64), equal_nan=True)
+            for c in cols if c != "날짜") and (pd.to_datetime(got["날짜"]).to_numpy() == ref["날짜"].to_numpy()).all()
+        print(f"{fmt:<8} {len(got):,}행  {'OK' if same else 'FAIL'}")
+        ok &= bool(same)
+    return ok
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        bench()
+    elif "--selftest" in sys.argv[1:]:
+        sys.exit(0 if selftest() else 1)
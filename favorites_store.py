@@ -0,0 +1,267 @@
+# favorites_store.py
+# 사용자(네임스페이스)별 즐겨찾기 저장소 — SQLite(WAL)
+# - 클릭(toggle)은 메모리만 바꾸고 즉시 반환, 디스크 기록은 백그라운드에서 debounce 후 배치 1트랜잭션
+# - 같은 (사용자, 종목)에 여러 번 눌러도 마지막 상태만 기록(중간 상태 합치기)
+# - WAL + busy_timeout → 여러 프로세스/세션이 동시에 써도 서로 덮어쓰지 않음(행 단위 저장)
+# - processed/favorites.json 은 새 사용자에게 채워주는 "기본 즐겨찾기"로만 사용(읽기 전용)
+#
+# 스트레스 테스트: python favorites_store.py --stress
+
+import atexit
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+FAV_DB_PATH = PROC / "favorites.db"
+FAV_SEED_PATH = PROC / "favorites.json"
+
+DEBOUNCE_SEC = 0.5
+
+
+def load_seed(path: Path = FAV_SEED_PATH) -> set:
+    try:
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                return set(json.load(f))
+    except Exception:
+        pass
+    return set()
+
+
+class FavoritesStore:
+    def __init__(self, db_path: Path = FAV_DB_PATH, seed_path: Path = FAV_SEED_PATH,
+                 debounce: float = DEBOUNCE_SEC):
+        self.db_path = Path(db_path)
+        self.debounce = debounce
+        self.seed = load_seed(seed_path) if seed_path else set()
+
+        self._lock = threading.Lock()
+        self._cache = {}        # ns → set(종목명)
+        self._pending = {}      # (ns, 종목명) → True(추가)/False(삭제)
+        self._new_ns = set()    # 아직 DB에 없는 네임스페이스(시드 포함 첫 기록 대상)
+        self._wake = threading.Event()
+        self._stop = False
+        self.stats = {"toggles": 0, "flushes": 0, "rows_written": 0}
+
+        self._init_db()
+        self._thread = threading.Thread(target=self._flusher, name="favorites-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ── DB
+    def _connect(self):
+        con = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("PRAGMA busy_timeout=30000")
+        return con
+
+    def _init_db(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        con = self._connect()
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS favorites (
+                ns    TEXT NOT NULL,
+                stock TEXT NOT NULL,
+                PRIMARY KEY (ns, stock)
+            ) WITHOUT ROWID
+        """)
+        con.execute("CREATE TABLE IF NOT EXISTS namespaces (ns TEXT PRIMARY KEY) WITHOUT ROWID")
+        con.close()
+        self._con = self._connect()   # 읽기용(짧은 조회)
+
+    def _read_ns(self, ns):
+        row = self._con.execute("SELECT 1 FROM namespaces WHERE ns = ?", (ns,)).fetchone()
+        if row is None:
+            return None
+        return {r[0] for r in self._con.execute("SELECT stock FROM favorites WHERE ns = ?", (ns,))}
+
+    # ── 공개 API
+    def get(self, ns: str) -> set:
+        """사용자 즐겨찾기(복사본). 처음 보는 사용자면 기본 즐겨찾기로 시작."""
+        with self._lock:
+            favs = self._cache.get(ns)
+            if favs is None:
+                favs = self._read_ns(ns)
+                if favs is None:
+                    favs = set(self.seed)
+                    self._new_ns.add(ns)
+                self._cache[ns] = favs
+            return set(favs)
+
+    def toggle(self, ns: str, stock: str) -> bool:
+        """추가/삭제 토글 → 토글 후 즐겨찾기 여부. 디스크 기록은 비동기."""
+        self.get(ns)
+        with self._lock:
+            favs = self._cache[ns]
+            on = stock not in favs
+            if on:
+                favs.add(stock)
+            else:
+                favs.discard(stock)
+            self._pending[(ns, stock)] = on
+            self.stats["toggles"] += 1
+        self._wake.set()
+        return on
+
+    def popular(self, limit: int = 50) -> list:
+        """여러 사용자가 즐겨찾기한 종목 순 [(종목명, 사용자 수)] — 기록된 것 기준(캐시 예열 대상 고르기용)"""
+        with self._lock:
+            rows = self._con.execute(
+                "SELECT stock, COUNT(*) AS n FROM favorites GROUP BY stock ORDER BY n DESC, stock LIMIT ?", (limit,)
+            ).fetchall()
+        return rows or [(s, 0) for s in sorted(self.seed)][:limit]
+
+    def flush(self):
+        """대기 중인 변경을 지금 1트랜잭션으로 기록"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            new_ns, self._new_ns = self._new_ns, set()
+            seeds = {ns: set(self._cache.get(ns, ())) for ns in new_ns}
+        if not pending and not new_ns:
+            return 0
+
+        adds = [(ns, s) for (ns, s), on in pending.items() if on]
+        dels = [(ns, s) for (ns, s), on in pending.items() if not on]
+        # 새 사용자: 시드(=현재 메모리 상태)를 통째로 기록
+        for ns, favs in seeds.items():
+            adds.extend((ns, s) for s in favs)
+
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            con.executemany("INSERT OR IGNORE INTO namespaces(ns) VALUES (?)",
+                            [(ns,) for ns in new_ns | {ns for ns, _ in pending}])
+            con.executemany("INSERT OR IGNORE INTO favorites(ns, stock) VALUES (?, ?)", adds)
+            con.executemany("DELETE FROM favorites WHERE ns = ? AND stock = ?", dels)
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            # 실패분은 다시 대기열로(그 사이 새로 들어온 변경이 우선)
+            with self._lock:
+                for k, v in pending.items():
+                    self._pending.setdefault(k, v)
+                self._new_ns |= new_ns
+            raise
+        finally:
+            con.close()
+
+        self.stats["flushes"] += 1
+        self.stats["rows_written"] += len(adds) + len(dels)
+        return len(adds) + len(dels)
+
+    def close(self):
+        if self._stop:
+            return
+        self._stop = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        try:
+            self.flush()
+        finally:
+            self._con.close()
+
+    # ── 백그라운드 기록
+    def _flusher(self):
+        while not self._stop:
+            self._wake.wait()
+            if self._stop:
+                break
+            time.sleep(self.debounce)      # 연속 클릭을 한 배치로 모음
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"⚠️ 즐겨찾기 저장 실패(다음 배치에서 재시도): {e}")
+                self._wake.set()
+
+
+# ──────────────────────────────────────────────────────────────
+def _stress_worker(args):
+    """별도 프로세스: 자기 스토어로 네임스페이스 여러 개에 토글 폭격"""
+    db, proc, n_ns, n_toggles, stocks = args
+    store = FavoritesStore(db, seed_path=None, debounce=0.05)
+    rng = __import__("random").Random(proc)
+    for _ in range(n_toggles):
+        store.toggle(f"p{proc}-u{rng.randrange(n_ns)}", rng.choice(stocks))
+    store.close()
+    return proc
+
+
+def stress(n_threads=200, toggles_per_thread=50, n_procs=4):
+    import random
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+    stocks = [s for s in (PROC / "stocks.txt").read_text(encoding="utf-8").splitlines() if s][:40]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "fav.db"
+
+        # 1) 한 프로세스, 스레드 n_threads개 동시 토글(같은 사용자 공유 + 각자 사용자)
+        store = FavoritesStore(db, seed_path=None, debounce=0.05)
+        lat = []
+
+        def worker(i):
+            rng = random.Random(i)
+            counts = Counter()
+            for _ in range(toggles_per_thread):
+                ns = "shared" if rng.random() < 0.3 else f"user{i % 50}"
+                s = rng.choice(stocks)
+                t = time.perf_counter()
+                store.toggle(ns, s)                 # 잠금 없이 — 같은 (ns, s) 토글이 실제로 겹침
+                lat.append(time.perf_counter() - t)
+                counts[(ns, s)] += 1
+            return counts
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_threads) as ex:
+            counts = sum(ex.map(worker, range(n_threads)), Counter())
+        t_toggle = time.perf_counter() - t0
+        store.close()
+
+        # 빈 상태에서 시작 → 순서와 상관없이 토글 횟수가 홀수면 최종 등록
+        expected = {k: c % 2 == 1 for k, c in counts.items()}
+        fresh = FavoritesStore(db, seed_path=None)
+        bad = [(k, v) for k, v in expected.items() if (k[1] in fresh.get(k[0])) != v]
+        fresh.close()
+        n = n_threads * toggles_per_thread
+        lat.sort()
+        print(f"스레드 {n_threads}개 × {toggles_per_thread}회 = {n:,} 토글: {n / t_toggle:,.0f} 토글/s | "
+              f"p50 {lat[n // 2] * 1e6:.0f} µs, p99 {lat[int(n * 0.99)] * 1e6:.0f} µs | "
+              f"배치 {store.stats['flushes']}회, 기록 {store.stats['rows_written']:,}행 | 불일치 {len(bad)}건")
+
+        # 2) 프로세스 n_procs개가 같은 DB에 동시에(WAL 경합)
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=n_procs) as ex:
+            list(ex.map(_stress_worker, [(db, p, 20, 500, stocks) for p in range(n_procs)]))
+        t_proc = time.perf_counter() - t0
+
+        # 프로세스별 기대값은 같은 난수열로 재현
+        check = FavoritesStore(db, seed_path=None)
+        bad = 0
+        for p in range(n_procs):
+            rng = random.Random(p)
+            state = {}
+            for _ in range(500):
+                k = (f"p{p}-u{rng.randrange(20)}", rng.choice(stocks))
+                state[k] = not state.get(k, False)
+            bad += sum((s in check.get(ns)) != on for (ns, s), on in state.items())
+        check.close()
+        print(f"프로세스 {n_procs}개 × 500 토글 동시 기록: {t_proc:.2f}s | 불일치 {bad}건")
+
+
+if __name__ == "__main__":
+    if "--stress" in sys.argv[1:]:
+        stress()
+    else:
+        st = FavoritesStore()
+        n = st._con.execute("SELECT COUNT(*) FROM namespaces").fetchone()[0]
+        print(f"⭐ {FAV_DB_PATH.name}: 사용자 {n}명, 기본 즐겨찾기 {len(st.seed)}개")
+        st.close()
@@ -0,0 +1,421 @@
+# filter_engine.py
+# 조건 필터 엔진: 조건(지표/윈도우 N/비교/임계값, AND·OR 중첩)을 NumPy 마스크 함수로 컴파일
+# - FeatureStore: (거래일 × 종목) 매수/매도/순매수 누적합 행렬 + 종목별 최신 지표값
+#   → 임의의 N에 대해 "최근 N거래일 합계"가 누적합 차분 한 번(O(종목))
+# - 조건 스펙(JSON 그대로 저장 가능):
+#     {"feature": "비율", "window": 20, "op": "<=", "value": 0.9}
+#     {"logic": "and" | "or", "conditions": [ ...조건 또는 그룹... ]}
+# - 저장: processed/filters.json ({이름: 스펙})
+# - HistoryFeatures: 같은 조건을 (거래일 × 종목) 전체에 한 번에 평가 → backtest()
+#   (과거 각 날짜 기준 "최근 N일" 값은 누적합 행 차분, 지표는 날짜 방향 forward-fill)
+#
+# 벤치마크: python filter_engine.py --bench
+
+import json
+import operator
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+FILTERS_PATH = PROC / "filters.json"
+
+# 최근 N거래일 윈도우 피처(window 필요)
+WINDOW_FEATURES = {
+    "매수합":   "최근 N거래일 매수 합계",
+    "매도합":   "최근 N거래일 매도 합계",
+    "순매수합": "최근 N거래일 순매수 합계",
+    "비율":     "최근 N거래일 매수합/매도합",
+    "등장일수": "최근 N거래일 중 TOP50 등장일수",
+}
+
+OPS = {
+    "<=": operator.le,
+    "<":  operator.lt,
+    ">=": operator.ge,
+    ">":  operator.gt,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# 기존 조건 필터 탭과 같은 기본값(최근 20일 비율 ≤ 0.9 AND MA5 ≤ 0, MA10/MA20은 꺼둠)
+DEFAULT_FILTER = {
+    "logic": "and",
+    "lookback": 20,
+    "conditions": [
+        {"feature": "비율", "window": 20, "op": "<=", "value": 0.9},
+        {"feature": "MA5", "op": "<=", "value": 0},
+        {"feature": "MA10", "op": "<=", "value": 0, "enabled": False},
+        {"feature": "MA20", "op": "<=", "value": 0, "enabled": False},
+    ],
+}
+
+
+class FeatureStore:
+    """
+    오늘(마지막 거래일) 기준 피처 — get()은 종목 길이 1차원 배열
+    df: [종목ID, 날짜, 매수, 매도, 순매수, (지표 컬럼...)] 긴 포맷
+    열 순서 = self.stock_ids (오름차순)
+    """
+
+    def __init__(self, df, key="종목ID"):
+        import pandas as pd
+
+        day_codes, days = pd.factorize(df["날짜"], sort=True)
+        col_codes, ids = pd.factorize(df[key], sort=True)
+        self.days = days
+        self.stock_ids = np.asarray(ids)
+        self._day_codes, self._col_codes = day_codes, col_codes
+        n_days, n_stocks = len(days), len(ids)
+
+        self._cum = {}
+        for name, src in (("매수", "매수"), ("매도", "매도"), ("순매수", "순매수"), ("등장", None)):
+            m = np.zeros((n_days + 1, n_stocks), dtype=np.float64)
+            vals = 1.0 if src is None else df[src].to_numpy(np.float64)
+            np.add.at(m, (day_codes + 1, col_codes), vals)
+            self._cum[name] = np.cumsum(m, axis=0)
+
+        self._indicator_cols = [
+            c for c in df.columns
+            if c not in (key, "날짜") and np.issubdtype(df[c].dtype, np.number)
+        ]
+        self._init_indicators(df)
+        self._cache = {}
+
+    def _init_indicators(self, df):
+        # 종목별 마지막 행(최신 지표값)
+        day_codes, col_codes = self._day_codes, self._col_codes
+        order = np.lexsort((day_codes, col_codes))
+        last_rows = order[np.r_[col_codes[order][1:] != col_codes[order][:-1], True]]
+        self._last = {c: df[c].to_numpy()[last_rows].astype(np.float64) for c in self._indicator_cols}
+
+    @property
+    def n_days(self):
+        return len(self.days)
+
+    @property
+    def shape(self):
+        return (len(self.stock_ids),)
+
+    def indicator_names(self):
+        return sorted(self._indicator_cols)
+
+    def feature_names(self):
+        return list(WINDOW_FEATURES) + [c for c in self.indicator_names() if c not in ("매수", "매도", "순매수")]
+
+    def window_sum(self, name, n):
+        c = self._cum[name]
+        n = max(1, min(int(n), self.n_days))
+        return c[-1] - c[-1 - n]
+
+    def appended(self, new, key="종목ID"):
+        """
+        새 거래일 행(new: 기존 마지막 날짜 이후)만 반영한 새 FeatureStore (self는 그대로 — 읽는 중인 세션 안전)
+        누적합은 마지막 행에 새 날짜 블록의 누적합을 이어 붙이고, 최신 지표는 새 행에 나온 종목만 교체
+        처음 나온 종목은 오름차순 열 순서에 맞춰 끼워 넣음(기존 열은 그 사이로 이동, 이전 구간 0/NaN)
+        """
+        import pandas as pd
+
+        if type(self) is not FeatureStore:
+            raise TypeError("appended는 FeatureStore(최신 기준)만 지원")
+        new = new.sort_values([key, "날짜"])
+        new_days = pd.DatetimeIndex(np.unique(new["날짜"].to_numpy()))
+        if len(self.days) and len(new_days) and new_days[0] <= self.days[-1]:
+            raise ValueError("기존 마지막 거래일 이후 행만 덧붙일 수 있습니다")
+        sid = new[key].to_numpy()
+
+        out = object.__new__(FeatureStore)
+        out.days = self.days.append(new_days)
+        out.stock_ids = np.union1d(self.stock_ids, sid).astype(self.stock_ids.dtype)
+        n_cols = len(out.stock_ids)
+        old_cols = np.searchsorted(out.stock_ids, self.stock_ids)
+        day_codes = np.searchsorted(new_days.to_numpy(), new["날짜"].to_numpy())
+        col_codes = np.searchsorted(out.stock_ids, sid)
+        out._day_codes = out._col_codes = None      # 원본 행 순서 코드는 구성 시에만 사용
+
+        out._cum = {}
+        for name, src in (("매수", "매수"), ("매도", "매도"), ("순매수", "순매수"), ("등장", None)):
+            old = np.zeros((len(self.days) + 1, n_cols), dtype=np.float64)
+            old[:, old_cols] = self._cum[name]
+            block = np.zeros((len(new_days), n_cols), dtype=np.float64)
+            vals = 1.0 if src is None else new[src].to_numpy(np.float64)
+            np.add.at(block, (day_codes, col_codes), vals)
+            out._cum[name] = np.vstack([old, old[-1] + np.cumsum(block, axis=0)])
+
+        out._indicator_cols = self._indicator_cols
+        last_rows = np.r_[sid[1:] != sid[:-1], True] if len(sid) else np.array([], dtype=bool)
+        out._last = {}
+        for c in self._indicator_cols:
+            v = np.full(n_cols, np.nan)
+            v[old_cols] = self._last[c]
+            v[col_codes[last_rows]] = new[c].to_numpy(np.float64)[last_rows]
+            out._last[c] = v
+        out._cache = {}
+        return out
+
+    def range_sum(self, name, start=None, end=None):
+        """[start, end] 거래일 구간 합(양 끝 포함, None이면 처음/끝) — 누적합 차분 O(종목)"""
+        import pandas as pd
+
+        c = self._cum[name]
+        i = 0 if start is None else int(self.days.searchsorted(pd.Timestamp(start), side="left"))
+        j = self.n_days if end is None else int(self.days.searchsorted(pd.Timestamp(end), side="right"))
+        return c[max(j, i)] - c[i]
+
+    def indicator(self, name):
+        return self._last[name]
+
+    def get(self, feature, window=None):
+        k = (feature, window if feature in WINDOW_FEATURES else None)
+        if k in self._cache:
+            return self._cache[k]
+
+        if feature in WINDOW_FEATURES:
+            if window is None:
+                raise ValueError(f"'{feature}'는 window(N)가 필요합니다")
+            if feature == "매수합":
+                v = self.window_sum("매수", window)
+            elif feature == "매도합":
+                v = self.window_sum("매도", window)
+            elif feature == "순매수합":
+                v = self.window_sum("순매수", window)
+            elif feature == "등장일수":
+                v = self.window_sum("등장", window)
+            else:
+                b, s = self.window_sum("매수", window), self.window_sum("매도", window)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    v = np.where(s != 0, b / s, np.inf)
+        elif feature in self._indicator_cols:
+            v = self.indicator(feature)
+        else:
+            raise KeyError(f"알 수 없는 지표: {feature}")
+
+        self._cache[k] = v
+        return v
+
+    def universe(self, lookback):
+        """최근 lookback거래일 안에 한 번이라도 등장한 종목 마스크"""
+        return self.window_sum("등장", lookback) > 0
+
+
+class HistoryFeatures(FeatureStore):
+    """
+    모든 과거 날짜 기준 피처 — get()은 (거래일 × 종목) 2차원 배열
+    행 t = "t일 장 마감 시점에 조건 필터를 돌렸다면" 보였을 값
+    """
+
+    def _init_indicators(self, df):
+        # 지표는 등장일에만 값이 있으므로 날짜 방향 forward-fill(등장 전은 NaN)
+        n_days, n_stocks = len(self.days), len(self.stock_ids)
+        last_day = np.full((n_days, n_stocks), -1, dtype=np.int64)
+        last_day[self._day_codes, self._col_codes] = self._day_codes
+        self._ffill_idx = np.maximum.accumulate(last_day, axis=0)
+        self._ind_df = df
+        self._ind = {}
+
+    @property
+    def shape(self):
+        return (len(self.days), len(self.stock_ids))
+
+    def indicator(self, name):
+        if name not in self._ind:
+            m = np.full((len(self.days) + 1, len(self.stock_ids)), np.nan)
+            m[self._day_codes, self._col_codes] = self._ind_df[name].to_numpy(np.float64)
+            # 등장 전(-1) → 마지막 NaN 행
+            idx = np.where(self._ffill_idx >= 0, self._ffill_idx, len(self.days))
+            self._ind[name] = m[idx, np.arange(len(self.stock_ids))]
+        return self._ind[name]
+
+    def window_sum(self, name, n):
+        c = self._cum[name]
+        n = max(1, min(int(n), self.n_days))
+        hi = np.arange(1, self.n_days + 1)
+        lo = np.maximum(hi - n, 0)
+        return c[hi] - c[lo]
+
+    def forward_sum(self, name, horizon):
+        """t+1 ~ t+horizon 합계 (끝까지 horizon일이 안 남은 행은 NaN)"""
+        c = self._cum[name]
+        t = np.arange(self.n_days)
+        hi = np.minimum(t + 1 + horizon, self.n_days)
+        out = c[hi] - c[t + 1]
+        out[t + horizon >= self.n_days] = np.nan
+        return out
+
+
+# ───────────────────────────
+# 컴파일
+# ───────────────────────────
+def compile_filter(spec):
+    """스펙 → pred(fs: FeatureStore) -> bool 마스크(종목 열 순서)"""
+    if "conditions" in spec:
+        subs = [compile_filter(c) for c in spec["conditions"] if c.get("enabled", True)]
+        reduce = np.logical_or.reduce if spec.get("logic", "and").lower() == "or" else np.logical_and.reduce
+
+        def pred(fs):
+            if not subs:
+                return np.ones(fs.shape, dtype=bool)
+            return reduce([p(fs) for p in subs])
+        return pred
+
+    feature = spec["feature"]
+    window = spec.get("window")
+    op = OPS[spec.get("op", "<=")]
+    value = float(spec["value"])
+
+    def pred(fs):
+        v = fs.get(feature, window)
+        with np.errstate(invalid="ignore"):
+            return op(v, value)  # NaN 비교는 False (기존 pandas 필터와 동일)
+    return pred
+
+
+def iter_conditions(spec):
+    if "conditions" in spec:
+        for c in spec["conditions"]:
+            yield from iter_conditions(c)
+    else:
+        yield spec
+
+
+def feature_label(cond):
+    f, w = cond["feature"], cond.get("window")
+    return f"{f}{w}" if f in WINDOW_FEATURES else f
+
+
+def describe(spec):
+    if "conditions" in spec:
+        j = " OR " if spec.get("logic", "and").lower() == "or" else " AND "
+        parts = [describe(c) for c in spec["conditions"] if c.get("enabled", True)]
+        inner = j.join(parts)
+        return f"({inner})" if len(parts) > 1 else inner
+    return f"{feature_label(spec)} {spec.get('op', '<=')} {spec['value']:g}"
+
+
+def run_filter(fs, spec, lookback=None):
+    """최근 lookback일(기본: 스펙의 lookback, 없으면 20) 등장 종목 ∩ 조건 → 매칭 종목ID 배열"""
+    lookback = lookback or spec.get("lookback", 20)
+    mask = compile_filter(spec)(fs) & fs.universe(lookback)
+    return fs.stock_ids[mask]
+
+
+def backtest(hf, spec, horizon=5, lookback=None):
+    """
+    과거 모든 날짜에 조건 필터 적용 → (events, by_stock)
+    - 이벤트 = 조건이 새로 켜진 날(전날은 불일치, 당일 일치)
+    - 이후N일_순매수 = 다음 거래일부터 horizon일간 순매수 합(미등장일은 0), 적중 = 그 값 > 0
+    """
+    import pandas as pd
+
+    lookback = lookback or spec.get("lookback", 20)
+    match = compile_filter(spec)(hf) & hf.universe(lookback)
+    onset = match.copy()
+    onset[1:] &= ~match[:-1]
+
+    fwd_net = hf.forward_sum("순매수", horizon)
+    fwd_days = hf.forward_sum("등장", horizon)
+    d, s = np.nonzero(onset)
+
+    n_col, d_col = f"이후{horizon}일_순매수", f"이후{horizon}일_등장일수"
+    events = pd.DataFrame({
+        "날짜": hf.days[d],
+        "종목ID": hf.stock_ids[s],
+        "당일_순매수": (hf._cum["순매수"][d + 1, s] - hf._cum["순매수"][d, s]),
+        n_col: fwd_net[d, s],
+        d_col: fwd_days[d, s],
+    })
+    events["적중"] = np.where(events[n_col].isna(), np.nan, (events[n_col] > 0).astype(float))
+
+    by_stock = (
+        events.groupby("종목ID")
+        .agg(이벤트수=("날짜", "size"), 최근이벤트=("날짜", "max"),
+             적중률=("적중", "mean"), **{f"평균_{n_col}": (n_col, "mean")})
+        .reset_index()
+        .sort_values(["이벤트수", "적중률"], ascending=[False, False])
+    )
+    events = events.sort_values(["날짜", "종목ID"], ascending=[False, True]).reset_index(drop=True)
+    return events, by_stock
+
+
+# ───────────────────────────
+# 저장/로드 (favorites.json 옆 filters.json)
+# ───────────────────────────
+def load_filters(path: Path = FILTERS_PATH) -> dict:
+    try:
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+    except Exception:
+        pass
+    return {}
+
+
+def save_filters(filters: dict, path: Path = FILTERS_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(filters, f, ensure_ascii=False, indent=2)
+    tmp.replace(path)
+
+
+# ──────────────────────────────────────────────────────────────
+def bench(src: Path = PROC / "all_data_clean.csv", n_conditions: int = 500, repeat: int = 5):
+    import pandas as pd
+
+    df = pd.read_csv(src, parse_dates=["날짜"], encoding="utf-8-sig")
+    t = time.perf_counter()
+    fs = FeatureStore(df)
+    t_build = time.perf_counter() - t
+
+    rng = np.random.default_rng(0)
+    feats = fs.feature_names()
+    conds = []
+    for _ in range(n_conditions):
+        f = feats[rng.integers(len(feats))]
+        c = {"feature": f, "op": list(OPS)[rng.integers(4)], "value": float(rng.normal())}
+        if f in WINDOW_FEATURES:
+            c["window"] = int(rng.integers(1, 121))
+        conds.append(c)
+    spec = {"logic": "or", "conditions": [
+        {"logic": "and", "conditions": conds[i:i + 5]} for i in range(0, n_conditions, 5)
+    ]}
+
+    t = time.perf_counter()
+    pred = compile_filter(spec)
+    t_compile = time.perf_counter() - t
+
+    best = float("inf")
+    for _ in range(repeat):
+        fs._cache.clear()
+        t = time.perf_counter()
+        hits = pred(fs) & fs.universe(20)
+        best = min(best, time.perf_counter() - t)
+
+    print(f"종목 {len(fs.stock_ids)} × 거래일 {fs.n_days}")
+    print(f"FeatureStore 생성 {t_build * 1000:.1f} ms | 조건 {n_conditions}개 컴파일 {t_compile * 1000:.2f} ms")
+    print(f"평가(캐시 없이) {best * 1000:.2f} ms → 결과 {int(hits.sum())}종목")
+
+    # 백테스트: 기본 필터를 과거 전체 (날짜 × 종목)에 — 현재 크기 / 종목 10배
+    from indicators import synthetic
+    for scale in (1, 10):
+        data = synthetic(df, scale) if scale > 1 else df
+        t = time.perf_counter()
+        hf = HistoryFeatures(data)
+        t_hf = time.perf_counter() - t
+        t = time.perf_counter()
+        events, _ = backtest(hf, DEFAULT_FILTER, horizon=5)
+        t_bt = time.perf_counter() - t
+        print(f"백테스트 x{scale:<3} {hf.n_days}일 × {len(hf.stock_ids)}종목 | "
+              f"HistoryFeatures {t_hf * 1000:.1f} ms + 평가 {t_bt * 1000:.1f} ms → 이벤트 {len(events):,}건")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        bench()
+    else:
+        print("윈도우 피처:", ", ".join(WINDOW_FEATURES))
+        print("기본 필터:", describe(DEFAULT_FILTER))
@@ -0,0 +1,220 @@
+# groups.py
+# 테마/기초자산 그룹 단위 매수·매도·순매수 (예: TSLA = 테슬라 + 2배/인버스 ETF, 반도체 = SOXX/SOXL/SOXS …)
+# - processed/groups.csv(그룹,종목명,배율): name_map.csv 옆 공용 파일(수동 관리)
+#   배율 = 기초자산 1달러 대비 노출 — 일반 종목 1, 2배 ETF 2, 인버스 -1, 3배 인버스 -3
+#   종목명은 별칭(합병/분할 전 이름)이어도 entities 대표 종목ID로 묶임, 이 시장에 없는 종목명은 무시
+# - clean_and_enrich.py: 파티션별 group_daily.csv = (그룹, 날짜)별 합계
+#     매수/매도/순매수: 구성 종목 단순 합 · 환산순매수: Σ 배율 × 순매수(기초자산 방향 노출) · 종목수: 그날 등장 종목 수
+# - GroupRollup(앱): (거래일 × 그룹) 누적합 → 아무 기간 그룹 합계 O(그룹 수),
+#   그룹 시계열(+MA)은 로드할 때 한 번 계산해 둔 구간 슬라이스 → 재실행마다 groupby 없음
+#
+# 벤치마크(기간 합계: 누적합 vs 원본 groupby): python groups.py --bench
+
+import csv
+import sys
+import time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+GROUPS_PATH = PROC / "groups.csv"               # 공용(시장 무관)
+GROUP_DAILY_PATH = PROC / "group_daily.csv"     # 파티션별 산출물
+
+METRICS = ["매수", "매도", "순매수", "환산순매수"]
+GROUP_COLS = ["그룹", "날짜"] + METRICS + ["종목수"]
+MA_WINDOWS = (5, 10, 20)
+
+
+def read_groups(path: Path = GROUPS_PATH) -> list:
+    """groups.csv → [(그룹, 종목명, 배율)] (표준 라이브러리만 — 앱에서도 가볍게)"""
+    if not path.exists():
+        return []
+    out = []
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for r in csv.DictReader(f):
+            group, name = (r.get("그룹") or "").strip(), (r.get("종목명") or "").strip()
+            if not group or not name:
+                continue
+            try:
+                factor = float(r.get("배율") or 1)
+            except ValueError:
+                raise ValueError(f"{path.name}: 배율이 숫자가 아닙니다 ({group}, {name}: {r.get('배율')!r})")
+            out.append((group, name, factor))
+    return out
+
+
+def resolve_members(groups: list, name_to_id: dict):
+    """[(그룹, 종목명, 배율)] → ([(그룹, 종목ID, 배율)], 이 시장에 없는 종목명) — 같은 그룹에 같은 종목이면 처음 것만"""
+    members, missing, seen = [], [], set()
+    for group, name, factor in groups:
+        sid = name_to_id.get(name)
+        if sid is None:
+            missing.append(name)
+        elif (group, sid) not in seen:
+            seen.add((group, sid))
+            members.append((group, int(sid), factor))
+    return members, missing
+
+
+def rollup(df, members: list):
+    """(종목ID, 날짜, 매수, 매도, 순매수) 긴 포맷 → (그룹, 날짜) 합계(GROUP_COLS, 그룹·날짜 정렬)"""
+    import pandas as pd
+
+    if not members:
+        return pd.DataFrame(columns=GROUP_COLS)
+    mem = pd.DataFrame(members, columns=["그룹", "종목ID", "배율"])
+    m = df[["종목ID", "날짜", "매수", "매도", "순매수"]].merge(mem, on="종목ID")
+    m["환산순매수"] = m["순매수"] * m["배율"]
+    out = (
+        m.groupby(["그룹", "날짜"], as_index=False)
+         .agg(매수=("매수", "sum"), 매도=("매도", "sum"), 순매수=("순매수", "sum"),
+              환산순매수=("환산순매수", "sum"), 종목수=("종목ID", "size"))
+    )
+    out["환산순매수"] = out["환산순매수"].round(0).astype("int64")
+    return out[GROUP_COLS].sort_values(["그룹", "날짜"]).reset_index(drop=True)
+
+
+def build_outputs(df, name_to_id: dict, out_path: Path = GROUP_DAILY_PATH, groups_path: Path = GROUPS_PATH):
+    """enrich 단계용: 그룹 일별 합계 저장(임시 파일 → 교체) → (daily, 그룹 수, 없는 종목명)"""
+    members, missing = resolve_members(read_groups(groups_path), name_to_id)
+    daily = rollup(df, members)
+    tmp = out_path.with_suffix(".tmp")
+    daily.to_csv(tmp, index=False, encoding="utf-8-sig", date_format="%Y-%m-%d")
+    tmp.replace(out_path)
+    return daily, len({g for g, _, _ in members}), missing
+
+
+class GroupRollup:
+    """
+    그룹 일별 합계의 조회 구조(읽기 전용)
+    - cum[지표]: (거래일 + 1) × 그룹 누적합 → 기간 합계 = cum[j] - cum[i]
+    - daily: (그룹, 날짜) 정렬 + 그룹 등장일 기준 MA (순매수 MA{n}, 환산순매수 환산MA{n}), lo/hi = 그룹별 행 구간
+    """
+
+    def __init__(self, daily, members=()):
+        import numpy as np
+        import pandas as pd
+
+        daily = daily.sort_values(["그룹", "날짜"]).reset_index(drop=True)
+        g = daily.groupby("그룹", sort=False)
+        for n in MA_WINDOWS:
+            daily[f"MA{n}"] = g["순매수"].transform(lambda s: s.rolling(n).mean()).round(0)
+            daily[f"환산MA{n}"] = g["환산순매수"].transform(lambda s: s.rolling(n).mean()).round(0)
+        self.daily = daily
+        self.members = list(members)
+
+        group_codes, groups = pd.factorize(daily["그룹"], sort=False)
+        day_codes, days = pd.factorize(daily["날짜"], sort=True)
+        self.groups = list(groups)
+        self.days = pd.DatetimeIndex(days)
+        self._col = {name: i for i, name in enumerate(self.groups)}
+        self.cum = {}
+        for c in METRICS + ["등장일"]:
+            m = np.zeros((len(days) + 1, len(groups)))
+            m[day_codes + 1, group_codes] = daily[c].to_numpy(np.float64) if c != "등장일" else 1.0
+            self.cum[c] = np.cumsum(m, axis=0)
+
+        bounds = np.flatnonzero(np.r_[True, group_codes[1:] != group_codes[:-1], True]) if len(daily) else [0]
+        self.lo, self.hi = np.asarray(bounds[:-1]), np.asarray(bounds[1:])
+        self._t = daily["날짜"].to_numpy(dtype="datetime64[ns]")
+
+    @classmethod
+    def load(cls, path: Path = GROUP_DAILY_PATH, groups_path: Path = GROUPS_PATH, name_to_id=None):
+        """group_daily.csv → GroupRollup (그룹이 하나도 없으면 None)"""
+        import pandas as pd
+
+        if not path.exists():
+            return None
+        daily = pd.read_csv(path, parse_dates=["날짜"], encoding="utf-8-sig")
+        if daily.empty:
+            return None
+        members = resolve_members(read_groups(groups_path), name_to_id)[0] if name_to_id is not None else ()
+        return cls(daily, members)
+
+    def _span(self, start, end):
+        import pandas as pd
+        i = 0 if start is None else int(self.days.searchsorted(pd.Timestamp(start), side="left"))
+        j = len(self.days) if end is None else int(self.days.searchsorted(pd.Timestamp(end), side="right"))
+        return i, j
+
+    def totals(self, start=None, end=None):
+        """[start, end] 그룹별 합계 → DataFrame(그룹, 매수, 매도, 순매수, 환산순매수, 등장일수), 기간에 없는 그룹 제외"""
+        import pandas as pd
+
+        i, j = self._span(start, end)
+        out = pd.DataFrame({"그룹": self.groups})
+        for c in METRICS:
+            out[c] = (self.cum[c][j] - self.cum[c][i]).round(0)
+        out["등장일수"] = (self.cum["등장일"][j] - self.cum["등장일"][i]).astype(int)
+        return out[out["등장일수"] > 0].reset_index(drop=True)
+
+    def series(self, group, start=None, end=None, columns=None):
+        """그룹의 [start, end] 일별 행(그룹 등장일만)"""
+        import numpy as np
+        import pandas as pd
+
+        k = self._col.get(group)
+        frame = self.daily if columns is None else self.daily[columns]
+        if k is None:
+            return frame.iloc[0:0]
+        a, b = int(self.lo[k]), int(self.hi[k])
+        t = self._t[a:b]
+        i = 0 if start is None else int(np.searchsorted(t, np.datetime64(pd.Timestamp(start), "ns"), side="left"))
+        j = len(t) if end is None else int(np.searchsorted(t, np.datetime64(pd.Timestamp(end), "ns"), side="right"))
+        return frame.iloc[a + i:a + j]
+
+    def group_members(self, group):
+        """[(종목ID, 배율)] — load(name_to_id=...)로 만든 경우만"""
+        return [(sid, f) for g, sid, f in self.members if g == group]
+
+
+# ──────────────────────────────────────────────────────────────
+def bench(src: Path = PROC / "all_data_clean.csv", repeat: int = 200):
+    import numpy as np
+    import pandas as pd
+    from entities import load_entities
+    from stock_ids import load_stock_ids
+
+    df = pd.read_csv(src, parse_dates=["날짜"], encoding="utf-8-sig", usecols=["날짜", "종목ID", "매수", "매도", "순매수"])
+    ids = load_stock_ids()
+    canon = load_entities()
+    name_to_id = {**ids, **{a: ids[c] for a, c in canon.items() if c in ids}}
+    members, missing = resolve_members(read_groups(), name_to_id)
+
+    t = time.perf_counter()
+    daily = rollup(df, members)
+    t_roll = time.perf_counter() - t
+    t = time.perf_counter()
+    gr = GroupRollup(daily)
+    t_build = time.perf_counter() - t
+
+    days = gr.days
+    start, end = days[-20], days[-1]
+    mem = pd.DataFrame(members, columns=["그룹", "종목ID", "배율"])
+
+    def naive():
+        p = df[(df["날짜"] >= start) & (df["날짜"] <= end)].merge(mem, on="종목ID")
+        p["환산순매수"] = p["순매수"] * p["배율"]
+        return p.groupby("그룹")[["매수", "매도", "순매수", "환산순매수"]].sum()
+
+    ref = naive()
+    got = gr.totals(start, end).set_index("그룹").loc[ref.index]
+    ok = all(np.allclose(got[c], ref[c].round(0), atol=1) for c in ref.columns)
+
+    res = {}
+    for name, fn in (("원본 merge+groupby", naive), ("GroupRollup.totals", lambda: gr.totals(start, end))):
+        t = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        res[name] = (time.perf_counter() - t) / repeat * 1000
+    print(f"rows={len(df):,}  그룹 {len(gr.groups)}개(구성 {len(members)}종목, 없는 종목명 {len(missing)})  "
+          f"rollup {t_roll * 1000:.1f} ms  구조 {t_build * 1000:.1f} ms")
+    for name, ms in res.items():
+        print(f"최근 20거래일 그룹 합계 · {name:<20} {ms:7.3f} ms  (x{ms / res['GroupRollup.totals']:.1f})")
+    print("검증:", "OK" if ok else "FAIL")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        bench()
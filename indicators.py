@@ -0,0 +1,190 @@
+# indicators.py
+# (거래일 × 종목) 순매수 행렬 위에서 지표를 한 번에 계산하는 벡터화 엔진
+# - 긴 포맷(종목ID, 날짜 정렬) → 종목별 등장일을 위로 채운 (등장일 × 종목) 행렬로 패킹
+#   (기존 MA5/10/20과 같은 기준: 그 종목이 TOP50에 등장한 날들 기준의 N일)
+# - 모든 윈도우 지표는 axis=0 누적합 차분 → 비용 O(일수 × 종목 × 윈도우 수)
+# - EMA만 점화식이라 날짜 방향 루프(종목 방향은 벡터)
+#
+# 벤치마크: python indicators.py --bench
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+# 기본 윈도우(여기만 바꾸면 enrich 결과 컬럼 구성이 바뀜)
+SMA_WINDOWS   = (5, 10, 20)   # MA{n}
+EMA_SPANS     = (12, 26)      # EMA{n}
+Z_WINDOWS     = (20,)         # Z{n}    : 순매수 롤링 z-score
+RATIO_WINDOWS = (5, 20)       # 비율{n} : 롤링 매수합/매도합
+
+STREAK_COLS = ["연속순매수", "연속순매도"]
+
+
+def indicator_columns(sma=SMA_WINDOWS, ema=EMA_SPANS, z=Z_WINDOWS, ratio=RATIO_WINDOWS):
+    return (
+        [f"MA{n}" for n in sma]
+        + [f"EMA{n}" for n in ema]
+        + [f"Z{n}" for n in z]
+        + [f"비율{n}" for n in ratio]
+        + STREAK_COLS
+    )
+
+
+def pack(df, key="종목ID"):
+    """
+    (종목ID, 날짜) 정렬된 긴 포맷 → (pos, col, n_rows)
+    pos: 종목 안에서 몇 번째 등장일인지, col: 종목 열 번호
+    """
+    keys = df[key].to_numpy()
+    n = len(keys)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if n else np.array([], dtype=np.int64)
+    lengths = np.diff(np.r_[starts, n])
+    col = np.repeat(np.arange(len(starts)), lengths)
+    pos = np.arange(n) - np.repeat(starts, lengths)
+    n_rows = int(lengths.max()) if n else 0
+    return pos, col, n_rows
+
+
+def to_matrix(values, pos, col, n_rows, n_cols, fill=np.nan):
+    m = np.full((n_rows, n_cols), fill, dtype=np.float64)
+    m[pos, col] = values
+    return m
+
+
+def _rolling_sum(m, w):
+    """axis=0 길이 w 롤링 합 (앞쪽 w-1행은 NaN). 입력에 NaN이 없다는 전제(패킹 영역 밖은 0)."""
+    c = np.cumsum(m, axis=0)
+    out = np.full_like(c, np.nan)
+    if w <= len(c):
+        out[w - 1] = c[w - 1]
+        out[w:] = c[w:] - c[:-w]
+    return out
+
+
+def _ema(m, span, valid):
+    """adjust=False 점화식 EMA(첫 값으로 시작), span개 쌓이기 전은 NaN"""
+    a = 2.0 / (span + 1.0)
+    out = np.empty_like(m)
+    prev = m[0].copy()
+    out[0] = prev
+    for t in range(1, len(m)):
+        prev = a * m[t] + (1.0 - a) * prev
+        out[t] = prev
+    if span > 1:
+        out[: span - 1] = np.nan
+    out[~valid] = np.nan
+    return out
+
+
+def _streak(flag):
+    """axis=0 방향 True 연속 길이(False에서 0으로 리셋)"""
+    c = np.cumsum(flag, axis=0)
+    reset = np.maximum.accumulate(np.where(flag, 0, c), axis=0)
+    return c - reset
+
+
+def compute_indicators(df, sma=SMA_WINDOWS, ema=EMA_SPANS, z=Z_WINDOWS, ratio=RATIO_WINDOWS, key="종목ID"):
+    """
+    df: [key, 날짜, 매수, 매도, 순매수] 긴 포맷 → 지표 컬럼을 붙인 새 df ((key, 날짜) 정렬)
+    """
+    df = df.sort_values([key, "날짜"]).reset_index(drop=True)
+    pos, col, n_rows = pack(df, key)
+    n_cols = int(col.max()) + 1 if len(col) else 0
+
+    net = to_matrix(df["순매수"].to_numpy(np.float64), pos, col, n_rows, n_cols, fill=0.0)
+    valid = to_matrix(np.ones(len(df)), pos, col, n_rows, n_cols, fill=0.0).astype(bool)
+    out = {}
+
+    for w in sma:
+        out[f"MA{w}"] = _rolling_sum(net, w) / w
+
+    for s in ema:
+        out[f"EMA{s}"] = _ema(net, s, valid)
+
+    if z:
+        # 종목별 평균을 빼고 누적합(큰 금액의 제곱합 상쇄 오차 방지)
+        cnt = valid.sum(axis=0)
+        mu = np.divide(net.sum(axis=0), cnt, out=np.zeros(n_cols), where=cnt > 0)
+        xc = np.where(valid, net - mu, 0.0)
+        for w in z:
+            s1 = _rolling_sum(xc, w)
+            s2 = _rolling_sum(xc * xc, w)
+            var = (s2 - s1 * s1 / w) / max(w - 1, 1)
+            sd = np.sqrt(np.clip(var, 0.0, None))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                zz = (xc - s1 / w) / sd
+            zz[sd == 0] = np.nan
+            out[f"Z{w}"] = zz
+
+    if ratio:
+        buy = to_matrix(df["매수"].to_numpy(np.float64), pos, col, n_rows, n_cols, fill=0.0)
+        sell = to_matrix(df["매도"].to_numpy(np.float64), pos, col, n_rows, n_cols, fill=0.0)
+        for w in ratio:
+            b = _rolling_sum(buy, w)
+            s = _rolling_sum(sell, w)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                r = b / s
+            r[(s == 0) & ~np.isnan(s)] = np.inf
+            out[f"비율{w}"] = r
+
+    out["연속순매수"] = _streak(valid & (net > 0))
+    out["연속순매도"] = _streak(valid & (net < 0))
+
+    for name, m in out.items():
+        df[name] = m[pos, col]
+    for name in STREAK_COLS:
+        df[name] = df[name].astype("int32")
+    return df
+
+
+# ──────────────────────────────────────────────────────────────
+def synthetic(df, scale):
+    """기존 데이터를 종목 방향으로 scale배 복제(노이즈 포함) → 벤치마크용"""
+    rng = np.random.default_rng(0)
+    parts = []
+    step = int(df["종목ID"].max()) + 1
+    for k in range(scale):
+        p = df.copy()
+        p["종목ID"] = p["종목ID"] + k * step
+        if k:
+            noise = rng.normal(1.0, 0.1, len(p))
+            for c in ("매수", "매도"):
+                p[c] = (p[c] * noise).round()
+            p["순매수"] = p["매수"] - p["매도"]
+        parts.append(p)
+    return pd.concat(parts, ignore_index=True)
+
+
+def bench(src: Path = PROC / "all_data_clean.csv", repeat: int = 3):
+    base = pd.read_csv(src, parse_dates=["날짜"], encoding="utf-8-sig",
+                       usecols=["날짜", "종목ID", "매수", "매도", "순매수"])
+    n_ind = len(indicator_columns())
+    t1 = None
+    for scale in (1, 10):
+        data = synthetic(base, scale)
+        best = float("inf")
+        for _ in range(repeat):
+            t = time.perf_counter()
+            compute_indicators(data)
+            best = min(best, time.perf_counter() - t)
+        t1 = t1 or best
+        print(f"x{scale:<3} rows={len(data):>9,}  지표 {n_ind}개  {best * 1000:8.1f} ms  (x1 대비 {best / t1:.1f}배)")
+
+    # 기존 groupby.rolling(MA 3개) 대비
+    t = time.perf_counter()
+    for n in SMA_WINDOWS:
+        base.groupby("종목ID")["순매수"].rolling(n, min_periods=n).mean()
+    print(f"참고: 기존 groupby.rolling MA{'/'.join(map(str, SMA_WINDOWS))} (x1) {(time.perf_counter() - t) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        bench()
+    else:
+        print("지표 컬럼:", ", ".join(indicator_columns()))
@@ -0,0 +1,354 @@
+# live_data.py
+# 앱이 공유하는 데이터 스냅샷 + 백그라운드 감시(핫 리로드)
+# - Snapshot: 한 데이터 버전의 프레임/SeriesIndex/FeatureStore/RankIndex(+백테스트용 HistoryFeatures)
+#   만들어진 뒤에는 바꾸지 않음(읽기 전용) → 세션들이 잠금 없이 동시에 읽음
+# - DataWatcher: all_data_clean.csv 변경을 주기적으로 확인
+#   · 평소(새 거래일 추가): 작은 all_data_tail.csv(최근 며칠)만 읽어 새 날짜 행으로 기존 구조를 이어 붙인 새 스냅샷
+#   · 과거가 바뀐 경우(종목 통합 변경, 재처리, 과거 날짜 보정 등): 전체 재적재
+#     enrich가 tail 옆에 tail 이전 행들의 지문(all_data_tail.json: 행 수 + 행 해시 합)을 남기고,
+#     스냅샷 지문 = 그 지문 + tail의 스냅샷 마지막 날까지 행 — 다르면 과거가 바뀐 것
+#   · 어느 쪽이든 백그라운드에서 다 만든 뒤 참조만 교체 → 어떤 세션도 재적재를 기다리지 않음
+#   · 교체 뒤 구독자(subscribe)에게 새 스냅샷 통지 — 앱의 캐시 예열(warmup.py) 등
+#
+# 벤치마크(+ 패치 결과 = 전체 재적재 결과 검증): python live_data.py --bench
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from entities import ENTITIES_PATH
+from filter_engine import FeatureStore, HistoryFeatures
+from ranks import RankIndex, fill_rank
+from series_index import SeriesIndex
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+DATA_PATH = PROC / "all_data_clean.csv"
+TAIL_PATH = PROC / "all_data_tail.csv"
+TAIL_FP_PATH = PROC / "all_data_tail.json"     # tail 이전 행들의 지문
+
+FP_COLS = ["날짜", "종목ID", "매수", "매도", "순매수"]   # 지표/순위는 이 값들(+ entities.csv)에서 나옴
+
+TAIL_DAYS = 5       # enrich가 따로 남기는 최근 거래일 수(이보다 오래 멈췄다 돌아오면 전체 재적재)
+POLL_SEC = 30       # 변경 확인 주기
+
+
+def _stamp(p: Path):
+    try:
+        s = p.stat()
+        return s.st_mtime_ns, s.st_size
+    except FileNotFoundError:
+        return None
+
+
+def read_frame(path: Path):
+    """all_data_clean(또는 tail) CSV → 종목ID(int32) 키 프레임, (종목ID, 날짜) 정렬"""
+    df = pd.read_csv(path, parse_dates=["날짜"], encoding="utf-8-sig", dtype={"종목ID": "int32"})
+
+    need_base = {"날짜", "종목ID", "매수", "매도", "순매수"}
+    miss_base = need_base - set(df.columns)
+    if miss_base:
+        raise ValueError(f"필수 컬럼 누락: {miss_base}")
+
+    # 예전 형식(지표/순위 컬럼 없음)이면 여기서 계산
+    from indicators import compute_indicators, indicator_columns
+    if not set(indicator_columns()) <= set(df.columns):
+        df = compute_indicators(df[list(need_base)])
+    if "순위" not in df.columns:
+        df = fill_rank(df)
+
+    return df.sort_values(["종목ID", "날짜"]).reset_index(drop=True)
+
+
+def fingerprint(df) -> tuple:
+    """
+    행 집합 지문 (행 수, 행 해시 합 mod 2^64) — 행 순서·dtype(int/float)과 무관, 합이라 이어 붙일 때 더하기만 하면 됨
+    """
+    norm = pd.DataFrame({
+        "날짜": df["날짜"].to_numpy("datetime64[ns]").view(np.int64),
+        **{c: df[c].to_numpy(np.float64) for c in FP_COLS[1:]},
+    })
+    h = pd.util.hash_pandas_object(norm, index=False).to_numpy(np.uint64)
+    return len(norm), int(np.add.reduce(h, dtype=np.uint64)) if len(h) else 0
+
+
+def fp_add(a: tuple, b: tuple) -> tuple:
+    return a[0] + b[0], (a[1] + b[1]) % 2**64
+
+
+def write_tail(df, path: Path = TAIL_PATH, days: int = TAIL_DAYS):
+    """
+    enrich 결과에서 최근 days 거래일 행만 따로 저장(원자적 교체)
+    + 같은 이름 .json에 tail 첫날 이전 행들의 지문(감시자가 과거 변경을 알아채는 기준)
+    """
+    last = np.sort(df["날짜"].unique())[-days:]
+    tail = df[df["날짜"].isin(last)]
+    rows, h = fingerprint(df[df["날짜"] < last[0]])
+    fp_path = path.with_suffix(".json")
+    tmp = fp_path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps({"기준일": f"{pd.Timestamp(last[0]):%Y-%m-%d}", "행": rows, "해시": str(h)},
+                              ensure_ascii=False), encoding="utf-8")
+    tmp.replace(fp_path)
+    tmp = path.with_suffix(".tmp")
+    tail.to_csv(tmp, index=False, encoding="utf-8-sig")
+    tmp.replace(path)
+    return tail
+
+
+class Snapshot:
+    def __init__(self, df, version, fs=None, index=None, ranks=None, fp=None):
+        self.df = df
+        self.version = version
+        self.fp = fp if fp is not None else fingerprint(df)
+        self.fs = fs if fs is not None else FeatureStore(df)
+        self.index = index if index is not None else SeriesIndex(df)
+        self.ranks = ranks if ranks is not None else RankIndex(df)
+        self._history = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path = DATA_PATH):
+        stamp = _stamp(path)
+        df = read_frame(path)
+        return cls(df, make_version(df, stamp))
+
+    @property
+    def days(self):
+        return self.fs.days
+
+    @property
+    def last_day(self):
+        return self.fs.days[-1] if len(self.fs.days) else None
+
+    @property
+    def history(self):
+        """백테스트용 HistoryFeatures — 처음 쓸 때 만들거나(전체 로드) 감시 스레드가 미리 만들어 둠"""
+        if self._history is None:
+            with self._lock:
+                if self._history is None:
+                    self._history = HistoryFeatures(self.df)
+        return self._history
+
+    def appended(self, new, version):
+        """
+        new(마지막 거래일 이후 행들)를 덧붙인 새 스냅샷 — self는 그대로
+        프레임: 각 종목 구간 끝에 새 행 삽입(O(행 수) 복사, CSV 재파싱 없음)
+        인덱스/누적합/순위 행렬: 새 날짜 블록만 계산해 이어 붙임
+        """
+        new = new[self.df.columns].sort_values(["종목ID", "날짜"]).reset_index(drop=True)
+        new = new.astype(self.df.dtypes.to_dict())
+        old_sid = self.df["종목ID"].to_numpy()
+        new_sid = new["종목ID"].to_numpy()
+        n_old = len(old_sid)
+
+        pos = np.searchsorted(old_sid, new_sid, side="right")
+        order = np.insert(np.arange(n_old), pos, np.arange(n_old, n_old + len(new)))
+        df2 = pd.concat([self.df, new], ignore_index=True).take(order).reset_index(drop=True)
+
+        return Snapshot(
+            df2, version,
+            fs=self.fs.appended(new),
+            index=self.index.appended(df2, new_sid),
+            ranks=self.ranks.appended(new),
+            fp=fp_add(self.fp, fingerprint(new)),
+        )
+
+    def warm(self):
+        """교체 전에 무거운 지연 구조를 미리 계산(첫 사용 세션이 기다리지 않도록)"""
+        self.history
+        return self
+
+
+def make_version(df, stamp):
+    last = df["날짜"].max()
+    tag = f"{stamp[0]}" if stamp else "0"
+    return f"{last:%Y%m%d}-{tag}"
+
+
+class DataWatcher:
+    """현재 스냅샷 보관 + 백그라운드 변경 감시/교체"""
+
+    def __init__(self, path: Path = DATA_PATH, tail_path: Path = None, poll: float = POLL_SEC):
+        """path와 같은 폴더(시장 파티션)의 tail/entities.csv를 씀"""
+        self.path, self.poll = path, poll
+        self.tail_path = tail_path or path.parent / TAIL_PATH.name
+        self.fp_path = self.tail_path.with_suffix(".json")
+        self.entities_path = path.parent / ENTITIES_PATH.name
+        self._seen = _stamp(path)
+        self._entities_seen = _stamp(self.entities_path)
+        self._snap = Snapshot.load(path)
+        self._thread = None
+        self._listeners = []
+        self.stats = {"패치": 0, "전체": 0, "오류": 0, "마지막": None}
+
+    @property
+    def current(self) -> Snapshot:
+        return self._snap
+
+    def subscribe(self, fn):
+        """fn(snapshot): 스냅샷이 교체될 때마다 감시 스레드에서 호출(오래 걸리는 일은 fn 쪽에서 다른 스레드로)"""
+        if fn not in self._listeners:
+            self._listeners.append(fn)
+        return self
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll)
+            try:
+                self.check()
+            except Exception as e:          # 감시는 계속(다음 주기에 재시도)
+                self.stats["오류"] += 1
+                print(f"⚠️ 데이터 감시 오류: {e}")
+
+    def _tail_rows(self, snap):
+        """
+        tail에서 snap 이후 새 행만 — 이어 붙일 수 없으면 None
+        (tail이 snap 마지막 날을 포함하고, tail 이전 지문 + tail의 마지막 날까지 행 = 스냅샷 지문
+         = 디스크의 snap 마지막 날까지가 스냅샷과 같음, 어느 과거 날짜가 바뀌어도 전체 재적재)
+        """
+        if _stamp(self.entities_path) != self._entities_seen or not self.tail_path.exists():
+            return None
+        try:
+            fp = json.loads(self.fp_path.read_text(encoding="utf-8"))
+            before = (int(fp["행"]), int(fp["해시"]))
+        except (FileNotFoundError, ValueError, KeyError) as e:
+            print(f"ℹ️ tail 지문 없음/손상({e}) → 전체 재적재")
+            return None
+        tail = read_frame(self.tail_path)
+        last = snap.last_day
+        if last is None or last not in set(tail["날짜"]) or tail["날짜"].min() != pd.Timestamp(fp["기준일"]):
+            return None
+        if fp_add(before, fingerprint(tail[tail["날짜"] <= last])) != snap.fp:
+            print("ℹ️ 과거 데이터 변경 감지(지문 불일치) → 전체 재적재")
+            return None
+        new = tail[tail["날짜"] > last]
+        return new if len(new) else None
+
+    def check(self):
+        """변경이 있으면 새 스냅샷을 만들어 교체 → ("패치"|"전체"|None)"""
+        stamp = _stamp(self.path)
+        if stamp is None or stamp == self._seen:
+            return None
+        entities = _stamp(self.entities_path)
+        snap = self._snap
+        t = time.perf_counter()
+        how = "패치"
+        try:
+            new = self._tail_rows(snap)
+            nxt = snap.appended(new, make_version(new, stamp)) if new is not None else None
+        except (ValueError, KeyError) as e:
+            print(f"ℹ️ 증분 반영 불가 → 전체 재적재: {e}")
+            nxt = None
+        if nxt is None:
+            how = "전체"
+            nxt = Snapshot.load(self.path)
+        nxt.warm()
+        self._snap = nxt                    # 참조 교체(원자적) — 실행 중인 세션은 이전 스냅샷을 끝까지 사용
+        self._seen, self._entities_seen = stamp, entities
+        self.stats[how] += 1
+        self.stats["마지막"] = (how, nxt.version, round((time.perf_counter() - t) * 1000, 1))
+        for fn in list(self._listeners):
+            try:
+                fn(nxt)
+            except Exception as e:          # 구독자 오류가 감시를 멈추지 않도록
+                print(f"⚠️ 스냅샷 구독자 오류: {e}")
+        return how
+
+
+# ──────────────────────────────────────────────────────────────
+def _same(a, b):
+    return np.allclose(np.asarray(a, np.float64), np.asarray(b, np.float64), equal_nan=True, rtol=1e-12, atol=1e-6)
+
+
+def _watch_case(full, cut, tmp: Path, rewrite_day=None):
+    """
+    임시 폴더의 감시자: cut까지 데이터로 시작 → 디스크를 full로 교체(rewrite_day면 그날 한 행 매수/순매수도 보정)
+    → (check() 결과, 교체된 스냅샷 = 디스크 전체 재적재?)
+    """
+    path = tmp / DATA_PATH.name
+    old = full[full["날짜"] <= cut].reset_index(drop=True)
+    write_tail(old, tmp / TAIL_PATH.name)
+    old.to_csv(path, index=False, encoding="utf-8-sig")
+    w = DataWatcher(path)
+
+    disk = full.copy()
+    if rewrite_day is not None:
+        i = disk.index[disk["날짜"] == rewrite_day][0]
+        disk.loc[i, ["매수", "순매수"]] += 1000
+    write_tail(disk, tmp / TAIL_PATH.name)
+    disk.to_csv(path, index=False, encoding="utf-8-sig")
+    how = w.check()
+    ref = read_frame(path)
+    cur = w.current
+    same = cur.fp == fingerprint(ref) and _same(cur.df.select_dtypes("number"), ref.select_dtypes("number"))
+    return how, same
+
+
+def bench(n_new_days: int = 1, repeat: int = 5):
+    """마지막 n일을 떼어 둔 스냅샷에 tail로 패치 vs 전체 재적재: 시간 + 결과 동일성"""
+    import tempfile
+    from filter_engine import run_filter, DEFAULT_FILTER
+
+    full = read_frame(DATA_PATH)
+    days = np.sort(full["날짜"].unique())
+    cut = days[-n_new_days - 1]
+    old = full[full["날짜"] <= cut].reset_index(drop=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tail_path = Path(tmp) / "tail.csv"
+        write_tail(full, tail_path)
+
+        best_full = best_patch = float("inf")
+        for _ in range(repeat):
+            t = time.perf_counter()
+            ref = Snapshot.load(DATA_PATH).warm()
+            best_full = min(best_full, time.perf_counter() - t)
+
+            base = Snapshot(old, "base")
+            t = time.perf_counter()
+            tail = read_frame(tail_path)
+            patched = base.appended(tail[tail["날짜"] > cut], "patched").warm()
+            best_patch = min(best_patch, time.perf_counter() - t)
+
+    checks = {
+        "프레임": patched.df.equals(ref.df) or _same(patched.df.select_dtypes("number"), ref.df.select_dtypes("number")),
+        "SeriesIndex": all(np.array_equal(patched.index.rows([i]), ref.index.rows([i])) for i in ref.index.stock_ids),
+        "누적합": all(_same(patched.fs._cum[k], ref.fs._cum[k]) for k in ref.fs._cum),
+        "최신 지표": all(_same(patched.fs._last[c], ref.fs._last[c]) for c in ref.fs._indicator_cols),
+        "순위 행렬": np.array_equal(patched.ranks.m, ref.ranks.m),
+        "조건 필터": np.array_equal(run_filter(patched.fs, DEFAULT_FILTER), run_filter(ref.fs, DEFAULT_FILTER)),
+    }
+    print(f"rows={len(full):,}  새 거래일 {n_new_days}일 ({len(full) - len(old)}행)")
+    print(f"전체 재적재(CSV 파싱 + 구조 재구성): {best_full * 1000:7.1f} ms")
+    print(f"tail 읽기 + 패치:                  {best_patch * 1000:7.1f} ms  (x{best_full / best_patch:.1f})")
+    print("검증:", ", ".join(f"{k} {'OK' if v else 'FAIL'}" for k, v in checks.items()))
+
+    # 감시자 판단: 새 거래일만 추가 → 패치 / tail 이전 과거 날짜가 바뀜(재처리·보정) → 전체 재적재
+    past, recent = pd.Timestamp(days[-30]), pd.Timestamp(days[-3])
+    cases = [("새 거래일 추가", None, "패치"), (f"과거 {past:%Y-%m-%d} 보정", past, "전체"),
+             (f"tail 안 {recent:%Y-%m-%d} 보정", recent, "전체")]
+    for name, day, want in cases:
+        with tempfile.TemporaryDirectory() as tmp:
+            how, same = _watch_case(full, cut, Path(tmp), rewrite_day=day)
+        ok = how == want and same
+        print(f"감시자 {name}: {how} (기대 {want}), 스냅샷 = 디스크 {'OK' if same else 'FAIL'} → {'OK' if ok else 'FAIL'}")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        bench()
+    else:
+        snap = Snapshot.load()
+        print(f"📦 {DATA_PATH.name}: 버전 {snap.version}, rows={len(snap.df):,}, 거래일 {len(snap.days)}")
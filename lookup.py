@@ -0,0 +1,131 @@
+# lookup.py
+# 앱 첫 화면용 조회 테이블(종목ID/종목명/표시명/거래일)을 작은 바이너리(pickle)로 저장·로드
+# - clean_and_enrich.py가 매일 갱신
+# - 앱은 pandas 없이 이 파일만 읽어서 셀렉트박스/슬라이더를 바로 그림
+# - 표준 라이브러리만 사용(앱 콜드 스타트에서 무거운 import 회피)
+
+import csv
+import pickle
+from pathlib import Path
+
+from entities import load_entities, ENTITIES_PATH
+from stock_ids import load_stock_ids, id_to_name_list, STOCK_IDS_PATH
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+LOOKUP_PATH = PROC / "lookup.pkl"
+STOCKS_PATH = PROC / "stocks.txt"
+NAME_MAP_PATH = PROC / "name_map.csv"
+
+LOOKUP_VERSION = 3
+
+
+def _mtime(p: Path) -> float:
+    try:
+        return p.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+
+def read_name_map(path: Path = NAME_MAP_PATH) -> dict:
+    """name_map.csv(영문명,한글명) → {영문명: 한글명} (한글명 빈 값 제외)"""
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return {
+            r["영문명"]: r["한글명"].strip()
+            for r in csv.DictReader(f)
+            if r.get("영문명") and (r.get("한글명") or "").strip()
+        }
+
+
+def display_name(code: str, name_map: dict) -> str:
+    kor = name_map.get(code)
+    return f"{kor} ({code})" if kor else code
+
+
+def build_lookup(stocks, trading_days, ids=None, name_map=None, aliases=None) -> dict:
+    """
+    stocks: 현재 데이터에 있는 (대표)종목명 리스트, trading_days: date 리스트(오름차순)
+    ids: {종목명: 종목ID} 전체 사전(없으면 stock_ids.csv)
+    aliases: {별칭: 대표명}(없으면 entities.csv) — 별칭으로 찾아도 대표 ID로
+    → 앱이 첫 렌더에 쓰는 조회 테이블 dict
+      names[종목ID] / disp[종목ID] 는 ID로 바로 인덱싱하는 디코딩 배열
+    """
+    if ids is None:
+        ids = load_stock_ids()
+    if name_map is None:
+        name_map = read_name_map()
+    if aliases is None:
+        aliases = load_entities()
+    # 대표명에 한글명이 없으면 별칭의 한글명을 물려받음
+    name_map = dict(name_map)
+    for alias, rep in sorted(aliases.items()):
+        if rep not in name_map and alias in name_map:
+            name_map[rep] = name_map[alias]
+    names = id_to_name_list(ids)
+    disp = [display_name(n, name_map) if n else "" for n in names]
+    present = sorted({ids[c] for c in stocks if c in ids})
+    name_to_id = {n: i for i, n in enumerate(names) if n}
+    name_to_id.update({a: ids[r] for a, r in aliases.items() if r in ids})
+    return {
+        "version": LOOKUP_VERSION,
+        "names": names,
+        "disp": disp,
+        "stock_ids": present,
+        "name_to_id": name_to_id,
+        "disp_to_id": {disp[i]: i for i in present},
+        "stocks_disp": sorted(disp[i] for i in present),
+        "trading_days": list(trading_days),
+    }
+
+
+def save_lookup(lookup: dict, path: Path = LOOKUP_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(lookup, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+
+
+def load_lookup(path: Path = LOOKUP_PATH) -> dict:
+    """
+    lookup.pkl 로드. 없거나 name_map.csv/stocks.txt/stock_ids.csv/entities.csv보다 오래됐으면
+    stocks.txt + stock_ids.csv + name_map.csv + entities.csv + 기존 거래일로 다시 만들어 저장(네임맵 수정 즉시 반영).
+    """
+    lookup = None
+    try:
+        with open(path, "rb") as f:
+            lookup = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        pass
+
+    # 같은 폴더(시장 파티션)의 stocks.txt/stock_ids.csv/entities.csv, name_map.csv는 공용
+    stocks_path, ids_path, ent_path = (path.parent / p.name for p in (STOCKS_PATH, STOCK_IDS_PATH, ENTITIES_PATH))
+    stale = (
+        lookup is None
+        or lookup.get("version") != LOOKUP_VERSION
+        or _mtime(path) < max(_mtime(NAME_MAP_PATH), _mtime(stocks_path),
+                              _mtime(ids_path), _mtime(ent_path))
+    )
+    if not stale:
+        return lookup
+
+    stocks = [s for s in stocks_path.read_text(encoding="utf-8").splitlines() if s.strip()] \
+        if stocks_path.exists() else []
+    days = (lookup or {}).get("trading_days") or []
+    lookup = build_lookup(stocks, days, load_stock_ids(ids_path), aliases=load_entities(ent_path))
+    try:
+        save_lookup(lookup, path)
+    except OSError:
+        pass
+    return lookup
+
+
+def date_bounds(lookup: dict):
+    days = lookup.get("trading_days") or []
+    if not days:
+        return None, None
+    return days[0], days[-1]
+
@@ -0,0 +1,115 @@
+# markets.py
+# 세이브로 수집 키 공간: (시장, 조회 기준, 날짜)
+# - 시장: 폼의 국가 라디오(area_radio), 조회 기준: 매수+매도/매수/매도 TOP50 라디오(area_radio_2)
+# - 저장은 (시장, 기준)별 파티션 폴더 — 기본 파티션(미국, 매수+매도)은 예전 경로(data/, processed/) 그대로
+#     원본:  data/<시장>/<기준>/reYYYYMMDD.xls
+#     가공:  processed/<시장>/          (매수+매도 기준)
+#            processed/<시장>/<기준>/   (그 외 기준)
+# - 종목 사전/조회 테이블/상관 상태 등 파티션마다 따로, name_map.csv·entity_overrides.csv·groups.csv는 공용(processed/)
+#
+# ⚠️ 라디오 번호: 미국(area_radio_input_1)·매수+매도(area_radio_2_input_2)만 기존 다운로더로 확인된 값(VERIFIED),
+#    나머지는 폼의 라디오 순서로 추정 — 실제 폼에서 확인하기 전에는 다운로더가 거부(check_verified)
+#    다운로더는 클릭 뒤 선택된 라디오의 글자를 읽어 표시명과 비교(label_matches) — 다르면 그 작업 실패
+#    세이브로 화면이 바뀌면 여기만 고치면 됨
+
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+DATA_DIR = BASE / "data"
+PROC = BASE / "processed"
+
+# 코드: (표시명, 라디오 번호)
+MARKETS = {
+    "us": ("🇺🇸 미국", 1),
+    "hk": ("🇭🇰 홍콩", 2),
+    "cn": ("🇨🇳 중국", 3),
+    "jp": ("🇯🇵 일본", 4),
+    "vn": ("🇻🇳 베트남", 5),
+}
+MODES = {
+    "buysell": ("매수+매도", 2),
+    "buy":     ("매수", 0),
+    "sell":    ("매도", 1),
+}
+DEFAULT_MARKET = "us"
+DEFAULT_MODE = "buysell"
+
+# 실제 폼에서 확인한 라디오 — 새로 확인하면 여기에 추가
+VERIFIED_MARKETS = {"us"}
+VERIFIED_MODES = {"buysell"}
+
+
+def market_xpath(market: str) -> str:
+    return f'//*[@id="area_radio_input_{MARKETS[market][1]}"]'
+
+
+def mode_xpath(mode: str) -> str:
+    return f'//*[@id="area_radio_2_input_{MODES[mode][1]}"]'
+
+
+def check_verified(market: str, mode: str):
+    """라디오 번호를 실제 폼에서 확인하지 않은 시장/기준이면 ValueError(다른 파티션 TOP50을 잘못 저장하지 않게)"""
+    bad = [f"시장 {market}"] if market not in VERIFIED_MARKETS else []
+    bad += [f"기준 {mode}"] if mode not in VERIFIED_MODES else []
+    if bad:
+        raise ValueError(f"라디오 번호 미확인: {', '.join(bad)} — 실제 폼에서 확인 후 markets.VERIFIED_*에 추가")
+
+
+def _norm_label(text: str) -> str:
+    """라디오 글자 비교용: 공백 제거, 앞의 국기 이모지 등 기호 제외"""
+    text = "".join(str(text).split())
+    return "".join(ch for ch in text if ch.isalnum() or ch == "+")
+
+
+def label_matches(expected: str, got) -> bool:
+    """폼에서 읽은 라디오 글자(got)가 표시명(expected, 예: '🇺🇸 미국')과 같은지"""
+    return got is not None and _norm_label(got) == _norm_label(expected)
+
+
+def raw_dir(market: str = DEFAULT_MARKET, mode: str = DEFAULT_MODE) -> Path:
+    """다운로드 원본(reYYYYMMDD.xls) 폴더"""
+    if (market, mode) == (DEFAULT_MARKET, DEFAULT_MODE):
+        return DATA_DIR
+    return DATA_DIR / market / mode
+
+
+def proc_dir(market: str = DEFAULT_MARKET, mode: str = DEFAULT_MODE) -> Path:
+    """combine/enrich 산출물 폴더"""
+    d = PROC if market == DEFAULT_MARKET else PROC / market
+    return d if mode == DEFAULT_MODE else d / mode
+
+
+def parse_list(value, table: dict, default: str):
+    """'us,hk' / 'all' / None → 코드 리스트(알 수 없는 코드는 ValueError)"""
+    if not value:
+        return [default]
+    if value == "all":
+        return list(table)
+    codes = [v.strip() for v in value.split(",") if v.strip()]
+    bad = [c for c in codes if c not in table]
+    if bad:
+        raise ValueError(f"알 수 없는 코드: {bad} (가능: {', '.join(table)})")
+    return codes
+
+
+def partitions(markets=None, modes=None):
+    """(시장, 기준) 조합 — 기본은 기본 파티션 하나"""
+    return [(m, md) for m in (markets or [DEFAULT_MARKET]) for md in (modes or [DEFAULT_MODE])]
+
+
+def available_markets(mode: str = DEFAULT_MODE):
+    """가공 데이터(all_data_clean.csv)가 있는 시장 — 앱 시장 선택지"""
+    return [m for m in MARKETS if (proc_dir(m, mode) / "all_data_clean.csv").exists()]
+
+
+def pop_opt(args: list, name: str, default=None):
+    """args에서 '--name 값' / '--name=값'을 꺼내 지우고 값 반환(없으면 default)"""
+    for i, a in enumerate(args):
+        if a == name and i + 1 < len(args):
+            value = args[i + 1]
+            del args[i:i + 2]
+            return value
+        if a.startswith(name + "="):
+            del args[i]
+            return a.split("=", 1)[1]
+    return default
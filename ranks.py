@@ -0,0 +1,150 @@
+# ranks.py
+# 세이브로 일별 TOP50 순위 이력
+# - combine_data.py: 원본 표의 순위를 "순위" 컬럼으로 보존
+#   (순위 없이 쌓인 예전 행은 그날 매수+매도 합계 내림차순으로 채움 — 세이브로 TOP50 정렬 기준)
+# - clean_and_enrich.py: 종목별 순위/순위변화(직전 등장일 대비, +면 상승) 컬럼
+# - RankIndex: (거래일 × 종목ID) int16 행렬 → 아무 종목·아무 날짜 순위를 O(1)로 조회(0 = 권외)
+#
+# 벤치마크: python ranks.py --bench
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+TOP_N = 50
+RANK_COLS = ["순위", "순위변화"]
+
+
+def derive_rank(df, by="날짜"):
+    """날짜별 매수+매도 합계 내림차순 순위(1부터, 동률은 원래 순서)"""
+    total = df["매수"].fillna(0) + df["매도"].fillna(0)
+    return total.groupby(df[by]).rank(method="first", ascending=False).astype("int16")
+
+
+def fill_rank(df):
+    """순위 컬럼이 없거나 비어 있는 날짜만 derive_rank로 채움(원본 순위가 있는 날은 그대로)"""
+    if "순위" not in df.columns:
+        df["순위"] = derive_rank(df)
+        return df
+    r = pd.to_numeric(df["순위"], errors="coerce")
+    missing_days = df.loc[r.isna(), "날짜"].unique()
+    if len(missing_days):
+        m = df["날짜"].isin(missing_days)
+        r[m] = derive_rank(df[m])
+    df["순위"] = r.astype("int16")
+    return df
+
+
+def add_rank_delta(df, key="종목ID"):
+    """(key, 날짜) 정렬된 df에 순위변화 = 직전 등장일 순위 - 오늘 순위 (첫 등장은 NaN)"""
+    prev = df.groupby(key, sort=False)["순위"].shift(1)
+    df["순위변화"] = (prev - df["순위"]).astype("Int16")
+    return df
+
+
+class RankIndex:
+    """
+    m[거래일 행, 종목ID] = 그날 순위(0 = TOP50 밖)
+    종목ID는 0부터 촘촘하므로 열 번호 = 종목ID, 날짜 → 행은 dict
+    """
+
+    def __init__(self, df, key="종목ID"):
+        day_codes, days = pd.factorize(df["날짜"], sort=True)
+        self.days = pd.DatetimeIndex(days)
+        self._row = {d.date(): i for i, d in enumerate(self.days)}
+        n_cols = int(df[key].max()) + 1 if len(df) else 0
+        self.m = np.zeros((len(days), n_cols), dtype=np.int16)
+        self.m[day_codes, df[key].to_numpy()] = df["순위"].to_numpy()
+
+    def appended(self, new, key="종목ID"):
+        """새 거래일 행만 덧붙인 새 인덱스(기존 행렬은 그대로, 새 종목이면 열만 늘림)"""
+        day_codes, days = pd.factorize(new["날짜"], sort=True)
+        days = pd.DatetimeIndex(days)
+        if len(self.days) and len(days) and days[0] <= self.days[-1]:
+            raise ValueError("기존 마지막 거래일 이후 행만 덧붙일 수 있습니다")
+        n_cols = max(self.m.shape[1], int(new[key].max()) + 1 if len(new) else 0)
+        block = np.zeros((len(days), n_cols), dtype=np.int16)
+        block[day_codes, new[key].to_numpy()] = new["순위"].to_numpy()
+        out = object.__new__(RankIndex)
+        out.days = self.days.append(days)
+        out._row = {**self._row, **{d.date(): len(self.days) + i for i, d in enumerate(days)}}
+        out.m = np.vstack([np.pad(self.m, ((0, 0), (0, n_cols - self.m.shape[1]))), block])
+        return out
+
+    def _day_row(self, day):
+        return self._row.get(day.date() if hasattr(day, "date") else day)
+
+    def rank(self, stock_id, day):
+        """그날 순위(int) — 거래일이 아니거나 권외면 None"""
+        i = self._day_row(day)
+        if i is None or not 0 <= stock_id < self.m.shape[1]:
+            return None
+        r = int(self.m[i, stock_id])
+        return r or None
+
+    def series(self, stock_id, start=None, end=None):
+        """[start, end] 모든 거래일의 순위 → (DatetimeIndex, float 배열; 권외 NaN)"""
+        i = 0 if start is None else int(self.days.searchsorted(pd.Timestamp(start), side="left"))
+        j = len(self.days) if end is None else int(self.days.searchsorted(pd.Timestamp(end), side="right"))
+        col = self.m[i:j, stock_id].astype(np.float64)
+        col[col == 0] = np.nan
+        return self.days[i:j], col
+
+    def day(self, day):
+        """그날 TOP50 종목ID(순위순)"""
+        i = self._day_row(day)
+        if i is None:
+            return np.array([], dtype=np.int64)
+        row = self.m[i]
+        ids = np.flatnonzero(row)
+        return ids[np.argsort(row[ids], kind="stable")]
+
+
+# ──────────────────────────────────────────────────────────────
+def bench(src: Path = PROC / "all_data_clean.csv", n: int = 20000):
+    import time
+
+    df = pd.read_csv(src, parse_dates=["날짜"], encoding="utf-8-sig", usecols=["날짜", "종목ID", "순위"])
+    t = time.perf_counter()
+    idx = RankIndex(df)
+    t_build = time.perf_counter() - t
+
+    rng = np.random.default_rng(0)
+    qs = list(zip(rng.choice(df["종목ID"].unique(), n).tolist(), idx.days[rng.integers(0, len(idx.days), n)]))
+    dates = [d.date() for _, d in qs]
+
+    t = time.perf_counter()
+    for (sid, _), d in zip(qs, dates):
+        idx.rank(sid, d)
+    t_idx = (time.perf_counter() - t) / n
+
+    sub = qs[:200]
+    t = time.perf_counter()
+    for sid, d in sub:
+        df.loc[(df["종목ID"] == sid) & (df["날짜"] == d), "순위"]
+    t_mask = (time.perf_counter() - t) / len(sub)
+
+    sid = int(df["종목ID"].value_counts().index[0])
+    t = time.perf_counter()
+    for _ in range(1000):
+        idx.series(sid)
+    t_series = (time.perf_counter() - t) / 1000
+
+    print(f"RankIndex 구축: {t_build * 1000:.1f} ms  행렬 {idx.m.shape} int16 = {idx.m.nbytes / 1024:.0f} KiB")
+    print(f"순위 조회 1건: 인덱스 {t_idx * 1e6:.2f} µs | pandas 마스크 {t_mask * 1e6:.0f} µs (x{t_mask / t_idx:,.0f})")
+    print(f"종목 전체 순위 궤적({len(idx.days)}일): {t_series * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        bench()
+    else:
+        df = pd.read_csv(PROC / "all_data_clean.csv", parse_dates=["날짜"], encoding="utf-8-sig")
+        idx = RankIndex(df)
+        last = idx.days[-1]
+        print(f"{last.date()} TOP5 종목ID:", idx.day(last)[:5].tolist())
@@ -0,0 +1,170 @@
+# seibro_mock.py
+# 세이브로 "종목별 거래내역 TOP50" 폼의 로컬 모의 서버 — 다운로더 테스트/처리량 측정용
+# - 실제 폼과 같은 요소 id(라디오/달력 입력/조회·엑셀 버튼/w2modal 오버레이)
+# - 조회: 오버레이를 띄운 채 delay초 대기 후 결과, 데이터 없으면 alert
+# - 엑셀: 실제처럼 HTML 표를 .xls 첨부로 내려줌(combine_data.py가 read_html로 읽는 형식)
+# - 데이터는 (시장, 기준, 날짜)로 시드를 정한 결정적 난수 → 받은 파일을 mock_table()과 비교해 검증
+#
+# 실행: python seibro_mock.py [--port 8765] [--delay 0.5]
+#       python downloader.py --url http://127.0.0.1:8765/ --market us,hk --mode all --allow-unverified 20250101 20250110
+
+import sys
+import threading
+import time
+import zlib
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from markets import MARKETS, MODES, DEFAULT_MARKET, DEFAULT_MODE, pop_opt
+
+UNIVERSE = 120      # 시장별 모의 종목 수
+TOP_N = 50
+
+_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>SEIBRO mock</title>
+<style>
+ div.w2modal {{ position: fixed; inset: 0; background: rgba(0,0,0,.2); display: none; }}
+</style></head>
+<body>
+<div>
+ <input type="radio" name="a1_radio1" id="a1_radio1_input_0" value="settle" checked><label>결제</label>
+ <input type="radio" name="a1_radio1" id="a1_radio1_input_1" value="custody"><label>보관</label>
+</div>
+<div>{modes}</div>
+<div>{markets}</div>
+<div>
+ <input id="sd1_inputCalendar1_input" type="text">
+ <input id="sd1_inputCalendar2_input" type="text">
+ <img id="image2" alt="조회" width="40" height="20" style="background:#ccc">
+ <img id="ExcelDownload_img" alt="엑셀" width="40" height="20" style="background:#cfc">
+</div>
+<div id="result"></div>
+<div class="w2modal" id="overlay"></div>
+<script>
+function picked(name) {{
+  const el = document.querySelector('input[name="' + name + '"]:checked');
+  return el ? el.value : '';
+}}
+function params() {{
+  return 'market=' + picked('area_radio') + '&mode=' + picked('area_radio_2') +
+         '&start=' + document.getElementById('sd1_inputCalendar1_input').value +
+         '&end=' + document.getElementById('sd1_inputCalendar2_input').value;
+}}
+let last = null;
+document.getElementById('image2').onclick = async function () {{
+  const ov = document.getElementById('overlay');
+  ov.style.display = 'block';
+  const q = params();
+  const res = await fetch('/query?' + q);
+  const rows = parseInt(await res.text(), 10);
+  ov.style.display = 'none';
+  last = rows > 0 ? q : null;
+  document.getElementById('result').textContent = rows + ' rows';
+  if (!rows) alert('조회된 데이터가 없습니다.');
+}};
+document.getElementById('ExcelDownload_img').onclick = function () {{
+  location.href = '/xls?' + (last || params());
+}};
+</script>
+</body></html>
+"""
+
+
+def _radios(name, table):
+    return "\n".join(
+        f' <input type="radio" name="{name}" id="{name}_input_{idx}" value="{code}"'
+        f'{" checked" if i == 0 else ""}><label>{label}</label>'
+        for i, (code, (label, idx)) in enumerate(sorted(table.items(), key=lambda kv: kv[1][1]))
+    )
+
+
+def page_html():
+    return _PAGE.format(modes=_radios("area_radio_2", MODES), markets=_radios("area_radio", MARKETS))
+
+
+def mock_table(market: str, mode: str, ymd: str):
+    """(시장, 기준, 날짜) → 모의 TOP50 표 [(순위, 국가, 종목코드, 종목명, 매수, 매도, 합계)] — 주말은 빈 리스트"""
+    d = date(int(ymd[:4]), int(ymd[4:6]), int(ymd[6:8]))
+    if d.weekday() >= 5:
+        return []
+    rng = np.random.default_rng(zlib.crc32(f"{market}|{ymd}".encode()))
+    buy = np.round(rng.lognormal(15, 1.5, UNIVERSE))
+    sell = np.round(rng.lognormal(15, 1.5, UNIVERSE))
+    key = {"buy": buy, "sell": sell}.get(mode, buy + sell)
+    top = np.argsort(-key, kind="stable")[:TOP_N]
+    cc = market.upper()
+    return [
+        (r + 1, cc, f"{cc}{k:010d}", f"{cc} MOCK {k:03d} INC", int(buy[k]), int(sell[k]), int(buy[k] + sell[k]))
+        for r, k in enumerate(top)
+    ]
+
+
+def table_html(rows):
+    if not rows:
+        return "<html><body><p>조회된 데이터가 없습니다.</p></body></html>"
+    head = "".join(f"<th>{c}</th>" for c in ("순위", "국가", "종목코드", "종목명", "매수결제", "매도결제", "합계"))
+    body = "".join(
+        "<tr>" + "".join(f"<td>{v:,}</td>" if isinstance(v, int) else f"<td>{v}</td>" for v in row) + "</tr>"
+        for row in rows
+    )
+    return f'<html><head><meta charset="utf-8"></head><body><table><tr>{head}</tr>{body}</table></body></html>'
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    stats = None        # {"query": n, "xls": n}
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body: str, ctype="text/html; charset=utf-8", attach=None):
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        if attach:
+            self.send_header("Content-Disposition", f'attachment; filename="{attach}"')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        u = urlparse(self.path)
+        q = {k: v[0] for k, v in parse_qs(u.query).items()}
+        market = q.get("market") or DEFAULT_MARKET
+        mode = q.get("mode") or DEFAULT_MODE
+        ymd = (q.get("start") or "").replace("-", "")
+        if u.path in ("/query", "/xls"):
+            time.sleep(self.delay)
+            self.stats[u.path[1:]] += 1
+            rows = mock_table(market, mode, ymd) if len(ymd) == 8 and ymd.isdigit() else []
+            if u.path == "/query":
+                self._send(str(len(rows)), "text/plain")
+            else:
+                self._send(table_html(rows), "application/vnd.ms-excel", attach=f"seibro_{market}_{mode}_{ymd}.xls")
+            return
+        self._send(page_html())
+
+
+def serve(port: int = 0, delay: float = 0.0):
+    """백그라운드 스레드로 모의 서버 시작 → (server, url)"""
+    handler = type("Handler", (MockHandler,), {"delay": delay, "stats": {"query": 0, "xls": 0}})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="seibro-mock", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    port = int(pop_opt(args, "--port", 8765))
+    delay = float(pop_opt(args, "--delay", 0.5))
+    server, url = serve(port, delay)
+    print(f"🧪 세이브로 모의 서버: {url} (응답 지연 {delay}s) — Ctrl+C로 종료")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
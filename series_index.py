@@ -0,0 +1,135 @@
+# series_index.py
+# 종목별 시계열 일괄 조회 인덱스
+# - (종목ID, 날짜) 정렬 프레임에서 종목ID → 행 구간 [lo, hi) 배열(종목ID가 0부터 촘촘 → 배열 인덱스)
+# - 구간 안 날짜는 정렬돼 있으므로 기간 자르기는 searchsorted
+# - 여러 종목을 한 번의 iloc(take)로 → 종목 수만큼 전체 프레임 마스크를 만들 필요 없음
+#
+# 벤치마크: python series_index.py --bench
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+
+class SeriesIndex:
+    def __init__(self, df, key="종목ID"):
+        """df: (key, 날짜) 정렬된 긴 포맷(reset_index 된 상태)"""
+        self.df = df
+        sid = df[key].to_numpy()
+        n = int(sid.max()) + 1 if len(sid) else 0
+        uniq, first, counts = np.unique(sid, return_index=True, return_counts=True)
+        self.lo = np.zeros(n, dtype=np.int64)
+        self.hi = np.zeros(n, dtype=np.int64)
+        self.lo[uniq] = first
+        self.hi[uniq] = first + counts
+        self.stock_ids = uniq
+        self._t = df["날짜"].to_numpy(dtype="datetime64[ns]")
+
+    def appended(self, df2, new_ids):
+        """
+        df2 = 기존 프레임에 new_ids 행을 각 종목 구간 끝에 끼워 넣은 프레임 → 새 인덱스
+        (구간은 종목ID 순서로 이어지므로 종목별 행 수만 더해 누적합으로 다시 계산: O(종목 수))
+        """
+        new_ids = np.asarray(new_ids)
+        n = max(len(self.lo), int(new_ids.max()) + 1 if len(new_ids) else 0)
+        counts = np.zeros(n, dtype=np.int64)
+        counts[: len(self.lo)] = self.hi - self.lo
+        counts += np.bincount(new_ids, minlength=n)
+        out = object.__new__(SeriesIndex)
+        out.df = df2
+        out.hi = np.cumsum(counts)
+        out.lo = out.hi - counts
+        out.stock_ids = np.flatnonzero(counts)
+        out._t = df2["날짜"].to_numpy(dtype="datetime64[ns]")
+        return out
+
+    def __contains__(self, stock_id):
+        return 0 <= stock_id < len(self.lo) and self.hi[stock_id] > self.lo[stock_id]
+
+    def _spans(self, ids, start=None, end=None):
+        """종목마다 [start, end] 행 구간 (a, b) — 없는 종목/빈 구간은 건너뜀"""
+        s = None if start is None else np.datetime64(pd.Timestamp(start), "ns")
+        e = None if end is None else np.datetime64(pd.Timestamp(end), "ns")
+        for i in ids:
+            if i not in self:
+                continue
+            a, b = int(self.lo[i]), int(self.hi[i])
+            t = self._t[a:b]
+            if s is not None:
+                a += int(np.searchsorted(t, s, side="left"))
+            if e is not None:
+                b = int(self.lo[i]) + int(np.searchsorted(t, e, side="right"))
+            if b > a:
+                yield a, b
+
+    def rows(self, ids, start=None, end=None):
+        """종목들의 [start, end] 행 위치(종목 순서대로 이어 붙임)"""
+        parts = [np.arange(a, b) for a, b in self._spans(ids, start, end)]
+        return np.concatenate(parts) if parts else np.array([], dtype=np.int64)
+
+    def iter_rows(self, ids, start=None, end=None, chunk_rows=50_000):
+        """rows()를 종목 경계에서 chunk_rows행 안팎씩 나눠서 — 큰 범위 내보내기에서 전체 위치 배열/복사본을 만들지 않음"""
+        parts, n = [], 0
+        for a, b in self._spans(ids, start, end):
+            parts.append(np.arange(a, b))
+            n += b - a
+            if n >= chunk_rows:
+                yield np.concatenate(parts)
+                parts, n = [], 0
+        if parts:
+            yield np.concatenate(parts)
+
+    def count(self, ids, start=None, end=None):
+        """rows()의 행 수(위치 배열 없이)"""
+        return sum(b - a for a, b in self._spans(ids, start, end))
+
+    def take(self, ids, start=None, end=None, columns=None):
+        """종목 여러 개 × 기간 → 한 번의 iloc으로 부분 프레임"""
+        frame = self.df if columns is None else self.df[columns]
+        return frame.iloc[self.rows(ids, start, end)]
+
+
+# ──────────────────────────────────────────────────────────────
+def bench(src: Path = PROC / "all_data_clean.csv", k: int = 10, repeat: int = 200):
+    import time
+
+    df = pd.read_csv(src, parse_dates=["날짜"], encoding="utf-8-sig")
+    df = df.sort_values(["종목ID", "날짜"]).reset_index(drop=True)
+    t = time.perf_counter()
+    idx = SeriesIndex(df)
+    t_build = time.perf_counter() - t
+
+    ids = df["종목ID"].value_counts().index[:k].tolist()
+    start, end = df["날짜"].min() + pd.Timedelta(days=90), df["날짜"].max()
+
+    def masks():
+        return pd.concat([
+            df[(df["종목ID"] == i) & (df["날짜"] >= start) & (df["날짜"] <= end)] for i in ids
+        ])
+
+    def isin_mask():
+        return df[df["종목ID"].isin(ids) & (df["날짜"] >= start) & (df["날짜"] <= end)]
+
+    def batched():
+        return idx.take(ids, start, end)
+
+    assert masks().index.equals(batched().index)
+    res = {}
+    for name, fn in (("종목별 마스크 × k", masks), ("isin 마스크 1회", isin_mask), ("SeriesIndex.take", batched)):
+        t = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        res[name] = (time.perf_counter() - t) / repeat * 1000
+    print(f"rows={len(df):,}  종목 {k}개  인덱스 구축 {t_build * 1000:.1f} ms")
+    for name, ms in res.items():
+        print(f"{name:<20} {ms:7.3f} ms  (x{ms / res['SeriesIndex.take']:.1f})")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        bench()
@@ -0,0 +1,166 @@
+# spikes.py
+# 종목별 순매수 이상 급증/급감 탐지(강건 z-score)
+# - 기준: 그 종목의 직전 W 등장일(오늘 제외) 순매수 중앙값/MAD → 점수 = (오늘 - 중앙값) / (1.4826 × MAD)
+#   (indicators.py의 MA와 같은 "등장일 기준" 윈도우 — 평균/표준편차와 달리 예전 급증 하루에 기준이 끌려가지 않음)
+# - (종목ID, 날짜) 정렬 긴 포맷에서 행마다 직전 W행을 (행 × W) 블록으로 모아 정렬 한 번으로 중앙값/MAD
+#   → 비용 O(행 수 × W log W), 블록을 CHUNK_ROWS행씩 처리해 메모리도 일정(데이터 크기에 선형)
+# - clean_and_enrich.py가 조건을 넘는 날을 processed/spikes.csv로 저장 → 앱 "이상 급증" 탭은 이 파일만 읽음
+#
+# 벤치마크(+ pandas groupby.rolling 결과와 비교): python spikes.py --bench
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+SPIKES_PATH = PROC / "spikes.csv"
+
+WINDOW = 20             # 기준 구간: 직전 등장일 수
+MIN_HIST = 10           # 기준 구간에 이만큼 쌓여야 점수 계산
+Z_MIN = 6.0             # |점수| 이상이면 이벤트
+MIN_JUMP = 1e6          # 그리고 |오늘 - 중앙값| ≥ 100만 달러(작은 금액의 흔들림 제외)
+MAD_K = 1.4826          # 정규분포에서 MAD → 표준편차 환산
+CHUNK_ROWS = 1 << 18
+
+SPIKE_COLS = ["날짜", "종목ID", "순매수", "중앙값", "MAD", "점수", "배수", "방향"]
+
+
+def _nth(s, k):
+    """행별로 정렬된 s에서 k번째 값(k: 행별 인덱스 배열)"""
+    return np.take_along_axis(s, k[:, None], axis=1)[:, 0]
+
+
+def rolling_median_mad(x, keys, window=WINDOW, min_hist=MIN_HIST, chunk=CHUNK_ROWS):
+    """
+    x: 순매수(긴 포맷, keys 구간별 날짜 정렬), keys: 종목ID
+    → (중앙값, MAD, 기준 개수) — 행마다 같은 종목의 직전 window행 기준, 개수 < min_hist면 NaN
+    """
+    x = np.asarray(x, dtype=np.float64)
+    keys = np.asarray(keys)
+    n = len(x)
+    med = np.full(n, np.nan)
+    mad = np.full(n, np.nan)
+    cnt = np.zeros(n, dtype=np.int64)
+    if not n:
+        return med, mad, cnt
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    first = np.repeat(starts, np.diff(np.r_[starts, n]))       # 행마다 종목 구간 시작 행
+    back = np.arange(window, 0, -1)
+
+    for lo in range(0, n, chunk):
+        hi = min(lo + chunk, n)
+        rows = np.arange(lo, hi)
+        idx = rows[:, None] - back[None, :]
+        ok = idx >= first[lo:hi, None]
+        c = ok.sum(axis=1)
+        h = np.where(ok, x[np.maximum(idx, 0)], np.nan)
+
+        s = np.sort(h, axis=1)                                  # NaN은 뒤로
+        cc = np.maximum(c, 1)
+        m = 0.5 * (_nth(s, (cc - 1) // 2) + _nth(s, cc // 2))
+        d = np.sort(np.abs(h - m[:, None]), axis=1)
+        a = 0.5 * (_nth(d, (cc - 1) // 2) + _nth(d, cc // 2))
+
+        enough = c >= min_hist
+        med[lo:hi] = np.where(enough, m, np.nan)
+        mad[lo:hi] = np.where(enough, a, np.nan)
+        cnt[lo:hi] = c
+    return med, mad, cnt
+
+
+def detect(df, window=WINDOW, min_hist=MIN_HIST, z_min=Z_MIN, min_jump=MIN_JUMP):
+    """
+    df: (종목ID, 날짜) 정렬 긴 포맷 → 이벤트 표(SPIKE_COLS, 최신 날짜·|점수| 순)
+    MAD가 0(기준 구간이 거의 같은 값)이면 중앙값 크기의 1%를 하한으로
+    """
+    x = df["순매수"].to_numpy(np.float64)
+    med, mad, _ = rolling_median_mad(x, df["종목ID"].to_numpy(), window, min_hist)
+    dev = x - med
+    scale = np.maximum(MAD_K * mad, np.maximum(np.abs(med) * 0.01, 1.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        score = dev / scale
+        ratio = np.where(med != 0, x / np.abs(med), np.nan)
+        hit = (np.abs(score) >= z_min) & (np.abs(dev) >= min_jump)
+
+    ev = pd.DataFrame({
+        "날짜": df["날짜"].to_numpy()[hit],
+        "종목ID": df["종목ID"].to_numpy()[hit],
+        "순매수": x[hit].round(0),
+        "중앙값": med[hit].round(0),
+        "MAD": mad[hit].round(0),
+        "점수": score[hit].round(2),
+        "배수": ratio[hit].round(2),
+        "방향": np.where(dev[hit] > 0, "급증", "급감"),
+    })
+    ev["_abs"] = ev["점수"].abs()
+    return ev.sort_values(["날짜", "_abs"], ascending=[False, False]).drop(columns="_abs").reset_index(drop=True)
+
+
+def build_outputs(df, path: Path = SPIKES_PATH):
+    """enrich 단계용: 이벤트 표 저장(임시 파일 → 교체)"""
+    ev = detect(df)
+    tmp = path.with_suffix(".tmp")
+    ev.to_csv(tmp, index=False, encoding="utf-8-sig", date_format="%Y-%m-%d")
+    tmp.replace(path)
+    return ev
+
+
+def load_spikes(path: Path = SPIKES_PATH):
+    if not path.exists():
+        return pd.DataFrame(columns=SPIKE_COLS)
+    return pd.read_csv(path, parse_dates=["날짜"], encoding="utf-8-sig", dtype={"종목ID": "int32"})
+
+
+# ──────────────────────────────────────────────────────────────
+def _pandas_reference(df, window=WINDOW, min_hist=MIN_HIST):
+    """비교 기준: 종목별 groupby → shift(1).rolling().median() / MAD는 rolling.apply"""
+    g = df.groupby("종목ID", sort=False)["순매수"]
+    prev = g.shift(1)
+    roll = prev.groupby(df["종목ID"], sort=False).rolling(window, min_periods=min_hist)
+    med = roll.median().reset_index(level=0, drop=True)
+    mad = roll.apply(lambda v: np.nanmedian(np.abs(v - np.nanmedian(v))), raw=True).reset_index(level=0, drop=True)
+    return med.sort_index().to_numpy(), mad.sort_index().to_numpy()
+
+
+def bench(src: Path = PROC / "all_data_clean.csv"):
+    from indicators import synthetic
+
+    base = pd.read_csv(src, parse_dates=["날짜"], encoding="utf-8-sig",
+                       usecols=["날짜", "종목ID", "매수", "매도", "순매수"])
+    base = base.sort_values(["종목ID", "날짜"]).reset_index(drop=True)
+
+    t = time.perf_counter()
+    ref_med, ref_mad = _pandas_reference(base)
+    t_ref = time.perf_counter() - t
+    t = time.perf_counter()
+    med, mad, _ = rolling_median_mad(base["순매수"].to_numpy(), base["종목ID"].to_numpy())
+    t_vec = time.perf_counter() - t
+    same = (np.allclose(med, ref_med, equal_nan=True, rtol=1e-12, atol=1e-6)
+            and np.allclose(mad, ref_mad, equal_nan=True, rtol=1e-12, atol=1e-6))
+    print(f"rows={len(base):,}  W={WINDOW}  pandas groupby.rolling(+apply MAD) {t_ref * 1000:8.1f} ms | "
+          f"벡터화 {t_vec * 1000:6.1f} ms (x{t_ref / t_vec:.0f}) | 결과 동일: {'OK' if same else 'FAIL'}")
+
+    for scale in (1, 10, 50):
+        df = synthetic(base, scale).sort_values(["종목ID", "날짜"]).reset_index(drop=True)
+        t = time.perf_counter()
+        ev = detect(df)
+        dt = time.perf_counter() - t
+        print(f"x{scale:<3} rows={len(df):>9,}  detect {dt * 1000:8.1f} ms  ({dt / len(df) * 1e6:.2f} µs/행)  "
+              f"이벤트 {len(ev):,}")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        bench()
+    else:
+        df = pd.read_csv(PROC / "all_data_clean.csv", parse_dates=["날짜"], encoding="utf-8-sig",
+                         usecols=["날짜", "종목ID", "순매수"])
+        ev = build_outputs(df.sort_values(["종목ID", "날짜"]).reset_index(drop=True))
+        print(f"🚨 {SPIKES_PATH.name} 저장 (이벤트 {len(ev):,}건)")
+        print(ev.head(10).to_string(index=False))
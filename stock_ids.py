@@ -0,0 +1,94 @@
+# stock_ids.py
+# 종목명 ↔ 정수 종목ID 사전 (processed/stock_ids.csv)
+# - 한 번 부여된 ID는 바뀌지 않음(append-only) → 누적 데이터/캐시/즐겨찾기 키로 안전
+# - ID는 0부터 촘촘하게 부여 → names[종목ID] 식으로 배열 인덱스로 바로 디코딩
+# - 표준 라이브러리만 사용(앱 콜드 스타트에서도 import 가능)
+#
+# 벤치마크: python stock_ids.py --bench
+
+import csv
+import sys
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+STOCK_IDS_PATH = PROC / "stock_ids.csv"
+
+
+def load_stock_ids(path: Path = STOCK_IDS_PATH) -> dict:
+    """stock_ids.csv → {종목명: 종목ID}"""
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return {r["종목명"]: int(r["종목ID"]) for r in csv.DictReader(f)}
+
+
+def save_stock_ids(ids: dict, path: Path = STOCK_IDS_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["종목ID", "종목명"])
+        for name, sid in sorted(ids.items(), key=lambda kv: kv[1]):
+            w.writerow([sid, name])
+    tmp.replace(path)
+
+
+def assign_ids(names, ids: dict = None) -> dict:
+    """
+    기존 사전에 없는 종목명에만 새 ID(max+1부터, 이름순)를 붙인 사전을 반환.
+    기존 ID는 절대 바꾸지 않음.
+    """
+    ids = dict(load_stock_ids() if ids is None else ids)
+    nxt = max(ids.values(), default=-1) + 1
+    for name in sorted(set(names) - set(ids)):
+        ids[name] = nxt
+        nxt += 1
+    return ids
+
+
+def id_to_name_list(ids: dict) -> list:
+    """{종목명: 종목ID} → names[종목ID] = 종목명 (비어있는 ID는 "")"""
+    names = [""] * (max(ids.values(), default=-1) + 1)
+    for name, sid in ids.items():
+        names[sid] = name
+    return names
+
+
+# ──────────────────────────────────────────────────────────────
+def bench(src: Path = PROC / "all_data.csv", repeat: int = 200):
+    """문자열 종목명 vs 정수 종목ID: 메모리 + 종목 필터(==) 속도 비교"""
+    import time
+    import numpy as np
+    import pandas as pd
+
+    raw = pd.read_csv(src, encoding="utf-8-sig", usecols=["종목명"])
+    names = raw["종목명"].astype(str).str.strip()
+    ids = assign_ids(names.unique(), load_stock_ids())
+    sid = names.map(ids).to_numpy(dtype=np.int32)
+
+    target_name = names.value_counts().index[0]
+    target_id = ids[target_name]
+
+    def timeit(fn):
+        t = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - t) / repeat * 1e6
+
+    mem_obj = names.memory_usage(deep=True) / 1024
+    mem_id = sid.nbytes / 1024
+    t_obj = timeit(lambda: (names == target_name).sum())
+    t_id = timeit(lambda: (sid == target_id).sum())
+
+    print(f"rows={len(names):,}  stocks={len(ids):,}  target={target_name!r}")
+    print(f"메모리   object: {mem_obj:9.1f} KiB | int32: {mem_id:7.1f} KiB | x{mem_obj / mem_id:.1f}")
+    print(f"필터(==) object: {t_obj:9.1f} µs  | int32: {t_id:7.1f} µs  | x{t_obj / t_id:.1f}")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        bench()
+    else:
+        print(f"📇 {STOCK_IDS_PATH.name}: {len(load_stock_ids())}종목")
@@ -0,0 +1,291 @@
+# warmup.py
+# 데이터 새 버전(DataWatcher 스냅샷 교체)마다 많이 볼 종목의 차트 데이터/KPI/스펙을 백그라운드에서 미리 계산
+# - 대상(candidates): 조회수 상위(ViewCounter) → 즐겨찾기 많은 종목(FavoritesStore.popular) → 최근 TOP50 등장 상위,
+#   중복 없이 최대 WARM_N개 — 조회가 쌓일수록 실제로 많이 보는 종목 위주로 바뀜
+# - Warmer: 버전당 한 번, 스레드 풀(WARM_WORKERS)에서 작업 실행. 작업 목록은 앱이 넘겨줌(set_jobs)
+#   → 앱의 st.cache_data 함수를 같은 키로 미리 호출 = 첫 사용자가 마스크/집계/스펙 생성 비용을 치르지 않음
+#   새 버전이 오면 이전 버전의 남은 작업은 건너뜀
+# - ViewCounter: (시장, 종목명) 조회수 — 메모리에 모았다가 SQLite(processed/views.db)에 증분 기록(여러 프로세스 합산)
+# - CacheStats: 캐시 이름별 적중/미스(사용자 요청만 집계) → 앱 ?perf=1
+#
+# 벤치마크(앱 AppTest로 차트 탭 첫 조회: 예열 전/후 + 풀 크기별 예열 시간): python warmup.py --bench
+
+import atexit
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+PROC = BASE / "processed"
+
+VIEWS_DB_PATH = PROC / "views.db"
+
+WARM_N = 30             # 버전당 예열할 종목 수
+WARM_WORKERS = 1        # 예열 스레드 수 — 작업이 GIL을 잡는 pandas/altair라 늘려도 빨라지지 않고
+                        # 동시 사용자 재실행만 느려짐(--bench: 63작업 풀 1/2/4 = 3.1/2.7~3.3/2.9~3.3 s)
+RECENT_DAYS = 20        # TOP50 등장 상위: 최근 거래일 수
+FLUSH_EVERY = 20        # 조회 이만큼 모이면 DB에 기록
+
+
+class ViewCounter:
+    """(시장, 종목명)별 조회수 — hit()는 메모리만, FLUSH_EVERY마다/종료 시 DB에 더하기"""
+
+    def __init__(self, db_path: Path = None, flush_every: int = FLUSH_EVERY):
+        self.db_path = Path(db_path or VIEWS_DB_PATH)
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        con = self._connect()
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS views (
+                market TEXT NOT NULL,
+                stock  TEXT NOT NULL,
+                n      INTEGER NOT NULL,
+                PRIMARY KEY (market, stock)
+            ) WITHOUT ROWID
+        """)
+        con.close()
+        atexit.register(self.flush)
+
+    def _connect(self):
+        con = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA busy_timeout=30000")
+        return con
+
+    def hit(self, market: str, stock: str):
+        with self._lock:
+            self._pending[(market, stock)] += 1
+            due = sum(self._pending.values()) >= self.flush_every
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+        con = self._connect()
+        try:
+            con.executemany(
+                "INSERT INTO views(market, stock, n) VALUES (?, ?, ?) "
+                "ON CONFLICT(market, stock) DO UPDATE SET n = n + excluded.n",
+                [(m, s, n) for (m, s), n in pending.items()],
+            )
+        except sqlite3.Error as e:
+            with self._lock:
+                self._pending.update(pending)       # 다음에 다시
+            print(f"⚠️ 조회수 기록 실패(다음에 재시도): {e}")
+            return 0
+        finally:
+            con.close()
+        return len(pending)
+
+    def top(self, market: str, limit: int = WARM_N) -> list:
+        """조회수 상위 [(종목명, 조회수)] — 대기 중인 조회도 먼저 기록"""
+        self.flush()
+        con = self._connect()
+        try:
+            return con.execute(
+                "SELECT stock, n FROM views WHERE market = ? ORDER BY n DESC, stock LIMIT ?", (market, limit)
+            ).fetchall()
+        finally:
+            con.close()
+
+
+class CacheStats:
+    """캐시 이름별 (적중, 전체) — 사용자 요청에서만 기록(예열 호출은 제외)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._c = {}
+
+    def record(self, name: str, hit: bool):
+        with self._lock:
+            h, n = self._c.get(name, (0, 0))
+            self._c[name] = (h + bool(hit), n + 1)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return dict(self._c)
+
+    def text(self) -> str:
+        return " · ".join(f"{k} {h}/{n} ({h / n:.0%})" for k, (h, n) in sorted(self.summary().items()) if n)
+
+
+def candidates(snap, views=(), favorites=(), name_to_id=None, n: int = WARM_N, recent: int = RECENT_DAYS):
+    """예열 대상 종목ID — 조회수 상위 → 즐겨찾기 상위 → 최근 recent거래일 TOP50 등장 상위(중복 제외, 최대 n)"""
+    import numpy as np
+
+    out, seen = [], set()
+
+    def add(sid):
+        if sid is not None and sid not in seen and sid in snap.index:
+            seen.add(sid)
+            out.append(int(sid))
+
+    name_to_id = name_to_id or {}
+    for name, _ in views:
+        add(name_to_id.get(name))
+    for name, _ in favorites:
+        add(name_to_id.get(name))
+    if len(out) < n and snap.ranks.m.size:
+        hits = (snap.ranks.m[-recent:] > 0).sum(axis=0)
+        order = np.argsort(-hits, kind="stable")
+        for sid in order[hits[order] > 0]:
+            if len(out) >= n:
+                break
+            add(int(sid))
+    return out[:n]
+
+
+class Warmer:
+    """
+    스냅샷 버전당 한 번 예열 작업 실행
+    jobs_fn(snapshot) → [(이름, 인자 없는 함수)] — 앱이 매 실행 최신 함수로 set_jobs
+    """
+
+    def __init__(self, workers: int = None):
+        self._pool = ThreadPoolExecutor(max_workers=workers or WARM_WORKERS, thread_name_prefix="warmup")
+        self._lock = threading.Lock()
+        self._jobs_fn = None
+        self._version = None
+        self.stats = {"버전": None, "작업": 0, "완료": 0, "건너뜀": 0, "오류": 0, "ms": None}
+
+    def set_jobs(self, fn):
+        self._jobs_fn = fn
+        return self
+
+    def on_snapshot(self, snap) -> bool:
+        """새 버전이면 예열 시작(즉시 반환) → 시작했으면 True. DataWatcher.subscribe에 그대로 넘김"""
+        with self._lock:
+            if self._jobs_fn is None or snap.version == self._version:
+                return False
+            self._version = snap.version
+            fn = self._jobs_fn
+        threading.Thread(target=self._run, args=(fn, snap), name="warmup-plan", daemon=True).start()
+        return True
+
+    def _run(self, fn, snap):
+        t = time.perf_counter()
+        try:
+            jobs = fn(snap)
+        except Exception as e:
+            print(f"⚠️ 예열 목록 만들기 실패: {e}")
+            return
+        stats = {"버전": snap.version, "작업": len(jobs), "완료": 0, "건너뜀": 0, "오류": 0, "ms": None}
+        self.stats = stats
+
+        def run_one(job):
+            name, call = job
+            if self._version != snap.version:       # 더 새 버전이 왔으면 남은 작업은 버림
+                key = "건너뜀"
+            else:
+                try:
+                    call()
+                    key = "완료"
+                except Exception as e:
+                    key = "오류"
+                    print(f"⚠️ 예열 실패 {name}: {e}")
+            with self._lock:                        # 풀 스레드끼리 += 가 겹치지 않게
+                stats[key] += 1
+
+        list(self._pool.map(run_one, jobs))
+        stats["ms"] = round((time.perf_counter() - t) * 1000, 1)
+        print(f"🔥 캐시 예열 {snap.version}: {stats['완료']}/{stats['작업']} 작업, {stats['ms']:.0f} ms"
+              + (f" (오류 {stats['오류']})" if stats["오류"] else ""))
+
+    def text(self) -> str:
+        s = self.stats
+        if not s["버전"]:
+            return "예열 전"
+        state = f"{s['ms']:.0f}ms" if s["ms"] is not None else "진행 중"
+        return f"{s['버전']} {s['완료']}/{s['작업']} 작업({state})"
+
+
+# ──────────────────────────────────────────────────────────────
+def bench(n: int = 10, pools=(1, 2, 4)):
+    """
+    앱(app_streamlit.py)을 AppTest로 실행해 실제 st.cache_data 경로(chart_kpis/chart_spec)를 잼:
+    예열 대상 종목 n개를 차트 탭(?stock=)으로 처음 열 때 — 예열 없이 vs 예열 뒤, 풀 크기별 전체 예열 시간
+    시간은 앱 ?perf=1의 cache_kpi + cache_chart(캐시 함수 호출 구간)와 재실행 전체
+    """
+    import re
+    import statistics
+    import tempfile
+
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    import warmup as W                      # 앱이 쓰는 모듈(이 파일을 직접 실행하면 __main__과 별개)
+    from favorites_store import FavoritesStore
+    from live_data import Snapshot
+    from lookup import load_lookup
+
+    W.VIEWS_DB_PATH = Path(tempfile.mkdtemp()) / "views.db"     # 벤치 조회가 실제 조회수에 섞이지 않게
+    snap = Snapshot.load()
+    lookup = load_lookup()
+    fav = FavoritesStore(PROC / "favorites.db", seed_path=PROC / "favorites.json")
+    warm_ids = candidates(snap, (), fav.popular(), lookup["name_to_id"])        # 앱 warm_jobs와 같은 대상
+    names = [lookup["names"][sid] for sid in warm_ids[:n]]
+
+    def run(tab, **qp):
+        at = AppTest.from_file(str(BASE / "app_streamlit.py"), default_timeout=300)
+        at.query_params.update(tab=tab, perf="1", **qp)
+        t = time.perf_counter()
+        at.run()
+        wall = (time.perf_counter() - t) * 1000
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        caps = [c.value for c in at.caption]
+        perf = next(c for c in caps if c.startswith("⏱️"))
+        ms = sum(float(v) for v in re.findall(r"cache_(?:kpi|chart) (\d+)ms", perf))
+        return ms, wall, next((c for c in caps if c.startswith("🔥")), "")
+
+    def open_all():
+        got = [run("chart", stock=name) for name in names]
+        return (statistics.mean(g[0] for g in got), statistics.mean(g[1] for g in got), got[-1][2])
+
+    done = threading.Event()
+    orig_run, orig_on = W.Warmer._run, W.Warmer.on_snapshot
+
+    def traced(self, fn, snap):
+        orig_run(self, fn, snap)
+        done.set()
+
+    W.Warmer._run = traced
+
+    def fresh(workers):
+        """캐시·리소스(감시자/예열기/집계) 비우고 데이터만 다시 올림(top 탭 1회, 예열은 여기서 시작)"""
+        W.WARM_WORKERS = workers
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        done.clear()
+        run("top")
+
+    # 예열 없이
+    W.Warmer.on_snapshot = lambda self, snap: False
+    fresh(1)
+    cold = open_all()
+    W.Warmer.on_snapshot = orig_on
+
+    print(f"차트 탭 첫 조회 {len(names)}종목(예열 대상 {len(warm_ids)}종목 중 앞쪽), 종목당 평균")
+    print(f"  예열 없이  캐시 함수 {cold[0]:6.0f} ms | 재실행 전체 {cold[1]:6.0f} ms")
+    for workers in pools:
+        fresh(workers)
+        done.wait(600)
+        warm = open_all()
+        took = re.search(r"작업\((\d+)ms\)", warm[2])
+        print(f"  풀 {workers}개     캐시 함수 {warm[0]:6.0f} ms | 재실행 전체 {warm[1]:6.0f} ms"
+              f" | 예열 {took.group(1) if took else '?'} ms — {warm[2].removeprefix('🔥 ')}")
+    W.Warmer._run = orig_run
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv[1:]:
+        bench()